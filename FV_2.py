@@ -7,111 +7,96 @@ Created on Tue Apr  8 17:59:31 2025
 """
 
 
+import os
+
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
-import seaborn as sns
-
-# Load the most recent dataset
-df = pd.read_csv('cleaned_c24.csv')
-
-# Define your specific color scheme
-color_black = '#000000'  # Black
-color_gray = '#979797'   # Gray
-color_gold = '#FFBA08'   # Gold/Yellow
-
-# Function to prepare importance-satisfaction data
-def prepare_imp_sat_data(df):
-    result = []
-    
-    # Find matching IMP and DS column pairs
-    imp_cols = [col for col in df.columns if col.startswith('IMP_')]
-    ds_cols = [col for col in df.columns if col.startswith('DS_')]
-    
-    for imp_col in imp_cols:
-        service_code = imp_col[4:]  # Remove 'IMP_'
-        ds_col = f'DS_{service_code}'
-        
-        # Check if we have both importance and satisfaction data
-        if ds_col in ds_cols:
-            # Calculate average importance and satisfaction
-            imp_avg = df[imp_col].mean()
-            ds_avg = df[ds_col].mean()
-            
-            # Calculate gap
-            gap = imp_avg - ds_avg
-            
-            result.append({
-                'service': service_code,
-                'importance': imp_avg,
-                'satisfaction': ds_avg,
-                'gap': gap
-            })
-    
-    return pd.DataFrame(result)
 
-# Prepare the data
-imp_sat_data = prepare_imp_sat_data(df)
-
-# Create custom colormap using your exact colors
-colors = [color_black, color_gray, color_gold]
-custom_cmap = plt.matplotlib.colors.LinearSegmentedColormap.from_list("custom", colors)
-
-# Create the matrix plot
-plt.figure(figsize=(12, 10), facecolor='white')
-
-# Create the scatter plot with your color scheme
-scatter = plt.scatter(
-    imp_sat_data['satisfaction'], 
-    imp_sat_data['importance'], 
-    s=100,  # Fixed size for all points
-    alpha=0.8,
-    c=imp_sat_data['gap'],
-    cmap=custom_cmap,
-    edgecolor='white',
-    linewidth=0.5
-)
+from association import association_matrix, cluster_order
+from bootstrap import bootstrap_item_cis, imp_sat_cis
+from charts import ChartSpec, color_black, color_gold, color_gray, render_chart, style_spines
+from codebook import CODEBOOK
+from facets import FACET_KEYS, MIN_RESPONDENTS, facet_stats, render_facets
+from incremental import AggregateStore
+from instrument import traced
+from longitudinal import LongitudinalStore
+from psychometrics import STAFF_UNIT, composite_means, family_scales, reliability
+from query import wave
+from significance import compare_waves
+from survey_metrics import imp_sat_gaps, item_columns
+from survey_store import load_wave, load_weights
+from wave_metrics import DATA_DIR
+from weighting import selected_weights
+
+# Load the most recent dataset (through the columnar cache)
+wave_path = os.path.join(DATA_DIR, 'cleaned_c24.csv')
+df = load_wave(wave_path)
+
+# Survey weights: every prepare_* function takes the NAME of a weight set stored with the waves
+# (MISO_WEIGHTS selects the report's; None = unweighted) and resolves it itself
+WEIGHTS = selected_weights()
+
+def stored_weights(name):
+    # Weight array of the 2024 wave for a stored weight set name (None stays None)
+    if name is None:
+        return None
+    w = load_weights(wave_path, name)
+    if w is None:
+        raise KeyError(f"No weights named {name!r} stored for {wave_path}")
+    return w
 
-# Add a colorbar
-cbar = plt.colorbar(scatter)
-cbar.set_label('Gap (Importance - Satisfaction)', color=color_black)
+weights = stored_weights(WEIGHTS)
 
-# Add quadrant lines
-plt.axvline(x=3, color=color_gray, linestyle='--', alpha=0.7)
-plt.axhline(y=3, color=color_gray, linestyle='--', alpha=0.7)
+_aggregate_stores = {}
 
-# Label quadrants
-plt.text(1.5, 4.5, 'Concentrate here', fontsize=12, color=color_black)
-plt.text(4.5, 4.5, 'Keep up the good work', fontsize=12, ha='right', color=color_black)
-plt.text(1.5, 1.5, 'Low priority', fontsize=12, color=color_black)
-plt.text(4.5, 1.5, 'Possible overkill', fontsize=12, ha='right', color=color_black)
+def aggregate_store(weights=None):
+    # Running per-item statistics per weight set; new response batches can be folded in with ingest()
+    if weights not in _aggregate_stores:
+        w = stored_weights(weights)
+        _aggregate_stores[weights] = AggregateStore(weighted=w is not None).ingest(df, w)
+    return _aggregate_stores[weights]
 
-# Add labels for each point
-for _, row in imp_sat_data.iterrows():
-    plt.annotate(
-        row['service'],
-        (row['satisfaction'], row['importance']),
-        xytext=(3, 3),
-        textcoords='offset points',
-        fontsize=8,
-        color=color_black
-    )
+aggregates = aggregate_store(WEIGHTS)
 
-# Set titles and labels
-plt.title('Importance-Satisfaction Matrix (2024)', fontsize=16, color=color_black)
-plt.xlabel('Satisfaction Rating', fontsize=14, color=color_black)
-plt.ylabel('Importance Rating', fontsize=14, color=color_black)
+# Function to prepare importance-satisfaction data
+@traced('prepare')
+def prepare_imp_sat_data(df, weights=None):
+    # Align every IMP_/DS_ pair and reduce them together in one pass
+    stats = imp_sat_gaps(df, stored_weights(weights))
+    return stats[['service', 'importance', 'satisfaction', 'gap']]
 
-# Set axis limits
-plt.xlim(1, 5)
-plt.ylim(1, 5)
-plt.grid(True, linestyle='--', alpha=0.3, color=color_gray)
+# Prepare the data
+imp_sat_data = prepare_imp_sat_data(df, WEIGHTS)
+
+def importance_satisfaction_marks(data, error_bars=False):
+    # 95% bootstrap intervals on both ratings
+    if error_bars:
+        cis = imp_sat_cis(df, weights=weights).set_index('service').loc[data['service']]
+        plt.errorbar(
+            data['satisfaction'],
+            data['importance'],
+            xerr=[cis['satisfaction'] - cis['satisfaction_ci_low'], cis['satisfaction_ci_high'] - cis['satisfaction']],
+            yerr=[cis['importance'] - cis['importance_ci_low'], cis['importance_ci_high'] - cis['importance']],
+            fmt='none',
+            ecolor=color_gray,
+            elinewidth=0.8,
+            alpha=0.6
+        )
 
-# Style the tick parameters
-plt.tick_params(colors=color_black)
+IMPORTANCE_SATISFACTION = ChartSpec(
+    'importance_satisfaction', 'quadrant', lambda: imp_sat_data, importance_satisfaction_marks,
+    x='satisfaction', y='importance', color='gap', label='service',
+    cbar_label='Gap (Importance - Satisfaction)',
+    quadrant_labels=[(1.5, 4.5, 'Concentrate here', 'left'), (4.5, 4.5, 'Keep up the good work', 'right'),
+                     (1.5, 1.5, 'Low priority', 'left'), (4.5, 1.5, 'Possible overkill', 'right')],
+    title='Importance-Satisfaction Matrix (2024)', xlabel='Satisfaction Rating', ylabel='Importance Rating'
+)
 
-plt.tight_layout()
-plt.show()
+def plot_importance_satisfaction(error_bars=False, label_layout=False):
+    """Importance-satisfaction quadrant matrix (label_layout: overlap-free service labels)"""
+    spec = IMPORTANCE_SATISFACTION.with_options(label_layout=True) if label_layout else IMPORTANCE_SATISFACTION
+    render_chart(spec, error_bars=error_bars)
 
 
 
@@ -121,81 +106,23 @@ plt.show()
 
 
 
-# Define your color scheme
-color_black = '#000000'  # Black
-color_gray = '#979797'   # Gray
-color_gold = '#FFBA08'   # Yellow/Gold
-
 # Function to prepare usage by division data
-def prepare_usage_by_division():
-    # Get all USE_ columns
-    use_cols = [col for col in df.columns if col.startswith('USE_')]
-    
-    # Make sure we have the ADIV column
-    if 'ADIV' not in df.columns:
-        print("Academic division column (ADIV) not found in dataset")
-        return None
-    
-    # Get unique divisions
-    divisions = df['ADIV'].dropna().unique()
-    
-    # Create a DataFrame to store results
-    result_data = []
+@traced('prepare')
+def prepare_usage_by_division(weights=None):
+    # Average usage for every service and division in one grouped pass over the USE_ and ADIV columns
+    usage = wave('2024').items('USE_*').weighted(weights).group_by('ADIV').mean()
     
-    # Calculate average usage for each service by division
-    for div in divisions:
-        div_data = df[df['ADIV'] == div]
-        
-        for col in use_cols:
-            service_code = col[4:]  # Remove 'USE_'
-            avg_usage = div_data[col].mean()
-            
-            result_data.append({
-                'division': div,
-                'service': col,
-                'service_name': get_service_name(service_code),
-                'usage': avg_usage
-            })
-    
-    return pd.DataFrame(result_data)
-
-# Get service name function (reused from previous code)
-def get_service_name(code):
-    # Same implementation as before
-    service_map = {
-        'CMS': 'Content Management System',
-        'CMSGB': 'Canvas Grade Book',
-        'TMS': 'Technology in Meeting Spaces',
-        'STMS': 'Support for Technology in Meeting Spaces',
-        'ITS': 'Instructional Technology Support',
-        'IDS': 'Instructional Design Services',
-        'SWC': 'Web Conferencing',
-        'CS': 'Classroom Support',
-        'OAV': 'Online Audio/Video',
-        'GAIT': 'Generative AI Tools',
-        'LSG': 'Learning Support Group',
-        'LC': 'Learning Commons',
-        'LEC': 'Learning Environment Configuration',
-        'FPC': 'Faculty Professional Community',
-        'CFUS': 'Copyright and Fair Use Support',
-        'BL': 'Borrowing Laptops',
-        'VPN': 'Virtual Private Network',
-        'AORO': 'Access to Online Resources Off-campus',
-        'ERPSS': 'Enterprise Resource Planning System',
-        'CWS': 'Campus Wireless System'
-    }
-    return service_map.get(code, code)
-
-# Prepare the data
-usage_by_division = prepare_usage_by_division()
-
-# Create a pivot table for the heatmap
-pivot_df = usage_by_division.pivot_table(
-    index='division', 
-    columns='service_name', 
-    values='usage',
-    aggfunc='mean'
-)
+    # Label the services; the result is already division x service for the heatmap.
+    # As with the pivot table this replaced, services sharing a label are averaged
+    # and services no division answered are dropped.
+    usage.columns = CODEBOOK.relabel_items(usage.columns)
+    usage = usage.T.groupby(level=0, sort=False).mean().T.dropna(axis=1, how='all')
+    usage.index.name = 'division'
+    usage.columns.name = 'service_name'
+    return usage
+
+# Prepare the data (division x service, ready for the heatmap)
+pivot_df = prepare_usage_by_division(WEIGHTS)
 
 # Sort services by overall usage
 service_means = pivot_df.mean().sort_values(ascending=False)
@@ -203,179 +130,121 @@ service_means = pivot_df.mean().sort_values(ascending=False)
 top_services = service_means.head(10).index
 pivot_df = pivot_df[top_services]
 
-# Create a custom colormap using your colors (black to gold)
-cmap = plt.matplotlib.colors.LinearSegmentedColormap.from_list(
-    "custom", [color_black, color_gray, color_gold]
-)
-
-# Create the heatmap with your color scheme
-plt.figure(figsize=(14, 8), facecolor='white')
-heatmap = sns.heatmap(
-    pivot_df,
-    annot=True,
-    cmap=cmap,
-    cbar_kws={'label': 'Average Usage (1-5 scale)'},
-    fmt='.2f',
-    linewidths=0.5,
-    linecolor=color_black,
-    annot_kws={"color": "white" if color_black else "black"}
+USAGE_BY_DIVISION = ChartSpec(
+    'usage_by_division', 'heatmap', lambda: pivot_df,
+    title='Technology Adoption by Academic Division (2024)',
+    cbar_label='Average Usage (1-5 scale)',
+    heatmap={'annot': True, 'fmt': '.2f', 'linewidths': 0.5, 'linecolor': color_black,
+             'annot_kws': {'color': 'white'}, 'cbar_kws': {'label': 'Average Usage (1-5 scale)'}},
+    xticks={'rotation': 45, 'ha': 'right'},
+    cbar_tick_color=color_black
 )
 
-# Style the colorbar
-cbar = heatmap.collections[0].colorbar
-cbar.ax.yaxis.set_tick_params(color=color_black)
-cbar.outline.set_edgecolor(color_black)
-cbar.ax.set_ylabel('Average Usage (1-5 scale)', color=color_black)
-
-# Rotate x-axis labels for better readability
-plt.xticks(rotation=45, ha='right', color=color_black)
-plt.yticks(color=color_black)
-
-# Set titles and labels
-plt.title('Technology Adoption by Academic Division (2024)', fontsize=16, color=color_black)
-
-# Set the figure facecolor
-plt.gcf().set_facecolor('white')
-
-plt.tight_layout()
-
-plt.show()
+def plot_usage_by_division():
+    """Technology adoption heatmap by academic division"""
+    render_chart(USAGE_BY_DIVISION)
 
 
 
 ###
 
-# Define your color scheme
-color_black = '#000000'  # Black
-color_gray = '#979797'   # Gray
-color_gold = '#FFBA08'   # Yellow/Gold
+# Define the staff attributes to analyze
+staff_attributes = [
+    {'prefix': 'DAHD_', 'name': 'Help Desk Staff'},
+    {'prefix': 'DAERPS_', 'name': 'ERP System Support Staff'},
+    {'prefix': 'DAIT_', 'name': 'Instructional Technology Staff'},
+    {'prefix': 'DAMMS_', 'name': 'Multimedia Services Staff'}
+]
 
-# Create a color list using your scheme
-colors = [color_black, color_gold, color_gray]
+attribute_types = [
+    {'suffix': 'F', 'name': 'Friendly'},
+    {'suffix': 'K', 'name': 'Knowledgeable'},
+    {'suffix': 'RL', 'name': 'Reliable'},
+    {'suffix': 'RS', 'name': 'Responsive'}
+]
 
 # Prepare service quality data
-def prepare_service_quality_data():
-    # Define the staff attributes to analyze
-    staff_attributes = [
-        {'prefix': 'DAHD_', 'name': 'Help Desk Staff'},
-        {'prefix': 'DAERPS_', 'name': 'ERP System Support Staff'},
-        {'prefix': 'DAIT_', 'name': 'Instructional Technology Staff'},
-        {'prefix': 'DAMMS_', 'name': 'Multimedia Services Staff'}
-    ]
-    
-    attribute_types = [
-        {'suffix': 'F', 'name': 'Friendly'},
-        {'suffix': 'K', 'name': 'Knowledgeable'},
-        {'suffix': 'RL', 'name': 'Reliable'},
-        {'suffix': 'RS', 'name': 'Responsive'}
-    ]
+@traced('prepare')
+def prepare_service_quality_data(weights=None):
+    # One query for every staff unit's DA* items, reduced straight from their packed answers
+    item_means = wave('2024').items(*[staff['prefix'] + '*' for staff in staff_attributes]).weighted(weights).mean()
+    return service_quality_frame(item_means)
+
+def service_quality_frame(item_means):
+    # One row per staff unit, one column per attribute, from the DA* item means
+    asked = set(item_means.index)
     
     result_data = []
     
     for staff in staff_attributes:
-        staff_data = {'service': staff['name']}
+        cols = [staff['prefix'] + attr['suffix'] for attr in attribute_types]
+        # Units asked as a single item (no suffix) use it for every attribute
+        alt = item_means[staff['prefix']] if staff['prefix'] in asked else np.nan
+        if staff['prefix'] not in asked and asked.isdisjoint(cols):
+            continue
         
-        has_data = False
-        for attr in attribute_types:
-            col = staff['prefix'] + attr['suffix']
-            if col in df.columns:
-                staff_data[attr['name']] = df[col].mean()
-                has_data = True
-            else:
-                # Check if we have the column without the suffix (some may vary in format)
-                col_alt = staff['prefix']
-                if col_alt in df.columns:
-                    staff_data[attr['name']] = df[col_alt].mean()
-                    has_data = True
-                else:
-                    staff_data[attr['name']] = np.nan
-        
-        if has_data:
-            result_data.append(staff_data)
+        staff_data = {'service': staff['name']}
+        for attr, col in zip(attribute_types, cols):
+            staff_data[attr['name']] = item_means[col] if col in asked else alt
+        result_data.append(staff_data)
     
     return pd.DataFrame(result_data)
 
-# Create radar chart function
-def radar_chart(df, categories, title):
-    # Number of variables
-    N = len(categories)
-    
-    # Create angles for each category
-    angles = [n / float(N) * 2 * np.pi for n in range(N)]
-    angles += angles[:1]  # Close the loop
-    
-    # Create figure with white background
-    fig, ax = plt.subplots(figsize=(10, 10), subplot_kw=dict(polar=True), facecolor='white')
-    
-    # Draw one axis per variable and add labels
-    plt.xticks(angles[:-1], categories, size=12, color=color_black)
-    
-    # Draw ylabels (setting the limits based on the data)
-    ax.set_rlabel_position(0)
-    max_val = df[categories].max()
-    plt.yticks([1, 2, 3, 4], ['1', '2', '3', '4'], color=color_gray, size=10)
-    plt.ylim(0, 5)
-    
-    # Set grid color
-    ax.grid(color=color_gray, linestyle='--', alpha=0.7)
-    
-    # Color the y-axis labels
-    for label in ax.get_yticklabels():
-        label.set_color(color_black)
-    
-    # Plot data
-    for i, (idx, row) in enumerate(df.iterrows()):
-        values = [row[cat] for cat in categories]
-        values += values[:1]  # Close the loop
-        
-        # Plot values with your custom colors
-        color = colors[i % len(colors)]
-        ax.plot(angles, values, linewidth=2, linestyle='solid', color=color, label=row['service'])
-        ax.fill(angles, values, color=color, alpha=0.2)
-    
-    # Add legend with custom colors
-    plt.legend(loc='upper right', bbox_to_anchor=(0.1, 0.1), frameon=True, 
-               facecolor='white', edgecolor=color_black, labelcolor=color_black)
-    
-    # Add title with custom color
-    plt.title(title, size=16, y=1.1, color=color_black)
-    
-    # Color the spines
-    for spine in ax.spines.values():
-        spine.set_edgecolor(color_black)
-    
-    return fig
-
 # Prepare the data
-service_quality = prepare_service_quality_data()
+service_quality = prepare_service_quality_data(WEIGHTS)
 
 # Define the categories (attributes)
 categories = ['Friendly', 'Knowledgeable', 'Reliable', 'Responsive']
 
-# Create the radar chart
-fig = radar_chart(
-    service_quality, 
-    categories, 
-    'Service Quality Assessment (2024)'
+SERVICE_QUALITY = ChartSpec(
+    'service_quality', 'radar', lambda: service_quality,
+    categories=categories, title='Service Quality Assessment (2024)'
 )
 
-plt.tight_layout()
+def plot_service_quality():
+    """Radar chart of staff service quality"""
+    render_chart(SERVICE_QUALITY)
 
-plt.show()
+# Prepare staff composite scores by division
+@traced('prepare')
+def prepare_staff_composites(weights=None, n_divisions=3):
+    # Each staff unit's F/K/RL/RS ratings form one scale; a respondent's score is the mean of them
+    weights = stored_weights(weights)
+    staff_scales = {unit: items for unit, items in family_scales(df.columns).items() if STAFF_UNIT.match(items[0])}
+    alphas = reliability(df, staff_scales, weights=weights)['scales']['alpha'].droplevel('group')
 
-###
+    # Largest divisions only, one per color in the scheme
+    divisions = df['ADIV'].value_counts().head(n_divisions).index
+    means = composite_means(df, staff_scales, 'ADIV', weights).loc[divisions]
+
+    # Axis labels carry each scale's reliability
+    labels = [f"{CODEBOOK.label(unit)}\n(\u03b1 = {alphas[unit]:.2f})" for unit in staff_scales]
+    means.columns = labels
+    return means.rename_axis('service').reset_index(), labels
+
+staff_composites, staff_labels = prepare_staff_composites(WEIGHTS)
+
+STAFF_COMPOSITES = ChartSpec(
+    'staff_composites', 'radar', lambda: staff_composites,
+    categories=staff_labels, title='Staff Service Composite Scores by Division (2024)'
+)
 
+def plot_staff_composites():
+    """Radar chart of staff composite scores by division"""
+    render_chart(STAFF_COMPOSITES)
+
+###
 
-# Define your color scheme
-color_black = '#000000'  # Black
-color_gray = '#979797'   # Gray
-color_gold = '#FFBA08'   # Yellow/Gold
 
 # Prepare skill gap data
-def prepare_skill_gap_data():
+@traced('prepare')
+def prepare_skill_gap_data(weights=None):
+    return skill_gap_frame(aggregate_store(weights).item_means())
+
+def skill_gap_frame(item_means):
     # Get skill and learning interest columns
-    skl_cols = [col for col in df.columns if col.startswith('SKL_')]
-    lrn_cols = [col for col in df.columns if col.startswith('LRN_')]
+    skl_cols = [col for col in item_means.index if col.startswith('SKL_')]
+    lrn_cols = [col for col in item_means.index if col.startswith('LRN_')]
     
     result_data = []
     
@@ -386,11 +255,11 @@ def prepare_skill_gap_data():
         # Check if we have matching learning interest data
         if lrn_col in lrn_cols:
             # Calculate average skill and learning interest
-            skill_avg = df[skl_col].mean()
-            learn_avg = df[lrn_col].mean()
+            skill_avg = item_means[skl_col]
+            learn_avg = item_means[lrn_col]
             
             # Get service name
-            service_name = get_service_name(service_code)
+            service_name = CODEBOOK.label(service_code)
             
             result_data.append({
                 'service': service_code,
@@ -402,70 +271,36 @@ def prepare_skill_gap_data():
     
     return pd.DataFrame(result_data)
 
-# Get service name function (reused from previous code)
-def get_service_name(code):
-    # Same implementation as before
-    service_map = {
-        'ERP': 'Enterprise Resource Planning',
-        'CMS': 'Content Management System',
-        'TMS': 'Technology in Meeting Spaces',
-        'OLC': 'Online Learning Commons',
-        'SWC': 'Web Conferencing',
-        'LCS': 'Lecture Capture Software',
-        'PIRO': 'Protecting Identity/Reputation Online',
-        'IFE': 'Identifying Fraudulent Emails'
-    }
-    return service_map.get(code, code)
-
 # Prepare the data
-skill_gap_data = prepare_skill_gap_data()
+skill_gap_data = prepare_skill_gap_data(WEIGHTS)
 
 # Sort by absolute gap value for better visualization
 skill_gap_data['abs_gap'] = skill_gap_data['gap'].abs()
 skill_gap_data = skill_gap_data.sort_values('abs_gap', ascending=False)
 
-# Create the figure with white background
-plt.figure(figsize=(12, 8), facecolor='white')
-
-# Plot skill and interest as grouped bars with your color scheme
-bar_width = 0.35
-x = np.arange(len(skill_gap_data))
-
-plt.bar(x - bar_width/2, skill_gap_data['skill'], bar_width, label='Current Skill Level', 
-        color=color_black, edgecolor=color_black)
-plt.bar(x + bar_width/2, skill_gap_data['interest'], bar_width, label='Learning Interest', 
-        color=color_gold, edgecolor=color_black)
-
-# Add gap lines and labels
-for i, row in skill_gap_data.iterrows():
-    idx = skill_gap_data.index.get_loc(i)
-    plt.plot([idx-bar_width/2, idx+bar_width/2], [row['skill'], row['interest']], 
-             color=color_gray, linestyle='-', linewidth=1.5, alpha=0.8)
-    plt.annotate(f"{row['gap']:.2f}", 
-                 xy=(idx, min(row['skill'], row['interest'])), 
-                 xytext=(0, -20 if row['gap'] < 0 else 10), 
-                 textcoords='offset points',
-                 ha='center',
-                 color=color_black,
-                 fontweight='bold')
-
-# Set x-axis labels and ticks
-plt.xticks(x, skill_gap_data['service_name'], rotation=45, ha='right', color=color_black)
-plt.yticks(color=color_black)
-
-# Set titles and labels
-plt.title('Faculty Technology Skill vs. Learning Interest (2024)', fontsize=16, color=color_black)
-plt.ylabel('Rating (1-5 scale)', fontsize=14, color=color_black)
-plt.legend(facecolor='white', edgecolor=color_black, framealpha=1, labelcolor=color_black)
-plt.grid(axis='y', linestyle='--', alpha=0.3, color=color_gray)
-
-# Style the axes
-for spine in plt.gca().spines.values():
-    spine.set_edgecolor(color_black)
-
-plt.tight_layout()
+def skill_gap_marks(data, x, bar_width):
+    # Add gap lines and labels
+    for idx, (_, row) in enumerate(data.iterrows()):
+        plt.plot([idx-bar_width/2, idx+bar_width/2], [row['skill'], row['interest']], 
+                 color=color_gray, linestyle='-', linewidth=1.5, alpha=0.8)
+        plt.annotate(f"{row['gap']:.2f}", 
+                     xy=(idx, min(row['skill'], row['interest'])), 
+                     xytext=(0, -20 if row['gap'] < 0 else 10), 
+                     textcoords='offset points',
+                     ha='center',
+                     color=color_black,
+                     fontweight='bold')
+
+SKILL_GAP = ChartSpec(
+    'skill_gap', 'grouped_bars', lambda: skill_gap_data, skill_gap_marks,
+    label='service_name',
+    series=[('skill', 'Current Skill Level', color_black), ('interest', 'Learning Interest', color_gold)],
+    title='Faculty Technology Skill vs. Learning Interest (2024)', ylabel='Rating (1-5 scale)'
+)
 
-plt.show()
+def plot_skill_gap():
+    """Skill vs. learning interest grouped bars"""
+    render_chart(SKILL_GAP)
 
 
 
@@ -474,27 +309,26 @@ plt.show()
 
 
 
-# Define your color scheme
-color_black = '#000000'  # Black
-color_gray = '#979797'   # Gray
-color_gold = '#FFBA08'   # Yellow/Gold
+# Both survey waves, aligned on shared item codes
+store = LongitudinalStore.from_folder()
 
 # Function to prepare usage comparison data
-def prepare_usage_comparison():
-    # Get common USE_ columns between both datasets
-    use_cols_c18 = [col for col in df_c18.columns if col.startswith('USE_')]
-    use_cols_c24 = [col for col in df_c24.columns if col.startswith('USE_')]
+@traced('prepare')
+def prepare_usage_comparison(weights=None):
+    # Get common USE_ columns between both datasets from the presence bitmaps
+    common_cols = store.shared_items(['2018', '2024'], prefix='USE_')
     
-    common_cols = list(set(use_cols_c18) & set(use_cols_c24))
+    # Average usage per wave for every shared service
+    means = store.item_means(['2018', '2024'], common_cols, weights=weights)
     
     result_data = []
     
     for col in common_cols:
         service_code = col[4:]  # Remove 'USE_'
-        avg_2018 = df_c18[col].mean()
-        avg_2024 = df_c24[col].mean()
+        avg_2018 = means.loc['2018', col]
+        avg_2024 = means.loc['2024', col]
         
-        service_name = get_service_name(service_code)
+        service_name = CODEBOOK.label(service_code)
         
         result_data.append({
             'service': service_code,
@@ -506,139 +340,208 @@ def prepare_usage_comparison():
     
     return pd.DataFrame(result_data)
 
-# Get service name function (reused from previous code)
-def get_service_name(code):
-    # Same implementation as before
-    service_map = {
-        'CMS': 'Content Management System',
-        'TMS': 'Technology in Meeting Spaces',
-        'STMS': 'Support for Technology in Meeting Spaces',
-        'ITS': 'Instructional Technology Support',
-        'SWC': 'Web Conferencing',
-        'FPC': 'Faculty Professional Community',
-        'VPN': 'Virtual Private Network',
-        'AORO': 'Access to Online Resources Off-campus',
-        'ERPSS': 'Enterprise Resource Planning System',
-        'CWS': 'Campus Wireless System'
-    }
-    return service_map.get(code, code)
-
 # Prepare the data
-usage_comparison = prepare_usage_comparison()
+usage_comparison = prepare_usage_comparison(WEIGHTS)
 
 # Sort by 2024 usage for better visualization
 usage_comparison = usage_comparison.sort_values('2024', ascending=False)
 
-# Create the figure with white background
-plt.figure(figsize=(14, 8), facecolor='white')
-
-# Plot usage comparison as grouped bars with your color scheme
-bar_width = 0.35
-x = np.arange(len(usage_comparison))
-
-plt.bar(x - bar_width/2, usage_comparison['2018'], bar_width, label='2018', 
-        color=color_gray, edgecolor=color_black)
-plt.bar(x + bar_width/2, usage_comparison['2024'], bar_width, label='2024', 
-        color=color_gold, edgecolor=color_black)
-
-# Add change arrows and percentages
-for i, row in usage_comparison.iterrows():
-    idx = usage_comparison.index.get_loc(i)
-    if not np.isnan(row['change']):
-        # Calculate percentage change
-        if row['2018'] > 0:
-            pct_change = (row['change'] / row['2018']) * 100
-            pct_label = f"{pct_change:.1f}%"
-        else:
-            pct_label = "N/A"
-            
-        y_pos = max(row['2018'], row['2024']) + 0.2
-        arrow_color = color_black
-        
-        # Add arrow
-        plt.annotate(
-            pct_label,
-            xy=(idx, y_pos),
-            xytext=(0, 5),
-            textcoords='offset points',
-            ha='center',
-            va='bottom',
-            color=arrow_color,
-            fontweight='bold'
-        )
-
-# Set x-axis labels and ticks
-plt.xticks(x, usage_comparison['service_name'], rotation=45, ha='right', color=color_black)
-plt.yticks(color=color_black)
-
-# Set titles and labels
-plt.title('Technology Usage Comparison (2018 vs 2024)', fontsize=16, color=color_black)
-plt.ylabel('Average Usage (1-5 scale)', fontsize=14, color=color_black)
-plt.legend(facecolor='white', edgecolor=color_black, framealpha=1, labelcolor=color_black)
-plt.grid(axis='y', linestyle='--', alpha=0.3, color=color_gray)
-
-# Style the axes
-for spine in plt.gca().spines.values():
-    spine.set_edgecolor(color_black)
-
-plt.tight_layout()
+def usage_comparison_marks(data, x, bar_width, error_bars=False, significance=False):
+    # 95% bootstrap intervals on each wave's average usage
+    if error_bars:
+        cols = ['USE_' + code for code in data['service']]
+        for offset, wave in [(-bar_width/2, '2018'), (bar_width/2, '2024')]:
+            wave_weights = store.weights(wave, WEIGHTS) if WEIGHTS else None
+            cis = bootstrap_item_cis(store.frame(wave, cols), cols, weights=wave_weights)
+            plt.errorbar(x + offset, cis['mean'], yerr=[cis['mean'] - cis['ci_low'], cis['ci_high'] - cis['mean']],
+                         fmt='none', ecolor=color_black, elinewidth=1, capsize=3)
+
+    # Mark changes that stay significant after Holm correction across the compared services
+    changed = set()
+    if significance:
+        cols = ['USE_' + code for code in data['service']]
+        # Same weight set as the bars and intervals; Mann-Whitney has no weighted form, so weighted runs skip it
+        weighted = {}
+        if WEIGHTS:
+            weighted = {'weights_before': store.weights('2018', WEIGHTS),
+                        'weights_after': store.weights('2024', WEIGHTS),
+                        'tests': ('welch', 'permutation')}
+        tests = compare_waves(store.frame('2018', cols), store.frame('2024', cols), cols, **weighted)
+        changed = set(tests.index[tests['perm_p_adj'] < 0.05])
+
+    # Add change arrows and percentages
+    for idx, (_, row) in enumerate(data.iterrows()):
+        if not np.isnan(row['change']):
+            # Calculate percentage change
+            if row['2018'] > 0:
+                pct_change = (row['change'] / row['2018']) * 100
+                pct_label = f"{pct_change:.1f}%"
+                if 'USE_' + row['service'] in changed:
+                    pct_label += '*'
+            else:
+                pct_label = "N/A"
+
+            y_pos = max(row['2018'], row['2024']) + 0.2
+
+            plt.annotate(
+                pct_label,
+                xy=(idx, y_pos),
+                xytext=(0, 5),
+                textcoords='offset points',
+                ha='center',
+                va='bottom',
+                color=color_black,
+                fontweight='bold'
+            )
+
+USAGE_COMPARISON = ChartSpec(
+    'usage_comparison', 'grouped_bars', lambda: usage_comparison, usage_comparison_marks,
+    label='service_name', series=[('2018', '2018', color_gray), ('2024', '2024', color_gold)],
+    title='Technology Usage Comparison (2018 vs 2024)', ylabel='Average Usage (1-5 scale)', figsize=(14, 8)
+)
 
-plt.show()
+def plot_usage_comparison(error_bars=False, significance=False):
+    """2018 vs 2024 usage grouped bars"""
+    render_chart(USAGE_COMPARISON, error_bars=error_bars, significance=significance)
 
 
 
 #@
 
-# Define your color scheme
-color_black = '#000000'  # Black
-color_gray = '#979797'   # Gray
-color_gold = '#FFBA08'   # Yellow/Gold
-
 # Calculate device ownership percentages
 devices = ['Laptop Computer', 'Smart Phone']
+item_means = aggregates.item_means()
 ownership_percentages = [
-    df['OWN_LC'].mean() * 100,
-    df['OWN_PDA'].mean() * 100
+    item_means['OWN_LC'] * 100,
+    item_means['OWN_PDA'] * 100
 ]
 
-# Create figure with white background
-plt.figure(figsize=(10, 6), facecolor='white')
+def plot_device_ownership():
+    """Device ownership bars"""
+    # Create figure with white background
+    plt.figure(figsize=(10, 6), facecolor='white')
+
+    # Create bars with your colors
+    bars = plt.bar(devices, ownership_percentages, color=[color_black, color_gold], 
+                   edgecolor=color_black, linewidth=1)
 
-# Create bars with your colors
-bars = plt.bar(devices, ownership_percentages, color=[color_black, color_gold], 
-               edgecolor=color_black, linewidth=1)
+    # Add percentage labels on top of bars
+    for bar in bars:
+        height = bar.get_height()
+        plt.text(bar.get_x() + bar.get_width()/2., height + 1,
+                 f'{height:.1f}%',
+                 ha='center', va='bottom', fontsize=12, 
+                 color=color_black, fontweight='bold')
 
-# Add percentage labels on top of bars
-for bar in bars:
-    height = bar.get_height()
-    plt.text(bar.get_x() + bar.get_width()/2., height + 1,
-             f'{height:.1f}%',
-             ha='center', va='bottom', fontsize=12, 
-             color=color_black, fontweight='bold')
+    # Set titles and labels with your colors
+    plt.title('Faculty Device Ownership (2024)', fontsize=16, color=color_black)
+    plt.ylabel('Percentage of Faculty (%)', fontsize=14, color=color_black)
+    plt.ylim(0, 105)  # Set y-axis limit to accommodate percentages and labels
 
-# Set titles and labels with your colors
-plt.title('Faculty Device Ownership (2024)', fontsize=16, color=color_black)
-plt.ylabel('Percentage of Faculty (%)', fontsize=14, color=color_black)
-plt.ylim(0, 105)  # Set y-axis limit to accommodate percentages and labels
+    # Style the tick labels
+    plt.xticks(color=color_black)
+    plt.yticks(color=color_black)
 
-# Style the tick labels
-plt.xticks(color=color_black)
-plt.yticks(color=color_black)
+    # Style the grid
+    plt.grid(axis='y', linestyle='--', alpha=0.3, color=color_gray)
 
-# Style the grid
-plt.grid(axis='y', linestyle='--', alpha=0.3, color=color_gray)
+    # Style the axes
+    style_spines(plt.gca())
 
-# Style the axes
-for spine in plt.gca().spines.values():
-    spine.set_edgecolor(color_black)
+    plt.tight_layout()
+    plt.show()
 
-plt.tight_layout()
-plt.savefig('device_ownership.png', dpi=300, facecolor='white')
-plt.show()
 
 
+##
+
+# Function to prepare the item association matrix
+@traced('prepare')
+def prepare_item_associations(method='spearman', weights=None):
+    # Every Likert item against every other, pairwise-complete
+    cols = item_columns(df.columns)
+    corr = association_matrix(df, cols, method, stored_weights(weights))
+
+    # Drop items that correlate with nothing (no variation), then cluster related items together
+    keep = corr.count() > 1
+    corr = corr.loc[keep, keep]
+    order = cluster_order(corr)
+    return corr.iloc[order, order]
+
+# Prepare the data (Spearman by default; polychoric is computed on request)
+item_associations = prepare_item_associations('spearman', WEIGHTS)
+
+ITEM_ASSOCIATIONS = ChartSpec(
+    'item_associations', 'heatmap', lambda: item_associations,
+    title='How Survey Items Move Together (2024, clustered)',
+    cbar_label='Spearman correlation',
+    heatmap={'vmin': -1, 'vmax': 1, 'center': 0, 'square': True, 'xticklabels': True, 'yticklabels': True,
+             'cbar_kws': {'label': 'Spearman correlation', 'shrink': 0.6}},
+    xticks={'fontsize': 5, 'rotation': 90}, yticks={'fontsize': 5},
+    clear_axis_labels=True, figsize=(16, 14)
+)
 
+def plot_item_associations(method='spearman'):
+    """Clustered heatmap of item-item correlations (black = negative, gold = positive)"""
+    if method == 'spearman':
+        render_chart(ITEM_ASSOCIATIONS)
+        return
 
+    label = f'{method.title()} correlation'
+    spec = ITEM_ASSOCIATIONS.with_options(cbar_label=label, heatmap={**ITEM_ASSOCIATIONS.options['heatmap'],
+                                                                     'cbar_kws': {'label': label, 'shrink': 0.6}})
+    render_chart(spec, prepare_item_associations(method, WEIGHTS))
 
 
 
+
+###
+
+# Division heatmap, service quality radar and skill-gap bars per demographic facet (small multiples)
+@traced('prepare')
+def prepare_usage_by_division_facets(by=FACET_KEYS, min_respondents=MIN_RESPONDENTS, weights=None):
+    # One grouped pass over the USE_ block; every facet lines up with the heatmap's divisions and services
+    facets = facet_stats(wave('2024').items('USE_*').weighted(weights), by, ['ADIV'], min_respondents)
+    for facet, usage in facets.items():
+        usage.columns = CODEBOOK.relabel_items(usage.columns)
+        facets[facet] = usage.reindex(index=pivot_df.index, columns=pivot_df.columns)
+    return facets
+
+@traced('prepare')
+def prepare_service_quality_facets(by=FACET_KEYS, min_respondents=MIN_RESPONDENTS, weights=None):
+    query = wave('2024').items(*[staff['prefix'] + '*' for staff in staff_attributes]).weighted(weights)
+    order = service_quality['service']
+    return {facet: service_quality_frame(means).set_index('service').reindex(order).reset_index()
+            for facet, means in facet_stats(query, by, min_respondents=min_respondents).items()}
+
+@traced('prepare')
+def prepare_skill_gap_facets(by=FACET_KEYS, min_respondents=MIN_RESPONDENTS, weights=None):
+    # Services stay in the overall chart's order so bars line up across facets
+    query = wave('2024').items('SKL_*', 'LRN_*').weighted(weights)
+    order = skill_gap_data['service']
+    return {facet: skill_gap_frame(means).set_index('service').reindex(order).reset_index()
+            for facet, means in facet_stats(query, by, min_respondents=min_respondents).items()}
+
+FACET_CHARTS = {
+    'usage_by_division': (USAGE_BY_DIVISION, prepare_usage_by_division_facets),
+    'service_quality': (SERVICE_QUALITY, prepare_service_quality_facets),
+    'skill_gap': (SKILL_GAP, prepare_skill_gap_facets)
+}
+
+def plot_facets(chart, out_dir, by=FACET_KEYS, min_respondents=MIN_RESPONDENTS, dpi=150):
+    """Small multiples of one chart in FACET_CHARTS, one PNG per demographic facet in out_dir"""
+    spec, prepare = FACET_CHARTS[chart]
+    return render_facets(spec, prepare(by, min_respondents, WEIGHTS), out_dir, dpi=dpi)
+
+
+
+# Display all the charts one by one
+if __name__ == '__main__':
+    plot_importance_satisfaction()
+    plot_usage_by_division()
+    plot_service_quality()
+    plot_staff_composites()
+    plot_skill_gap()
+    plot_usage_comparison()
+    plot_device_ownership()
+    plot_item_associations()
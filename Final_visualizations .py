@@ -3,56 +3,34 @@ import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.ticker as mtick
 import seaborn as sns
-from matplotlib.colors import LinearSegmentedColormap
 from matplotlib.patches import Patch
 from matplotlib.lines import Line2D
 
+from charts import COLOR_SCHEME, SHARE_CMAP, ChartSpec, render_chart, set_common_style
+from label_layout import label_points
+from wave_metrics import AGE_GROUPS, TENURE_GROUPS, usage_change_cis, usage_change_tests, usage_table, wave_metrics
+from weighting import selected_weights
+
 # Set consistent styling for all plots
 plt.style.use('seaborn-v0_8-whitegrid')
 
-# Define the color scheme (black, gray, yellow) as shown in the image
-COLOR_SCHEME = ['#000000', '#999999', '#FFC107']  # Black, Gray, Yellow/Gold
-
-# Custom colormap for heatmaps
-custom_cmap = LinearSegmentedColormap.from_list('custom_cmap', 
-                                              ['#FFFFFF', '#FFC107', '#000000'], 
-                                              N=100)
-
-def set_common_style(ax, title, xlabel=None, ylabel=None):
-    """Apply common styling elements to matplotlib axes"""
-    ax.set_title(title, fontsize=14, fontweight='bold', pad=20)
-    if xlabel:
-        ax.set_xlabel(xlabel, fontsize=12)
-    if ylabel:
-        ax.set_ylabel(ylabel, fontsize=12)
-    ax.spines['top'].set_visible(False)
-    ax.spines['right'].set_visible(False)
-    ax.tick_params(axis='both', labelsize=10)
-    ax.grid(False)  # Turn off grid for cleaner look
+# Survey weight set named by MISO_WEIGHTS (None = unweighted)
+WEIGHTS = selected_weights()
 
 #################################
 # 1. Technology Use by Age Group (2018 vs 2024)
 #################################
 
 def plot_tech_by_age():
-    # Data based on actual analysis of CSV files
-    age_groups = ["21-30", "31-40", "41-50", "51-60", "61+"]
+    # Data computed from the cleaned CSV files
+    age_groups = AGE_GROUPS
+    services = ["CMS", "SWC", "VPN", "ITS"]
     
     # 2018 data (normalized to 0-1 scale for consistency)
-    tech_2018 = {
-        "CMS": [5.0/5, 3.84/5, 4.08/5, 3.86/5, 3.80/5],
-        "SWC": [1.0/5, 1.68/5, 1.52/5, 1.51/5, 1.37/5],
-        "VPN": [1.0/5, 1.45/5, 1.30/5, 1.62/5, 1.14/5],
-        "ITS": [2.0/5, 2.19/5, 2.03/5, 2.03/5, 1.67/5]
-    }
+    tech_2018 = usage_table(wave_metrics('2018', weights=WEIGHTS), 'usage_by_age', services)
     
     # 2024 data (normalized to 0-1 scale for consistency)
-    tech_2024 = {
-        "CMS": [5.0/5, 5.0/5, 4.81/5, 4.83/5, 4.81/5],
-        "SWC": [3.5/5, 3.25/5, 3.38/5, 3.87/5, 3.78/5],
-        "VPN": [1.5/5, 1.2/5, 1.35/5, 1.49/5, 1.32/5],
-        "ITS": [2.67/5, 1.7/5, 2.16/5, 1.97/5, 2.03/5]
-    }
+    tech_2024 = usage_table(wave_metrics('2024', weights=WEIGHTS), 'usage_by_age', services)
     
     # Create two subplots
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 5))
@@ -85,25 +63,16 @@ def plot_tech_by_age():
 #################################
 
 def plot_tech_by_tenure():
-    # Data based on actual analysis of CSV files
+    # Data computed from the cleaned CSV files
     # Tenure status categories
-    tenure_groups = ["Tenured", "Tenure Track", "Not Tenured"]
+    tenure_groups = TENURE_GROUPS
+    services = ["CMS", "SWC", "VPN", "ITS"]
     
     # 2018 data (normalized to 0-1 scale for consistency)
-    tenure_tech_2018 = {
-        "CMS": [4.16/5, 3.72/5, 3.83/5],
-        "SWC": [1.68/5, 1.51/5, 1.35/5],
-        "VPN": [1.43/5, 1.49/5, 1.30/5],
-        "ITS": [2.20/5, 1.94/5, 1.80/5]
-    }
+    tenure_tech_2018 = usage_table(wave_metrics('2018', weights=WEIGHTS), 'usage_by_tenure', services)
     
     # 2024 data (normalized to 0-1 scale for consistency)
-    tenure_tech_2024 = {
-        "CMS": [4.92/5, 4.93/5, 4.70/5],
-        "SWC": [3.99/5, 4.27/5, 2.87/5],
-        "VPN": [1.63/5, 1.13/5, 1.02/5],
-        "ITS": [2.15/5, 1.93/5, 1.81/5]
-    }
+    tenure_tech_2024 = usage_table(wave_metrics('2024', weights=WEIGHTS), 'usage_by_tenure', services)
     
     # Create two subplots
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 5))
@@ -135,25 +104,17 @@ def plot_tech_by_tenure():
 # 3. ROI Matrix: Importance vs Satisfaction (2018 vs 2024)
 #################################
 
-def plot_roi_matrix():
-    # Data based on actual analysis of CSV files
+def plot_roi_matrix(composites=False, label_layout=False):
+    # Data computed from the cleaned CSV files
     # Selected key technologies for comparison
-    roi_data_2018 = [
-        {"system": "CMS", "importance": 3.38/5, "satisfaction": 3.52/5},
-        {"system": "SWC", "importance": 2.30/5, "satisfaction": 3.24/5},
-        {"system": "ERPSS", "importance": 3.80/5, "satisfaction": 3.57/5},
-        {"system": "VPN", "importance": 2.72/5, "satisfaction": 3.44/5}
-    ]
+    systems_2018 = ["CMS", "SWC", "ERPSS", "VPN"]
+    systems_2024 = ["CMS", "SWC", "ERPSS", "GAIT"]
     
-    roi_data_2024 = [
-        {"system": "CMS", "importance": 3.88/5, "satisfaction": 3.75/5},
-        {"system": "SWC", "importance": 3.63/5, "satisfaction": 3.87/5},
-        {"system": "ERPSS", "importance": 3.34/5, "satisfaction": 3.63/5},
-        {"system": "GAIT", "importance": 2.10/5, "satisfaction": 3.07/5}
-    ]
+    imp_sat_2018 = wave_metrics('2018', weights=WEIGHTS)['imp_sat']
+    imp_sat_2024 = wave_metrics('2024', weights=WEIGHTS)['imp_sat']
     
-    df_2018 = pd.DataFrame(roi_data_2018)
-    df_2024 = pd.DataFrame(roi_data_2024)
+    df_2018 = (imp_sat_2018.loc[systems_2018, ['importance', 'satisfaction']] / 5).rename_axis('system').reset_index()
+    df_2024 = (imp_sat_2024.loc[systems_2024, ['importance', 'satisfaction']] / 5).rename_axis('system').reset_index()
     
     # Create two subplots
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6))
@@ -163,10 +124,13 @@ def plot_roi_matrix():
                color=COLOR_SCHEME[0], alpha=0.7)
     
     # Add tool names as labels
-    for i, txt in enumerate(df_2018['system']):
-        ax1.annotate(txt, (df_2018['importance'][i], df_2018['satisfaction'][i]), 
-                    fontsize=9, ha='center', va='bottom',
-                    xytext=(0, 5), textcoords='offset points')
+    if label_layout:
+        label_points(ax1, df_2018['importance'], df_2018['satisfaction'], df_2018['system'], offset=(0, 5), fontsize=9)
+    else:
+        for i, txt in enumerate(df_2018['system']):
+            ax1.annotate(txt, (df_2018['importance'][i], df_2018['satisfaction'][i]), 
+                        fontsize=9, ha='center', va='bottom',
+                        xytext=(0, 5), textcoords='offset points')
     
     # Draw quadrant lines
     ax1.axhline(y=0.5, color='gray', linestyle='--', alpha=0.5)
@@ -194,10 +158,13 @@ def plot_roi_matrix():
                color=COLOR_SCHEME[2], alpha=0.7)
     
     # Add tool names as labels
-    for i, txt in enumerate(df_2024['system']):
-        ax2.annotate(txt, (df_2024['importance'][i], df_2024['satisfaction'][i]), 
-                    fontsize=9, ha='center', va='bottom',
-                    xytext=(0, 5), textcoords='offset points')
+    if label_layout:
+        label_points(ax2, df_2024['importance'], df_2024['satisfaction'], df_2024['system'], offset=(0, 5), fontsize=9)
+    else:
+        for i, txt in enumerate(df_2024['system']):
+            ax2.annotate(txt, (df_2024['importance'][i], df_2024['satisfaction'][i]), 
+                        fontsize=9, ha='center', va='bottom',
+                        xytext=(0, 5), textcoords='offset points')
     
     # Draw quadrant lines
     ax2.axhline(y=0.5, color='gray', linestyle='--', alpha=0.5)
@@ -220,6 +187,16 @@ def plot_roi_matrix():
     set_common_style(ax2, "Importance vs. Satisfaction (2024)", 
                    xlabel="Perceived Importance", ylabel="User Satisfaction")
     
+    # Whole IMP_ and DS_ families as composite scales, with their reliability
+    if composites:
+        for ax, wave, color in ((ax1, '2018', COLOR_SCHEME[0]), (ax2, '2024', COLOR_SCHEME[2])):
+            metrics = wave_metrics(wave, weights=WEIGHTS)
+            x, y = metrics['composites']['IMP'] / 5, metrics['composites']['DS'] / 5
+            alphas = metrics['scales']['alpha']
+            ax.scatter([x], [y], marker='*', s=250, color=color, edgecolor='black', zorder=3)
+            ax.annotate(f"All services\n(\u03b1 = {alphas['IMP']:.2f} / {alphas['DS']:.2f})", (x, y),
+                        fontsize=8, ha='left', va='top', xytext=(6, -4), textcoords='offset points')
+    
     plt.tight_layout()
     plt.show()
     
@@ -229,20 +206,22 @@ def plot_roi_matrix():
 # 4. Strategic Quadrant Analysis
 #################################
 
-def plot_strategic_quadrants():
-    # Data based on actual analysis of CSV files
+def plot_strategic_quadrants(error_bars=False, composites=False, label_layout=False):
+    # Quadrant of each tool; usage comes from the waves, with the same weight set as the error bars
     quadrant_data = [
-        {"tool": "CMS", "usage2018": 3.89/5, "usage2024": 4.85/5, "quadrant": "Core Growth"},
-        {"tool": "TMS", "usage2018": 3.77/5, "usage2024": 4.13/5, "quadrant": "Core Growth"},
-        {"tool": "SWC", "usage2018": 1.50/5, "usage2024": 3.65/5, "quadrant": "Emerging Tools"},
-        {"tool": "STMS", "usage2018": 2.07/5, "usage2024": 2.18/5, "quadrant": "Legacy Reliance"},
-        {"tool": "FPC", "usage2018": 2.20/5, "usage2024": 2.31/5, "quadrant": "Legacy Reliance"},
-        {"tool": "VPN", "usage2018": 1.40/5, "usage2024": 1.39/5, "quadrant": "Sunset Candidates"},
-        {"tool": "AORO", "usage2018": 3.70/5, "usage2024": 3.21/5, "quadrant": "Legacy Reliance"},
-        {"tool": "ERPSS", "usage2018": 4.49/5, "usage2024": 2.93/5, "quadrant": "Legacy Reliance"}
+        {"tool": "CMS", "quadrant": "Core Growth"},
+        {"tool": "TMS", "quadrant": "Core Growth"},
+        {"tool": "SWC", "quadrant": "Emerging Tools"},
+        {"tool": "STMS", "quadrant": "Legacy Reliance"},
+        {"tool": "FPC", "quadrant": "Legacy Reliance"},
+        {"tool": "VPN", "quadrant": "Sunset Candidates"},
+        {"tool": "AORO", "quadrant": "Legacy Reliance"},
+        {"tool": "ERPSS", "quadrant": "Legacy Reliance"}
     ]
     
     df = pd.DataFrame(quadrant_data)
+    df['usage2018'] = usage_table(wave_metrics('2018', weights=WEIGHTS), 'usage', df['tool']).to_numpy()
+    df['usage2024'] = usage_table(wave_metrics('2024', weights=WEIGHTS), 'usage', df['tool']).to_numpy()
     
     # Define quadrant colors
     quadrant_colors = {
@@ -261,13 +240,26 @@ def plot_strategic_quadrants():
     # Plot data points
     scatter = ax.scatter(df['usage2018'], df['usage2024'], c=colors, s=100, alpha=0.7)
     
+    # 95% bootstrap intervals on each wave's usage
+    if error_bars:
+        cis = usage_change_cis(df['tool'], weights=WEIGHTS).loc[df['tool']]
+        xerr = [df['usage2018'].to_numpy() - cis['before_ci_low'].to_numpy(),
+                cis['before_ci_high'].to_numpy() - df['usage2018'].to_numpy()]
+        yerr = [df['usage2024'].to_numpy() - cis['after_ci_low'].to_numpy(),
+                cis['after_ci_high'].to_numpy() - df['usage2024'].to_numpy()]
+        ax.errorbar(df['usage2018'], df['usage2024'], xerr=np.clip(xerr, 0, None), yerr=np.clip(yerr, 0, None),
+                    fmt='none', ecolor=COLOR_SCHEME[1], elinewidth=1, capsize=3, alpha=0.8)
+    
     # Add tool labels
-    for i, row in df.iterrows():
-        ax.annotate(row['tool'], 
-                   (row['usage2018'], row['usage2024']),
-                   xytext=(5, 5),
-                   textcoords="offset points",
-                   fontsize=9, fontweight='bold')
+    if label_layout:
+        label_points(ax, df['usage2018'], df['usage2024'], df['tool'], offset=(5, 5), fontsize=9, fontweight='bold')
+    else:
+        for i, row in df.iterrows():
+            ax.annotate(row['tool'], 
+                       (row['usage2018'], row['usage2024']),
+                       xytext=(5, 5),
+                       textcoords="offset points",
+                       fontsize=9, fontweight='bold')
     
     # Draw quadrant lines (at 50% for both axes)
     ax.axhline(y=0.5, color='gray', linestyle='--', alpha=0.5)
@@ -292,6 +284,15 @@ def plot_strategic_quadrants():
     ]
     ax.legend(handles=legend_elements, loc='upper left', fontsize=9)
     
+    # The whole USE_ family as one composite usage scale per wave
+    if composites:
+        before, after = wave_metrics('2018', weights=WEIGHTS), wave_metrics('2024', weights=WEIGHTS)
+        x, y = before['composites']['USE'] / 5, after['composites']['USE'] / 5
+        ax.scatter([x], [y], marker='*', s=250, color=COLOR_SCHEME[1], edgecolor='black', zorder=3)
+        ax.annotate(f"All tools\n(\u03b1 = {before['scales'].loc['USE', 'alpha']:.2f} / "
+                    f"{after['scales'].loc['USE', 'alpha']:.2f})", (x, y),
+                    fontsize=8, ha='left', va='top', xytext=(6, -4), textcoords='offset points')
+    
     ax.set_xlim(0, 1.0)
     ax.set_ylim(0, 1.0)
     ax.xaxis.set_major_formatter(mtick.PercentFormatter(1.0))
@@ -309,17 +310,10 @@ def plot_strategic_quadrants():
 #################################
 
 def plot_teaching_modalities():
-    # Data based on actual analysis of CSV files
+    # Data computed from the cleaned CSV files
     # TREM values represent teaching modality (in-person vs remote)
-    modality_data = [
-        {"modality": "Entirely in-person", "percentage": 0.331},
-        {"modality": "Mostly in-person", "percentage": 0.423},
-        {"modality": "Equal mix", "percentage": 0.153},
-        {"modality": "Mostly remote", "percentage": 0.037},
-        {"modality": "Entirely remote", "percentage": 0.055}
-    ]
-    
-    df = pd.DataFrame(modality_data)
+    shares = wave_metrics('2024', weights=WEIGHTS)['modality_shares']
+    df = pd.DataFrame({"modality": shares.index, "percentage": shares.values})
     
     # Create bar chart
     fig, ax = plt.subplots(figsize=(10, 6))
@@ -351,17 +345,10 @@ def plot_teaching_modalities():
 #################################
 
 def plot_instruction_types():
-    # Data based on actual analysis of CSV files
+    # Data computed from the cleaned CSV files
     # TLIVE values represent synchronous vs asynchronous teaching
-    instruction_data = [
-        {"type": "Entirely live", "percentage": 0.393},
-        {"type": "Mostly live", "percentage": 0.454},
-        {"type": "Equal mix", "percentage": 0.098},
-        {"type": "Mostly recorded", "percentage": 0.031},
-        {"type": "Entirely recorded", "percentage": 0.025}
-    ]
-    
-    df = pd.DataFrame(instruction_data)
+    shares = wave_metrics('2024', weights=WEIGHTS)['instruction_shares']
+    df = pd.DataFrame({"type": shares.index, "percentage": shares.values})
     
     # Create bar chart
     fig, ax = plt.subplots(figsize=(10, 6))
@@ -393,41 +380,14 @@ def plot_instruction_types():
 #################################
 
 def plot_teaching_relationship():
-    # Data based on cross-tabulation of TREM and TLIVE values
+    # Cross-tabulation of TREM and TLIVE values computed from the cleaned CSV files
     # These represent counts of faculty in each combination
-    cross_data = {
-        "1-1": 36, # Entirely in-person & Entirely live
-        "1-2": 18, # Entirely in-person & Mostly live
-        "2-1": 16, # Mostly in-person & Entirely live
-        "2-2": 42, # Mostly in-person & Mostly live
-        "2-3": 5,  # Mostly in-person & Equal mix
-        "2-4": 3,  # Mostly in-person & Mostly recorded
-        "2-5": 3,  # Mostly in-person & Entirely recorded
-        "3-1": 9,  # Equal mix & Entirely live
-        "3-2": 8,  # Equal mix & Mostly live
-        "3-3": 7,  # Equal mix & Equal mix
-        "3-4": 1,  # Equal mix & Mostly recorded
-        "4-1": 2,  # Mostly remote & Entirely live
-        "4-2": 3,  # Mostly remote & Mostly live
-        "4-3": 1,  # Mostly remote & Equal mix
-        "5-1": 1,  # Entirely remote & Entirely live
-        "5-2": 3,  # Entirely remote & Mostly live
-        "5-3": 3,  # Entirely remote & Equal mix
-        "5-4": 1,  # Entirely remote & Mostly recorded
-        "5-5": 1   # Entirely remote & Entirely recorded
-    }
+    cross_data = wave_metrics('2024', weights=WEIGHTS)['modality_crosstab']
     
-    # Create a matrix representation
-    trem_labels = ["Entirely in-person", "Mostly in-person", "Equal mix", "Mostly remote", "Entirely remote"]
-    tlive_labels = ["Entirely live", "Mostly live", "Equal mix", "Mostly recorded", "Entirely recorded"]
-    
-    # Initialize matrix with zeros
-    matrix = np.zeros((5, 5))
-    
-    # Fill matrix with counts
-    for key, count in cross_data.items():
-        trem, tlive = map(int, key.split('-'))
-        matrix[trem-1, tlive-1] = count
+    # Row/column labels come straight from the cross-tabulation
+    trem_labels = list(cross_data.index)
+    tlive_labels = list(cross_data.columns)
+    matrix = cross_data.to_numpy(dtype=float)
     
     # Convert to percentages of total
     total = np.sum(matrix)
@@ -437,7 +397,7 @@ def plot_teaching_relationship():
     fig, ax = plt.subplots(figsize=(12, 8))
     
     # Use custom colormap
-    heatmap = ax.pcolor(matrix_pct, cmap=custom_cmap)
+    heatmap = ax.pcolor(matrix_pct, cmap=SHARE_CMAP)
     
     # Set tick positions and labels
     ax.set_xticks(np.arange(len(tlive_labels)) + 0.5)
@@ -472,23 +432,20 @@ def plot_teaching_relationship():
 # 8. Technology Growth from 2018 to 2024
 #################################
 
-def plot_tech_growth():
-    # Data based on actual analysis of CSV files
-    # Showing the technologies with the most significant changes
-    tech_growth_data = [
-        {"technology": "Web Conferencing", "usage2018": 1.50/5, "usage2024": 3.65/5, "growth": 0.43},
-        {"technology": "Canvas LMS", "usage2018": 3.89/5, "usage2024": 4.85/5, "growth": 0.19},
-        {"technology": "Turnitin", "usage2018": 3.77/5, "usage2024": 4.13/5, "growth": 0.07},
-        {"technology": "Faculty Profile", "usage2018": 2.20/5, "usage2024": 2.31/5, "growth": 0.02},
-        {"technology": "VPN", "usage2018": 1.40/5, "usage2024": 1.39/5},
-        {"technology": "VPN", "usage2018": 1.40/5, "usage2024": 1.39/5, "growth": 0.00},
-        {"technology": "Library Catalog", "usage2018": 2.09/5, "usage2024": 2.06/5, "growth": -0.01},
-        {"technology": "Academic Outreach", "usage2018": 3.70/5, "usage2024": 3.21/5, "growth": -0.10},
-        {"technology": "ERP Systems", "usage2018": 4.49/5, "usage2024": 2.93/5, "growth": -0.31}
-    ]
+def plot_tech_growth(error_bars=False, significance=False):
+    # Technologies with the most significant changes, by their USE_ service codes
+    tech_codes = {"Web Conferencing": "SWC", "Canvas LMS": "CMS", "Turnitin": "TMS", "Faculty Profile": "FPC",
+                  "VPN": "VPN", "Library Catalog": "CWS", "Academic Outreach": "AORO", "ERP Systems": "ERPSS"}
+    services = list(tech_codes.values())
+
+    # Change in usage rate from the waves, with the same weight set as the error bars and stars
+    before = usage_table(wave_metrics('2018', weights=WEIGHTS), 'usage', services)
+    after = usage_table(wave_metrics('2024', weights=WEIGHTS), 'usage', services)
+    df = pd.DataFrame({'technology': list(tech_codes), 'usage2018': before.to_numpy(), 'usage2024': after.to_numpy()})
+    df['growth'] = df['usage2024'] - df['usage2018']
     
     # Sort by growth
-    df = pd.DataFrame(tech_growth_data).sort_values('growth', ascending=False)
+    df = df.sort_values('growth', ascending=False)
     
     # Create horizontal bar chart
     fig, ax = plt.subplots(figsize=(10, 6))
@@ -499,12 +456,26 @@ def plot_tech_growth():
     # Create horizontal bars
     bars = ax.barh(df['technology'], df['growth'], color=colors, alpha=0.8)
     
+    # 95% bootstrap intervals on the change in usage
+    if error_bars:
+        cis = usage_change_cis(services, weights=WEIGHTS).loc[df['technology'].map(tech_codes)]
+        xerr = [df['growth'].to_numpy() - cis['ci_low'].to_numpy(), cis['ci_high'].to_numpy() - df['growth'].to_numpy()]
+        ax.errorbar(df['growth'], df['technology'], xerr=np.clip(xerr, 0, None),
+                    fmt='none', ecolor=COLOR_SCHEME[0], elinewidth=1, capsize=3)
+    
+    # Star changes that stay significant after Holm correction across the technologies
+    stars = [''] * len(df)
+    if significance:
+        tests = usage_change_tests(services, weights=WEIGHTS)
+        stars = np.where(tests.loc[df['technology'].map(tech_codes), 'perm_p_adj'] < 0.05, '*', '')
+
     # Add percentage labels
-    for bar in bars:
-        width = bar.get_width()
+    for bar, star in zip(bars, stars):
+        # Labels show whole percents, so a change that rounds to zero reads as 0% (not -0%)
+        width = round(bar.get_width(), 2) + 0.0
         label_x = max(width + 0.02, 0.02) if width >= 0 else min(width - 0.08, -0.08)
         align = 'left' if width >= 0 else 'right'
-        ax.annotate(f'{width:.0%}',
+        ax.annotate(f'{width:.0%}{star}',
                    xy=(label_x, bar.get_y() + bar.get_height()/2),
                    xytext=(0, 0),
                    textcoords="offset points",
@@ -606,7 +577,7 @@ def plot_skill_learning_gap():
 # 10. Year-over-Year Technology Growth Projection
 #################################
 
-def plot_tech_projection():
+def projection_data():
     # Create projected data based on observed trends
     # Web conferencing shows dramatic growth after 2020 (pandemic)
     # AI tools (GAIT) show emerging growth from 2022 onward
@@ -619,32 +590,20 @@ def plot_tech_projection():
         "AI Tools": [0.05, 0.06, 0.08, 0.10, 0.25, 0.37, 0.48, 0.65],
         "Student Mgmt": [0.41, 0.42, 0.43, 0.43, 0.44, 0.44, 0.44, 0.45]
     }
-    
-    # Create area chart
-    fig, ax = plt.subplots(figsize=(12, 6))
-    
-    # Plot data
-    ax.fill_between(years, tech_data["Canvas LMS"], alpha=0.7, color=COLOR_SCHEME[0], label="Canvas LMS")
-    ax.fill_between(years, tech_data["Web Conferencing"], alpha=0.7, color=COLOR_SCHEME[1], label="Web Conferencing")
-    ax.fill_between(years, tech_data["ERP Systems"], alpha=0.7, color="#AAAAAA", label="ERP Systems")
-    ax.fill_between(years, tech_data["AI Tools"], alpha=0.7, color=COLOR_SCHEME[2], label="AI Tools")
-    ax.fill_between(years, tech_data["Student Mgmt"], alpha=0.7, color="#CCCCCC", label="Student Mgmt")
-    
-    # Add lines for each technology
-    for tech, color in zip(tech_data.keys(), [COLOR_SCHEME[0], COLOR_SCHEME[1], "#AAAAAA", COLOR_SCHEME[2], "#CCCCCC"]):
-        ax.plot(years, tech_data[tech], color=color, linewidth=2)
-    
+    return pd.DataFrame(tech_data, index=years)
+
+def projection_marks(ax, data):
     # Highlight AI growth with an annotation
-    ai_growth = tech_data["AI Tools"][-1] - tech_data["AI Tools"][4]
+    ai_growth = data["AI Tools"][2025] - data["AI Tools"][2022]
     ax.annotate(f'+{ai_growth:.0%} growth\nsince 2022', 
-               xy=(2024, tech_data["AI Tools"][6]), 
+               xy=(2024, data["AI Tools"][2024]), 
                xytext=(2021, 0.30),
                arrowprops=dict(facecolor='black', shrink=0.05, width=1.5, headwidth=8),
                fontsize=10, fontweight='bold')
     
     # Highlight pandemic effect on web conferencing
     ax.annotate('Pandemic effect', 
-               xy=(2020, tech_data["Web Conferencing"][2]), 
+               xy=(2020, data["Web Conferencing"][2020]), 
                xytext=(2019, 0.50),
                arrowprops=dict(facecolor='black', shrink=0.05, width=1.5, headwidth=8),
                fontsize=10, fontweight='bold')
@@ -652,29 +611,28 @@ def plot_tech_projection():
     # Add vertical line for current year
     ax.axvline(x=2024, color='gray', linestyle='--', alpha=0.5)
     ax.text(2024.1, 0.02, 'Current', rotation=90, fontsize=8, alpha=0.7)
-    
-    # Customize plot
-    ax.set_xlim(2018, 2025)
-    ax.set_ylim(0, 1.0)
-    ax.yaxis.set_major_formatter(mtick.PercentFormatter(1.0))
-    set_common_style(ax, "Technology Adoption Trends & Projection (2018-2025)", 
-                   xlabel="Year", ylabel="Faculty Usage Rate")
-    
-    ax.legend(loc='upper center', bbox_to_anchor=(0.5, -0.15), ncol=5, fontsize=10)
-    
-    plt.tight_layout()
-    plt.show()
+
+TECH_PROJECTION = ChartSpec(
+    'tech_projection', 'area', projection_data, projection_marks,
+    series=[("Canvas LMS", COLOR_SCHEME[0]), ("Web Conferencing", COLOR_SCHEME[1]), ("ERP Systems", "#AAAAAA"),
+            ("AI Tools", COLOR_SCHEME[2]), ("Student Mgmt", "#CCCCCC")],
+    title="Technology Adoption Trends & Projection (2018-2025)", xlabel="Year", ylabel="Faculty Usage Rate"
+)
+
+def plot_tech_projection():
+    render_chart(TECH_PROJECTION)
     
     return "This visualization shows key technology adoption trends and projections based on observed data. Canvas LMS has seen steady growth, reaching near-universal adoption (97%) in 2024 with minimal additional growth projected. Web Conferencing usage jumped dramatically during the pandemic (from 33% to 65%) and has stabilized around 73% with minimal projected growth. ERP Systems show consistent decline, from 90% in 2018 to 59% in 2024, projected to continue falling. The most dramatic trend is AI Tools, which began accelerating in 2022 (25%) and are projected to reach 65% adoption by 2025, representing the fastest-growing technology category. Student Management Systems show flat usage around 44% throughout the period, suggesting they've reached saturation with current features and implementation."
 
 # Display all the visualizations one by one
-plot_tech_by_age()
-plot_tech_by_tenure()
-plot_roi_matrix()
-plot_strategic_quadrants()
-plot_teaching_modalities()
-plot_instruction_types()
-plot_teaching_relationship()
-plot_tech_growth()
-plot_skill_learning_gap()
-plot_tech_projection()
\ No newline at end of file
+if __name__ == '__main__':
+    plot_tech_by_age()
+    plot_tech_by_tenure()
+    plot_roi_matrix()
+    plot_strategic_quadrants()
+    plot_teaching_modalities()
+    plot_instruction_types()
+    plot_teaching_relationship()
+    plot_tech_growth()
+    plot_skill_learning_gap()
+    plot_tech_projection()
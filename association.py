@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+All-pairs association matrices (Pearson, Spearman, polychoric) for survey items.
+
+Missing answers are handled pairwise-complete without looping over pairs:
+
+- Pearson comes from masked matrix products. With M the answered mask and
+  X the answers zero-filled, M'M counts the rows both items answered, and
+  X'M, (X*X)'M and X'X give the sums needed for each pair's correlation.
+- Spearman and polychoric come from every pair's contingency table at
+  once. One-hot level codes are multiplied with themselves, and a missing
+  answer has an all-zero one-hot row. Spearman is the Pearson correlation
+  of each pair's own midranks taken from the table margins. Polychoric is
+  the two-step estimate: thresholds from the margins, then a per-pair
+  maximum-likelihood fit of rho, vectorized over all pairs.
+
+Both statistics are sums over rows, so data can be fed in blocks or chunks
+(pooled waves, streamed exports) and added up.
+
+    python association.py 2024 --method spearman --item USE_GAIT
+"""
+
+import argparse
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from crosstab import encode, item_levels
+from survey_metrics import as_weights, item_columns, item_matrix
+
+METHODS = ('pearson', 'spearman', 'polychoric')
+
+# Gauss-Legendre nodes on [-1, 1] for the bivariate normal integral
+_GL_NODES, _GL_WEIGHTS = np.polynomial.legendre.leggauss(20)
+_NORMAL = NormalDist()
+
+
+class PairwiseSums:
+    """Pairwise-complete count, sums and cross-products of a block of items, mergeable by addition"""
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        k = len(self.columns)
+        self.n = np.zeros((k, k))
+        self.sx = np.zeros((k, k))      # sx[i, j]: sum of item i over rows where i and j were answered
+        self.sxx = np.zeros((k, k))
+        self.sxy = np.zeros((k, k))
+
+    def add(self, values, weights=None, block=4096):
+        """Fold a (rows x items) float block with NaN for missing into the sums"""
+        values = np.asarray(values, dtype=np.float64)
+        weights = as_weights(weights)
+        for start in range(0, len(values), block):
+            chunk = values[start:start + block]
+            mask = ~np.isnan(chunk)
+            filled = np.where(mask, chunk, 0.0)
+            answered = mask.astype(np.float64)
+            if weights is not None:
+                answered = answered * weights[start:start + block, np.newaxis]
+            self.n += mask.T @ answered
+            self.sx += filled.T @ answered
+            self.sxx += (filled * filled).T @ answered
+            self.sxy += filled.T @ (filled * answered)
+        return self
+
+    def merge(self, other):
+        if other.columns != self.columns:
+            raise ValueError("Cannot merge pairwise sums over different items")
+        self.n += other.n
+        self.sx += other.sx
+        self.sxx += other.sxx
+        self.sxy += other.sxy
+        return self
+
+    def covariance(self):
+        """Pairwise-complete sample covariances (items x items array, NaN below two answers)"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cov = (self.sxy - self.sx * self.sx.T / self.n) / (self.n - 1)
+        return np.where(self.n > 1, cov, np.nan)
+
+    def correlation(self):
+        """Pairwise-complete Pearson correlations (NaN where a pair has no variance)"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cov = self.sxy - self.sx * self.sx.T / self.n
+            var_x = self.sxx - self.sx ** 2 / self.n
+            corr = cov / np.sqrt(var_x * var_x.T)
+        corr[~np.isfinite(corr)] = np.nan
+        return pd.DataFrame(np.clip(corr, -1, 1), index=self.columns, columns=self.columns)
+
+
+class PairwiseTables:
+    """Contingency tables of every item pair (items x levels x items x levels), mergeable by addition"""
+
+    def __init__(self, columns, levels):
+        self.columns = list(columns)
+        self.levels = [list(lv) for lv in levels]
+        self.width = max((len(lv) for lv in self.levels), default=0)
+        k = len(self.columns)
+        self.tables = np.zeros((k, self.width, k, self.width))
+
+    @classmethod
+    def from_frame(cls, df, cols=None, levels=None, weights=None, block=4096):
+        """Tables of a frame's items; levels default to each family's answer codes"""
+        cols = item_columns(df.columns) if cols is None else list(cols)
+        encoded = [encode(df[col].array, lv if lv is not None else item_levels(col))
+                   for col, lv in zip(cols, levels or [None] * len(cols))]
+        tables = cls(cols, [lv for _, lv in encoded])
+        return tables.add(np.column_stack([c for c, _ in encoded]), weights, block)
+
+    def add(self, codes, weights=None, block=4096):
+        """Fold a (rows x items) block of level codes (-1 for missing) into the tables"""
+        codes = np.asarray(codes, dtype=np.int64)
+        weights = as_weights(weights)
+        k, width = len(self.columns), self.width
+        offsets = np.arange(k) * width
+        flat = self.tables.reshape(k * width, k * width)
+        for start in range(0, len(codes), block):
+            chunk = codes[start:start + block]
+            rows, items = np.nonzero(chunk >= 0)
+            onehot = np.zeros((len(chunk), k * width))
+            onehot[rows, offsets[items] + chunk[rows, items]] = 1.0
+            weighted = onehot if weights is None else onehot * weights[start:start + block, np.newaxis]
+            flat += weighted.T @ onehot
+        return self
+
+    def merge(self, other):
+        if other.columns != self.columns or other.levels != self.levels:
+            raise ValueError("Cannot merge pairwise tables over different items or levels")
+        self.tables += other.tables
+        return self
+
+    def _pair_tables(self):
+        # (items x items x levels x levels), rows of each table belong to the first item
+        return self.tables.transpose(0, 2, 1, 3)
+
+    def spearman(self):
+        """Pairwise-complete Spearman correlations from each pair's own midranks"""
+        t = self._pair_tables()
+        rows, cols = t.sum(axis=3), t.sum(axis=2)
+        # Midranks up to a constant shift, which the correlation ignores
+        rank_x = np.cumsum(rows, axis=2) - rows / 2
+        rank_y = np.cumsum(cols, axis=2) - cols / 2
+        n = rows.sum(axis=2)
+        sx, sy = (rows * rank_x).sum(axis=2), (cols * rank_y).sum(axis=2)
+        sxx, syy = (rows * rank_x ** 2).sum(axis=2), (cols * rank_y ** 2).sum(axis=2)
+        sxy = np.einsum('ijab,ija,ijb->ij', t, rank_x, rank_y)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = (sxy - sx * sy / n) / np.sqrt((sxx - sx ** 2 / n) * (syy - sy ** 2 / n))
+        corr[~np.isfinite(corr)] = np.nan
+        return pd.DataFrame(np.clip(corr, -1, 1), index=self.columns, columns=self.columns)
+
+    def polychoric(self, tol=1e-6):
+        """Two-step polychoric (tetrachoric for yes/no items) correlation of every pair"""
+        k = len(self.columns)
+        corr = np.full((k, k), np.nan)
+        np.fill_diagonal(corr, 1.0)
+        sizes = np.array([len(lv) for lv in self.levels])
+        upper_i, upper_j = np.triu_indices(k, 1)
+        t = self._pair_tables()
+
+        # Pairs are fitted together in groups sharing a table shape
+        for rows in np.unique(sizes):
+            for cols in np.unique(sizes):
+                pick = (sizes[upper_i] == rows) & (sizes[upper_j] == cols)
+                if not pick.any() or rows < 2 or cols < 2:
+                    continue
+                i, j = upper_i[pick], upper_j[pick]
+                rho = polychoric_fit(t[i, j, :rows, :cols], tol)
+                corr[i, j] = corr[j, i] = rho
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
+
+
+def _norm_ppf(p):
+    # Standard normal quantile of every element (thresholds are few, so the scalar stdlib call is cheap)
+    return np.frompyfunc(_NORMAL.inv_cdf, 1, 1)(p).astype(np.float64)
+
+
+def bivariate_excess(h, k, rho):
+    """Phi2(h, k; rho) - Phi(h) * Phi(k), by Gauss-Legendre quadrature of the Sheppard integral"""
+    # Broadcasts h and k against rho (one value per pair, leading axis)
+    angle = np.arcsin(rho)
+    theta = angle[..., np.newaxis] * (_GL_NODES + 1) / 2
+    sin, cos2 = np.sin(theta), np.cos(theta) ** 2
+    h, k = h[..., np.newaxis], k[..., np.newaxis]
+    integrand = np.exp(-(h * h + k * k - 2 * h * k * sin) / (2 * cos2))
+    return (integrand * _GL_WEIGHTS).sum(axis=-1) * angle / (4 * np.pi)
+
+
+def polychoric_fit(tables, tol=1e-6):
+    """Maximum-likelihood rho of a batch of (pairs x rows x cols) tables, thresholds fixed from margins"""
+    tables = np.asarray(tables, dtype=np.float64)
+    n = tables.sum(axis=(1, 2))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        row_cum = np.cumsum(tables.sum(axis=2), axis=1)[:, :-1] / n[:, np.newaxis]
+        col_cum = np.cumsum(tables.sum(axis=1), axis=1)[:, :-1] / n[:, np.newaxis]
+
+    # Empty edge categories put a threshold at +-infinity; clipping keeps Phi exact at 0 / 1
+    eps = 1e-12
+    h = np.clip(_norm_ppf(np.clip(row_cum, eps, 1 - eps)), -8, 8)
+    k = np.clip(_norm_ppf(np.clip(col_cum, eps, 1 - eps)), -8, 8)
+    hh, kk = h[:, :, np.newaxis], k[:, np.newaxis, :]
+    product = row_cum[:, :, np.newaxis] * col_cum[:, np.newaxis, :]
+
+    def loglik(rho):
+        # Joint CDF on the interior threshold grid, padded with the margins on the edges
+        pairs, rows, cols = tables.shape
+        cdf = np.zeros((pairs, rows + 1, cols + 1))
+        cdf[:, 1:rows, 1:cols] = product + bivariate_excess(hh, kk, rho[:, np.newaxis, np.newaxis])
+        cdf[:, 1:rows, cols] = row_cum
+        cdf[:, rows, 1:cols] = col_cum
+        cdf[:, rows, cols] = 1.0
+        cells = cdf[:, 1:, 1:] - cdf[:, :-1, 1:] - cdf[:, 1:, :-1] + cdf[:, :-1, :-1]
+        return (tables * np.log(np.maximum(cells, 1e-300))).sum(axis=(1, 2))
+
+    # Golden-section search on every pair at once
+    ratio = (np.sqrt(5) - 1) / 2
+    lo, hi = np.full(len(tables), -0.999), np.full(len(tables), 0.999)
+    a, b = hi - ratio * (hi - lo), lo + ratio * (hi - lo)
+    fa, fb = loglik(a), loglik(b)
+    while np.max(hi - lo) > tol:
+        # The interior point that survives is reused, so each step costs one likelihood
+        left = fa > fb
+        hi = np.where(left, b, hi)
+        lo = np.where(left, lo, a)
+        kept, f_kept = np.where(left, a, b), np.where(left, fa, fb)
+        new = np.where(left, hi - ratio * (hi - lo), lo + ratio * (hi - lo))
+        f_new = loglik(new)
+        a, fa = np.where(left, new, kept), np.where(left, f_new, f_kept)
+        b, fb = np.where(left, kept, new), np.where(left, f_kept, f_new)
+
+    # rho is undefined when either item has fewer than two answered categories
+    defined = ((tables.sum(axis=2) > 0).sum(axis=1) > 1) & ((tables.sum(axis=1) > 0).sum(axis=1) > 1)
+    return np.where(defined, (lo + hi) / 2, np.nan)
+
+
+def association_matrix(data, cols=None, method='pearson', weights=None, levels=None, block=4096):
+    """Item correlation matrix of a frame, or of an iterable of frames / (frame, weights) chunks"""
+    if method not in METHODS:
+        raise ValueError(f"Unknown method {method!r}; expected one of {METHODS}")
+    chunks = [(data, weights)] if isinstance(data, pd.DataFrame) else \
+        [chunk if isinstance(chunk, tuple) else (chunk, None) for chunk in data]
+    if cols is None:
+        cols = item_columns(chunks[0][0].columns)
+
+    if method == 'pearson':
+        sums = PairwiseSums(cols)
+        for frame, w in chunks:
+            sums.add(item_matrix(frame.reindex(columns=cols), cols), w, block)
+        return sums.correlation()
+
+    # Every chunk is coded onto the levels fixed by the first one so the tables line up
+    first, w = chunks[0]
+    tables = PairwiseTables.from_frame(first, cols, levels, w, block)
+    for frame, w in chunks[1:]:
+        frame = frame.reindex(columns=cols)
+        codes = np.column_stack([encode(frame[col].array, lv)[0] for col, lv in zip(cols, tables.levels)])
+        tables.add(codes, w, block)
+    return tables.spearman() if method == 'spearman' else tables.polychoric()
+
+
+def cluster_order(corr):
+    """Leaf order of an average-linkage clustering on 1 - r, for ordering a heatmap"""
+    distance = 1 - np.nan_to_num(np.asarray(corr, dtype=np.float64), nan=0.0)
+    np.fill_diagonal(distance, np.inf)
+    clusters = [[i] for i in range(len(distance))]
+    sizes = np.ones(len(distance))
+    active = np.ones(len(distance), dtype=bool)
+
+    while active.sum() > 1:
+        masked = np.where(active[:, np.newaxis] & active[np.newaxis, :], distance, np.inf)
+        a, b = np.unravel_index(np.argmin(masked), masked.shape)
+        # Average linkage: the merged cluster's distances are size-weighted means
+        merged = (distance[a] * sizes[a] + distance[b] * sizes[b]) / (sizes[a] + sizes[b])
+        distance[a], distance[:, a] = merged, merged
+        distance[a, a] = np.inf
+        sizes[a] += sizes[b]
+        active[b] = False
+        clusters[a] = clusters[a] + clusters[b]
+    return clusters[int(np.flatnonzero(active)[0])] if len(clusters) else []
+
+
+def main():
+    from survey_store import load_wave, load_weights
+    from wave_metrics import discover_waves
+
+    parser = argparse.ArgumentParser(description='Item association matrix of one survey wave')
+    parser.add_argument('wave', help='survey year, e.g. 2024')
+    parser.add_argument('--method', choices=METHODS, default='spearman')
+    parser.add_argument('--prefix', nargs='*', default=None, help='restrict to items with these prefixes')
+    parser.add_argument('--item', default=None, help='list one item\'s associations, strongest first')
+    parser.add_argument('--with', dest='extra', nargs='*', default=[], help='extra numeric columns, e.g. AGE')
+    parser.add_argument('--weights', default=None, help='stored weight set to apply')
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    path = discover_waves()[args.wave]
+    df = load_wave(path)
+    cols = item_columns(df.columns)
+    if args.prefix:
+        cols = [col for col in cols if col.startswith(tuple(args.prefix)) or col == args.item]
+    cols += [col for col in args.extra if col not in cols]
+    weights = None if args.weights is None else load_weights(path, args.weights)
+
+    corr = association_matrix(df, cols, args.method, weights)
+    if args.item:
+        print(corr[args.item].drop(args.item).dropna().sort_values(key=abs, ascending=False)
+              .head(args.top).round(3).to_string())
+    else:
+        upper = corr.where(np.triu(np.ones(corr.shape, dtype=bool), 1)).stack()
+        print(upper.sort_values(key=abs, ascending=False).head(args.top).round(3).to_string())
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
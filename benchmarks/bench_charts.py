@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Profile the chart-spec figures stage by stage.
+
+Each spec from FV_2.py and Final_visualizations .py is rendered on Agg in
+a fresh process twice (first render, then a repeat with every cache warm);
+the renderer's draw / layout timings of the repeat are printed with
+both end-to-end times, canvas draw included. Run from the repository root:  python benchmarks/bench_charts.py
+"""
+
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SPECS = [
+    ('FV_2.py', 'IMPORTANCE_SATISFACTION'),
+    ('FV_2.py', 'USAGE_BY_DIVISION'),
+    ('FV_2.py', 'SERVICE_QUALITY'),
+    ('FV_2.py', 'STAFF_COMPOSITES'),
+    ('FV_2.py', 'SKILL_GAP'),
+    ('FV_2.py', 'USAGE_COMPARISON'),
+    ('FV_2.py', 'ITEM_ASSOCIATIONS'),
+    ('Final_visualizations .py', 'TECH_PROJECTION'),
+]
+
+# Runs in a child process so every spec's first render starts from cold caches
+CHILD = r'''
+import json, sys, time
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from charts import renderer
+from report_render import load_script
+
+spec = getattr(load_script(sys.argv[1]), sys.argv[2])
+rows = []
+for _ in range(2):
+    start = time.perf_counter()
+    renderer.render(spec, show=False)
+    plt.gcf().canvas.draw()
+    total = time.perf_counter() - start
+    rows.append(dict(renderer.timings[-1], total_seconds=total))
+    plt.close('all')
+print(json.dumps(rows))
+'''
+
+
+def main():
+    import json
+
+    print(f"{'spec':<26} {'draw':>7} {'layout':>7} {'first (s)':>10} {'repeat (s)':>11}")
+    for script, spec in SPECS:
+        out = subprocess.run([sys.executable, '-c', CHILD, os.path.join(ROOT, script), spec], cwd=ROOT,
+                             capture_output=True, text=True, check=True).stdout
+        cold, warm = json.loads(out.strip().splitlines()[-1])
+        print(f"{spec:<26} {warm['draw_seconds']:>7.3f} "
+              f"{warm['layout_seconds']:>7.3f} {cold['total_seconds']:>10.3f} {warm['total_seconds']:>11.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark the pooled consortium mode against concatenating every campus.
+
+Synthetic campuses (synthetic.py, cached straight to columnar form) are
+pooled two ways: loading and concatenating every campus's 2024 wave before
+one grouped reduction, and aggregating each partition in a process pool and
+merging the statistics. Pooled division means must agree. The size of the
+concatenated frame is reported next to the merged statistics the parent
+actually holds. Run from the repository root:  python benchmarks/bench_consortium.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from consortium import Consortium, discover_partitions
+from survey_metrics import grouped_item_stats, item_columns
+from survey_store import load_wave
+from synthetic import synthetic_waves
+
+
+def concatenated(root):
+    # Read into memory: hundreds of memory-mapped campuses run out of file handles
+    frames = [load_wave(path, mmap_mode=None) for path in discover_partitions(root, ['2024']).values()]
+    df = pd.concat(frames, ignore_index=True)
+    cols = [col for col in item_columns(df.columns) if col.startswith('USE_')]
+    return grouped_item_stats(df, cols, 'ADIV')['mean'], df.memory_usage(deep=True).sum()
+
+
+def pooled(root, processes):
+    consortium = Consortium(root, waves=['2024'])
+    consortium.aggregate(processes=processes)
+    store = consortium.pooled('2024')
+    stats_bytes = sum(s.counts.nbytes + s.sums.nbytes + s.sumsq.nbytes + s.hist.nbytes
+                      for s in consortium.stores.values())
+    return consortium.division_usage('2024'), stats_bytes + store.hist.nbytes
+
+
+def main():
+    print(f"{'campuses':>9} {'rows':>10} {'concat (s)':>11} {'pooled (s)':>11} {'concat MB':>10} {'stats MB':>9}")
+    for n_campuses, rows in ((20, 5_000), (100, 5_000), (300, 5_000)):
+        with tempfile.TemporaryDirectory() as root:
+            for i in range(n_campuses):
+                synthetic_waves(os.path.join(root, f'campus_{i:03d}'), rows, seed=i, csv_limit=0)
+
+            start = time.perf_counter()
+            ref, frame_bytes = concatenated(root)
+            concat_t = time.perf_counter() - start
+
+            start = time.perf_counter()
+            got, stats_bytes = pooled(root, processes=None)
+            pooled_t = time.perf_counter() - start
+
+            assert np.allclose(got.to_numpy(), ref.loc[got.index, got.columns].to_numpy(), equal_nan=True)
+            print(f"{n_campuses:>9} {n_campuses * rows:>10} {concat_t:>11.2f} {pooled_t:>11.2f} "
+                  f"{frame_bytes / 2 ** 20:>10.0f} {stats_bytes / 2 ** 20:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
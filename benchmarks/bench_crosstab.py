@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark the crosstab engine against pandas.crosstab on a batch of item pairs.
+
+Every USE_ item of the 2024 wave is crossed with the modality and
+demographic columns, as an analyst's per-wave request list would. Counts
+must match pandas; the per-table time is reported cold (items encoded on
+first use) and warm (served from the wave cache).
+Run from the repository root:  python benchmarks/bench_crosstab.py
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from crosstab import WaveCrosstabs, contingency
+from survey_store import load_wave
+
+
+def best_of(func, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    path = os.path.join(ROOT, 'cleaned_c24.csv')
+    df = load_wave(path)
+    pairs = [(item, other) for item in df.columns if item.startswith('USE_')
+             for other in ('TREM', 'TLIVE', 'ADIV', 'RANK', 'SEX')]
+
+    # Counts must agree with pandas wherever both have the cell
+    for rows, cols in pairs[:20]:
+        ours = contingency(df, [rows, cols])['counts']
+        ref = pd.crosstab(df[rows], df[cols])
+        assert np.array_equal(ours.reindex(index=ref.index, columns=ref.columns).to_numpy(), ref.to_numpy())
+
+    def pandas_batch():
+        for rows, cols in pairs:
+            pd.crosstab(df[rows], df[cols])
+
+    def cold_batch():
+        engine = WaveCrosstabs(path)
+        for pair in pairs:
+            engine.crosstab(pair)
+
+    engine = WaveCrosstabs(path)
+    cold_batch()
+
+    def warm_batch():
+        for pair in pairs:
+            engine.crosstab(pair)
+
+    warm_batch()
+    n = len(pairs)
+    print(f"{n} crosstabs of the 2024 wave ({len(df)} respondents)")
+    for name, func in (('pandas.crosstab', pandas_batch), ('engine, cold', cold_batch), ('engine, warm', warm_batch)):
+        print(f"{name:<16} {best_of(func) / n * 1e3:>8.3f} ms per table")
+
+
+if __name__ == '__main__':
+    main()
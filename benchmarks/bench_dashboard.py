@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark the dashboard cube: build time and embedded size.
+
+Synthetic waves of 80 Likert items with ADIV/RANK/TEN/AGE are cubed by
+rolling every group-by up from the base cuboid, and by a pandas groupby
+per group-by straight from the respondents; results must agree. The
+size of the gzipped cube the HTML embeds is reported with the timings
+and stays bounded by the number of occupied cells, not respondents.
+Run from the repository root:  python benchmarks/bench_dashboard.py
+"""
+
+import os
+import sys
+import time
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dashboard import DIMENSIONS, build_cube, dimension_values, encode_cube
+
+
+def best_of(func, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def make_wave(n_rows, n_items=80, seed=0):
+    rng = np.random.default_rng(seed)
+    columns = {
+        'ADIV': pd.Categorical(rng.choice([f'Division {d}' for d in range(5)], n_rows)),
+        'RANK': pd.Categorical(rng.choice(['Assistant', 'Associate', 'Professor', 'Lecturer', 'Other'], n_rows)),
+        'TEN': pd.Categorical(rng.choice(['Tenured', 'Tenured Track, but not Tenure', 'Not on Tenure'], n_rows)),
+        'AGE': rng.integers(25, 75, n_rows)
+    }
+    for j in range(n_items):
+        values = rng.integers(1, 6, n_rows).astype(float)
+        values[rng.random(n_rows) < 0.3] = np.nan
+        columns[f'USE_{j}'] = values
+    return pd.DataFrame(columns)
+
+
+def groupby_cube(frames, items, min_cell):
+    # Every group-by straight from the respondents
+    out = {}
+    for wave, df in frames.items():
+        keys = pd.DataFrame({dim: dimension_values(df, dim) for dim in DIMENSIONS})
+        for size in range(len(DIMENSIONS) + 1):
+            for keep in combinations(DIMENSIONS, size):
+                data = pd.concat([keys[list(keep)], df[items]], axis=1)
+                grouped = data.groupby(list(keep)) if keep else data.assign(_all=0).groupby('_all')
+                means, counts = grouped[items].mean(), grouped[items].count()
+                out[wave, keep] = means.where(counts >= min_cell)
+    return out
+
+
+def main():
+    print(f"{'rows':>9} {'groupby (s)':>12} {'cube (s)':>9} {'speedup':>8} {'cells':>6} {'embedded KB':>12}")
+    for n_rows in (1_000, 10_000, 100_000, 1_000_000):
+        frames = {'2018': make_wave(n_rows, seed=1), '2024': make_wave(n_rows, seed=2)}
+        items = [col for col in frames['2018'].columns if col.startswith('USE_')]
+
+        cube = build_cube(frames, items)
+        ref = groupby_cube(frames, items, cube['min_cell'])
+        overall = next(c for c in cube['cuboids'] if c['wave'] == '2024' and c['mask'] == 0)
+        assert np.allclose(np.array(overall['mean']) / 100, ref['2024', ()].to_numpy().ravel(), atol=0.005)
+
+        pandas_t = best_of(lambda: groupby_cube(frames, items, 5), repeat=1)
+        cube_t = best_of(lambda: build_cube(frames, items), repeat=1 if n_rows > 100_000 else 3)
+        cells = sum(len(c['cells']) for c in cube['cuboids'])
+        size = len(encode_cube(cube)) / 1024
+        print(f"{n_rows:>9} {pandas_t:>12.3f} {cube_t:>9.3f} {pandas_t / cube_t:>7.1f}x {cells:>6} {size:>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark blitted small multiples against drawing every facet as its own figure.
+
+Synthetic waves (synthetic.py) large enough to fill dozens of RANK x TEN x
+AGE_BAND facets are written to a temporary folder that MISO_DATA_DIR points
+FV_2.py at, in a child process. For the division heatmap, the service
+quality radar and the skill-gap bars, every facet is exported as a PNG two
+ways: render_chart on a fresh figure plus savefig, and FV_2.plot_facets (one
+skeleton, blitted per facet). Both write the same facets as PNGs at the same
+compress level, so the gap is drawing alone.
+Run from the repository root:  python benchmarks/bench_facets.py --rows 20000
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def per_figure(module, chart, out_dir, dpi=150, compress_level=3):
+    from charts import render_chart
+    from facets import facet_filename
+
+    spec, prepare = module.FACET_CHARTS[chart]
+    os.makedirs(out_dir, exist_ok=True)
+    written = {}
+    for facet, data in prepare(weights=module.WEIGHTS).items():
+        fig = render_chart(spec, data, show=False)
+        fig.savefig(os.path.join(out_dir, facet_filename(facet)), dpi=dpi, facecolor='white',
+                    pil_kwargs={'compress_level': compress_level})
+        plt.close(fig)
+        written[facet] = facet_filename(facet)
+    return written
+
+
+def run(folder):
+    from report_render import FV2_SCRIPT, load_script
+    module = load_script(FV2_SCRIPT)
+
+    print(f"{'chart':<20} {'facets':>7} {'figures (s)':>12} {'blitted (s)':>12} {'speedup':>8}")
+    for chart in module.FACET_CHARTS:
+        start = time.perf_counter()
+        reference = per_figure(module, chart, os.path.join(folder, 'figures', chart))
+        figures_t = time.perf_counter() - start
+
+        start = time.perf_counter()
+        written = module.plot_facets(chart, os.path.join(folder, 'blitted', chart))
+        blitted_t = time.perf_counter() - start
+
+        assert written == reference
+        print(f"{chart:<20} {len(written):>7} {figures_t:>12.2f} {blitted_t:>12.2f} {figures_t / blitted_t:>7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20_000, help='respondents per synthetic wave')
+    parser.add_argument('--data-dir', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore')
+
+    if args.data_dir:
+        run(args.data_dir)
+        return
+
+    from synthetic import synthetic_waves
+    from wave_metrics import DATA_ENV
+
+    # The data folder is fixed when wave_metrics is imported, so the timing runs in a child process
+    with tempfile.TemporaryDirectory() as folder:
+        synthetic_waves(folder, args.rows, csv_limit=0)
+        subprocess.run([sys.executable, os.path.abspath(__file__), '--data-dir', folder],
+                       env={**os.environ, DATA_ENV: folder}, cwd=folder, check=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark the batched importance-satisfaction engine against the old per-column loop.
+
+Run from the repository root:  python benchmarks/bench_imp_sat.py
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from survey_metrics import imp_sat_gaps
+
+
+# The original FV_2 implementation, kept here as the reference point
+def legacy_prepare_imp_sat_data(df):
+    result = []
+    imp_cols = [col for col in df.columns if col.startswith('IMP_')]
+    ds_cols = [col for col in df.columns if col.startswith('DS_')]
+    for imp_col in imp_cols:
+        service_code = imp_col[4:]
+        ds_col = f'DS_{service_code}'
+        if ds_col in ds_cols:
+            imp_avg = df[imp_col].mean()
+            ds_avg = df[ds_col].mean()
+            result.append({
+                'service': service_code,
+                'importance': imp_avg,
+                'satisfaction': ds_avg,
+                'gap': imp_avg - ds_avg
+            })
+    return pd.DataFrame(result)
+
+
+def make_frame(n_rows, n_services, missing=0.3, seed=0):
+    # Likert 1-5 answers with a share of skipped items, like the cleaned waves
+    rng = np.random.default_rng(seed)
+    data = {}
+    for prefix in ('IMP_', 'DS_'):
+        values = rng.integers(1, 6, size=(n_rows, n_services)).astype(float)
+        values[rng.random((n_rows, n_services)) < missing] = np.nan
+        for j in range(n_services):
+            data[f'{prefix}S{j}'] = values[:, j]
+    return pd.DataFrame(data)
+
+
+def best_of(func, df, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(df)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    print(f"{'rows':>9} {'services':>9} {'loop (ms)':>10} {'engine (ms)':>12} {'speedup':>8}")
+    for n_rows in (1_000, 100_000, 500_000):
+        for n_services in (20, 50, 150):
+            df = make_frame(n_rows, n_services)
+
+            # Sanity check before timing anything
+            expected = legacy_prepare_imp_sat_data(df)
+            actual = imp_sat_gaps(df)[expected.columns]
+            pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+
+            loop_t = best_of(legacy_prepare_imp_sat_data, df)
+            engine_t = best_of(imp_sat_gaps, df)
+            print(f"{n_rows:>9} {n_services:>9} {loop_t * 1e3:>10.1f} "
+                  f"{engine_t * 1e3:>12.1f} {loop_t / engine_t:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Measure what instrumentation costs on a hot path.
+
+A projected load_wave (the most frequently spanned call) runs with tracing
+off, with timing spans, and with allocation tracing, and each mode's
+per-call cost is reported against tracing off. The cost of a disabled
+span on its own is printed first.
+Run from the repository root:  python benchmarks/bench_instrument.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import instrument
+from survey_store import load_wave
+from wave_metrics import discover_waves
+
+
+def per_call(func, n=2000):
+    start = time.perf_counter()
+    for _ in range(n):
+        func()
+    return (time.perf_counter() - start) / n
+
+
+def best_of(func, repeat=5):
+    return min(per_call(func) for _ in range(repeat))
+
+
+def main():
+    path = discover_waves()['2024']
+    call = lambda: load_wave(path, columns=['USE_CMS', 'ADIV'])
+
+    instrument.disable()
+    empty_span = best_of(lambda: instrument.span('noop', 'load').__enter__())
+    off = best_of(call)
+
+    instrument.enable()
+    timing = best_of(call)
+    instrument.drain()
+
+    instrument.disable()
+    instrument.enable(allocations=True)
+    alloc = best_of(call, repeat=2)
+    instrument.drain()
+    instrument.disable()
+
+    print(f"disabled span: {empty_span * 1e9:.0f} ns")
+    print(f"{'mode':<12} {'per call (us)':>14} {'overhead':>9}")
+    for mode, seconds in [('off', off), ('timing', timing), ('allocations', alloc)]:
+        print(f"{mode:<12} {seconds * 1e6:>14.1f} {seconds / off - 1:>8.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark overlap-free labels on a quadrant scatter with hundreds of points.
+
+A peer-benchmark sized importance-satisfaction matrix (one point per
+campus) is drawn three ways: the fixed-offset annotate() loop, the same
+loop followed by a pairwise repair pass that moves each label to the first
+candidate offset clear of every earlier label (quadratic), and
+label_layout's grid-indexed placement (placing every label, or hiding the
+ones with no free position). Each figure is built and drawn to an Agg
+canvas; the time, labels drawn and overlapping label pairs left are
+reported. Run from the repository root:  python benchmarks/bench_label_layout.py
+"""
+
+import os
+import sys
+import time
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from charts import draw_quadrant
+from label_layout import candidate_offsets
+
+OPTIONS = dict(x='satisfaction', y='importance', color='gap', label='service',
+               cbar_label='Gap (Importance - Satisfaction)', quadrant_labels=[],
+               title='Importance-Satisfaction Matrix', xlabel='Satisfaction Rating', ylabel='Importance Rating')
+
+
+def campus_points(n, seed=0):
+    rng = np.random.default_rng(seed)
+    data = pd.DataFrame({'satisfaction': np.clip(rng.normal(3.6, 0.5, n), 1, 5),
+                         'importance': np.clip(rng.normal(3.9, 0.5, n), 1, 5)})
+    data['gap'] = data['importance'] - data['satisfaction']
+    data['service'] = [f'campus_{i:04d}' for i in range(n)]
+    return data
+
+
+def overlapping_pairs(boxes):
+    boxes = np.asarray(boxes)
+    if len(boxes) < 2:
+        return 0
+    x0, y0, x1, y1 = boxes.T
+    hit = ((x0[:, None] < x1[None, :]) & (x0[None, :] < x1[:, None]) &
+           (y0[:, None] < y1[None, :]) & (y0[None, :] < y1[:, None]))
+    return int((hit.sum() - len(boxes)) // 2)
+
+
+def annotated(data):
+    fig = draw_quadrant(data, None, **OPTIONS)
+    fig.canvas.draw()
+    renderer = fig.canvas.get_renderer()
+    boxes = [text.get_window_extent(renderer).extents for text in fig.axes[0].texts]
+    plt.close(fig)
+    return boxes
+
+
+def repaired(data):
+    # The straightforward fix: test each label against every label placed before it
+    fig = draw_quadrant(data, None, **OPTIONS)
+    fig.canvas.draw()
+    renderer = fig.canvas.get_renderer()
+    placed = []
+    for text in fig.axes[0].texts:
+        for dx, dy, ha, va in candidate_offsets((3, 3)):
+            text.xyann = (dx, dy)
+            text.set_horizontalalignment(ha)
+            text.set_verticalalignment(va)
+            box = text.get_window_extent(renderer)
+            if not any(box.overlaps(other) for other in placed):
+                break
+        placed.append(box)
+    fig.canvas.draw()
+    boxes = [box.extents for box in placed]
+    plt.close(fig)
+    return boxes
+
+
+def laid_out(data, hide_overlaps=False):
+    fig = draw_quadrant(data, None, label_layout=True, **OPTIONS)
+    layout = fig.axes[0].artists[-1]
+    layout.hide_overlaps = hide_overlaps
+    fig.canvas.draw()
+    boxes = [placement[5] for placement in layout.placements]
+    assert hide_overlaps or len(boxes) == len(data)
+    plt.close(fig)
+    return boxes
+
+
+def timed(func, data):
+    start = time.perf_counter()
+    boxes = func(data)
+    return time.perf_counter() - start, len(boxes), overlapping_pairs(boxes)
+
+
+def main():
+    print(f"{'points':>7} {'method':<20} {'seconds':>8} {'labels':>7} {'overlaps':>9}")
+    for n in (100, 500, 1000):
+        data = campus_points(n)
+        runs = [('annotate', annotated),
+                ('label_layout', laid_out),
+                ('label_layout (hide)', lambda data: laid_out(data, hide_overlaps=True))]
+        if n <= 500:
+            runs.insert(1, ('pairwise fix', repaired))
+        for name, func in runs:
+            seconds, labels, overlaps = timed(func, data)
+            print(f"{n:>7} {name:<20} {seconds:>8.2f} {labels:>7} {overlaps:>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Memory and reduction time of masked item blocks against the dense NaN matrix.
+
+A synthetic block of staff/satisfaction-style items (1-4 answers, most of
+them skipped) is reduced per item and per division both ways. Results must
+agree; the masked block should be several times smaller and faster as the
+share of skipped answers grows.
+Run from the repository root:  python benchmarks/bench_masked.py
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from masked_items import MaskedItemBlock
+from survey_metrics import column_stats, grouped_column_stats
+
+
+def best_of(func, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def make_block(n_rows, n_items, missing, seed=0):
+    rng = np.random.default_rng(seed)
+    dense = rng.integers(1, 5, size=(n_rows, n_items)).astype(float)
+    dense[rng.random((n_rows, n_items)) < missing] = np.nan
+    cols = [f'DAHD_{j}' for j in range(n_items)]
+    present = ~np.isnan(dense.T)
+    block = MaskedItemBlock.from_arrays(cols, n_rows, present, [dense[:, j][present[j]] for j in range(n_items)])
+    return dense, block
+
+
+def main():
+    n_items, n_groups = 40, 8
+    print(f"{'rows':>9} {'missing':>8} {'dense MB':>9} {'masked MB':>10} "
+          f"{'stats x':>8} {'grouped x':>10}")
+    for n_rows in (10_000, 100_000, 1_000_000):
+        codes = np.random.default_rng(1).integers(0, n_groups, n_rows)
+        for missing in (0.5, 0.8, 0.95):
+            dense, block = make_block(n_rows, n_items, missing)
+
+            # Both layouts must give the same statistics
+            _, dense_means, _ = column_stats(dense)
+            _, block_means, _ = column_stats(block)
+            assert np.allclose(dense_means, block_means)
+            _, _, dense_grouped, _ = grouped_column_stats(dense, codes, n_groups)
+            _, _, block_grouped, _ = grouped_column_stats(block, codes, n_groups)
+            assert np.allclose(dense_grouped, block_grouped, equal_nan=True)
+
+            stats_x = best_of(lambda: column_stats(dense)) / best_of(lambda: column_stats(block))
+            grouped_x = (best_of(lambda: grouped_column_stats(dense, codes, n_groups)) /
+                         best_of(lambda: grouped_column_stats(block, codes, n_groups)))
+            print(f"{n_rows:>9} {missing:>8.0%} {dense.nbytes / 1024 ** 2:>9.1f} "
+                  f"{block.nbytes / 1024 ** 2:>10.1f} {stats_x:>7.1f}x {grouped_x:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
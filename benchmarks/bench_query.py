@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark lazy queries against loading the whole wave and filtering in pandas.
+
+A synthetic wave of 160 item columns (USE_/IMP_/DS_/SKL_) plus ADIV, TEN
+and AGE is written as a cleaned CSV and cached. The eager path loads every
+column, filters with df[df['TEN'] == ...], picks the USE_ columns with a
+prefix comprehension and runs the grouped reduction; the query reads TEN,
+then only the USE_ and ADIV columns at the matching rows. Results must agree.
+Run from the repository root:  python benchmarks/bench_query.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from query import wave
+from survey_metrics import grouped_item_stats
+from survey_store import ensure_cache, load_wave
+
+
+def best_of(func, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def write_wave(folder, n_rows, n_items=40, seed=0):
+    rng = np.random.default_rng(seed)
+    columns = {
+        'ADIV': rng.choice([f'Division {d}' for d in range(5)], n_rows),
+        'TEN': rng.choice(['Tenured', 'Tenured Track, but not Tenure', 'Not on Tenure'], n_rows),
+        'AGE': rng.integers(25, 75, n_rows)
+    }
+    for prefix in ('USE_', 'IMP_', 'DS_', 'SKL_'):
+        for j in range(n_items):
+            values = rng.integers(1, 6, n_rows).astype(float)
+            values[rng.random(n_rows) < 0.3] = np.nan
+            columns[f'{prefix}{j}'] = values
+    path = os.path.join(folder, 'cleaned_c24.csv')
+    pd.DataFrame(columns).to_csv(path, index=False)
+    ensure_cache(path)
+    return path
+
+
+def eager(path):
+    df = load_wave(path)
+    df = df[df['TEN'] == 'Tenured']
+    use_cols = [col for col in df.columns if col.startswith('USE_')]
+    return grouped_item_stats(df, use_cols, 'ADIV')['mean']
+
+
+def main():
+    print(f"{'rows':>9} {'eager (s)':>10} {'query (s)':>10} {'speedup':>8}")
+    for n_rows in (10_000, 100_000, 500_000):
+        with tempfile.TemporaryDirectory() as folder:
+            path = write_wave(folder, n_rows)
+            lazy = lambda: wave('2024', folder).items('USE_*').where(TEN='Tenured').group_by('ADIV').mean()
+            ref = eager(path)
+            assert np.allclose(lazy().to_numpy(), ref.to_numpy(), equal_nan=True)
+
+            eager_t = best_of(lambda: eager(path))
+            query_t = best_of(lazy)
+            print(f"{n_rows:>9} {eager_t:>10.3f} {query_t:>10.3f} {eager_t / query_t:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark the batched reliability stage against a per-group pandas loop.
+
+Synthetic respondents (three waves x six divisions) answer three item
+families; the loop computes each group's pairwise covariance with
+DataFrame.cov and alpha from it, which is what reliability() batches.
+Run from the repository root:  python benchmarks/bench_reliability.py
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from psychometrics import family_scales, reliability
+
+
+def best_of(func, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def make_frame(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    columns = {'wave': rng.choice(['2018', '2021', '2024'], n_rows),
+               'ADIV': rng.choice([f'Division {d}' for d in range(6)], n_rows)}
+    for prefix, n_items, levels in (('USE_', 20, 5), ('IMP_', 30, 4), ('DS_', 20, 4)):
+        latent = rng.normal(size=n_rows)
+        for j in range(n_items):
+            values = np.clip(np.round((levels + 1) / 2 + latent + rng.normal(size=n_rows)), 1, levels)
+            values[rng.random(n_rows) < 0.2] = np.nan
+            columns[f'{prefix}{j}'] = values
+    return pd.DataFrame(columns)
+
+
+def loop_alpha(df, scales):
+    out = {}
+    for key, group in df.groupby(['wave', 'ADIV']):
+        for scale, items in scales.items():
+            cov = group[items].cov().to_numpy()
+            k = len(items)
+            out[key + (scale,)] = k / (k - 1) * (1 - np.trace(cov) / cov.sum())
+    return pd.Series(out)
+
+
+def main():
+    print(f"{'rows':>8} {'pandas loop (s)':>16} {'batched (s)':>12} {'speedup':>8}")
+    for n_rows in (5_000, 50_000, 500_000):
+        df = make_frame(n_rows)
+        scales = family_scales(df.columns)
+
+        batched = reliability(df, scales, by=['wave', 'ADIV'])['scales']['alpha']
+        looped = loop_alpha(df, scales)
+        assert np.allclose(batched.to_numpy(), looped.reindex(batched.index).to_numpy())
+
+        loop_t = best_of(lambda: loop_alpha(df, scales), repeat=1 if n_rows > 50_000 else 3)
+        batch_t = best_of(lambda: reliability(df, scales, by=['wave', 'ADIV']))
+        print(f"{n_rows:>8} {loop_t:>16.3f} {batch_t:>12.3f} {loop_t / batch_t:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark every chart-prep and plotting function on synthetic waves.
+
+For each size, synthetic 2018 and 2024 waves (synthetic.py) are written to a
+temporary folder, and a fresh process with MISO_DATA_DIR pointing at it
+imports FV_2.py and Final_visualizations .py on Agg. It then times the
+prepare_* functions and every report figure, canvas draw included (best of
+--repeat). Each run is appended to benchmarks/results/history.jsonl with its
+commit. Every timing is compared with the median of the last --window runs
+at the same size; it is reported as a regression (exit status 1) when it is
+slower by more than --threshold and the excess is also beyond --mad times
+those runs' median absolute deviation (and 10 ms), so run-to-run noise on
+small timings is not flagged. At least --min-runs earlier runs are needed.
+Run from the repository root:  python benchmarks/bench_report.py --sizes 1e2 1e3 1e4 1e5
+"""
+
+import argparse
+import json
+import statistics
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from synthetic import synthetic_waves
+from wave_metrics import DATA_ENV
+
+RESULTS = os.path.join(ROOT, 'benchmarks', 'results', 'history.jsonl')
+
+# Runs in a child process so each size imports the report scripts against its own waves
+CHILD = r'''
+import json, os, sys, time, warnings
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from report_render import FINAL_SCRIPT, FV2_SCRIPT, REPORT_JOBS, load_script
+
+warnings.filterwarnings('ignore')
+repeat = int(sys.argv[1])
+rows = []
+
+def timed(name, func):
+    times = []
+    for _ in range(repeat):
+        plt.close('all')
+        start = time.perf_counter()
+        func()
+        for num in plt.get_fignums():
+            plt.figure(num).canvas.draw()
+        times.append(time.perf_counter() - start)
+    plt.close('all')
+    rows.append({'name': name, 'seconds': min(times)})
+
+for script in (FV2_SCRIPT, FINAL_SCRIPT):
+    start = time.perf_counter()
+    load_script(script)
+    rows.append({'name': 'import ' + os.path.basename(script), 'seconds': time.perf_counter() - start})
+
+fv2 = load_script(FV2_SCRIPT)
+timed('prepare_imp_sat_data', lambda: fv2.prepare_imp_sat_data(fv2.df, fv2.WEIGHTS))
+for name in ('prepare_usage_by_division', 'prepare_service_quality_data', 'prepare_skill_gap_data',
+             'prepare_usage_comparison'):
+    timed(name, lambda: getattr(fv2, name)(fv2.WEIGHTS))
+for script, function in REPORT_JOBS:
+    timed(function, getattr(load_script(script), function))
+print(json.dumps(rows))
+'''
+
+
+def current_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def previous_timings(path, window=5):
+    # Seconds of the last `window` recorded runs per (rows, name), oldest first
+    history = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                record = json.loads(line)
+                history.setdefault((record['rows'], record['name']), []).append(record['seconds'])
+    return {key: seconds[-window:] for key, seconds in history.items()}
+
+
+def baseline(seconds):
+    """Median of earlier runs and their median absolute deviation, scaled to a standard deviation"""
+    median = statistics.median(seconds)
+    return median, 1.4826 * statistics.median(abs(s - median) for s in seconds)
+
+
+def run_size(n_rows, repeat):
+    with tempfile.TemporaryDirectory() as folder:
+        start = time.perf_counter()
+        synthetic_waves(folder, n_rows)
+        generate = time.perf_counter() - start
+
+        env = dict(os.environ, MPLBACKEND='Agg', PYTHONPATH=ROOT)
+        env[DATA_ENV] = folder
+        env.pop('MISO_WEIGHTS', None)
+        # cwd is the temporary folder, so figures that save themselves land there
+        out = subprocess.run([sys.executable, '-c', CHILD, str(repeat)], cwd=folder, env=env,
+                             capture_output=True, text=True, check=True).stdout
+    return generate, json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time chart prep and figures on synthetic waves')
+    parser.add_argument('--sizes', nargs='+', type=float, default=[1e2, 1e3, 1e4, 1e5],
+                        help='respondents per wave (up to 1e7)')
+    parser.add_argument('--repeat', type=int, default=7, help='runs per timing; the fastest is kept')
+    parser.add_argument('--threshold', type=float, default=1.25, help='slowdown ratio reported as a regression')
+    parser.add_argument('--window', type=int, default=5, help='earlier runs per timing the baseline is the median of')
+    parser.add_argument('--mad', type=float, default=3.0,
+                        help='a regression must also exceed the baseline by this many (scaled) MADs')
+    parser.add_argument('--min-runs', type=int, default=5, help='earlier runs needed before flagging a timing')
+    parser.add_argument('--results', default=RESULTS, help='JSON-lines history of every run')
+    args = parser.parse_args()
+
+    previous = previous_timings(args.results, args.window)
+    run = {'run': time.strftime('%Y-%m-%dT%H:%M:%S'), 'commit': current_commit()}
+    records, regressions = [], []
+
+    print(f"{'function':<30} {'rows':>9} {'seconds':>9} {'baseline':>9} {'mad':>7} {'ratio':>7}")
+    for size in args.sizes:
+        n_rows = int(size)
+        generate, timings = run_size(n_rows, args.repeat)
+        print(f"-- {n_rows} respondents per wave (generated in {generate:.2f}s)")
+        for timing in timings:
+            record = dict(run, rows=n_rows, **timing)
+            records.append(record)
+
+            earlier = previous.get((n_rows, timing['name']), [])
+            median, mad = baseline(earlier) if earlier else (None, None)
+            ratio, flag = '', ''
+            if median:
+                ratio = timing['seconds'] / median
+                # Slower beyond the ratio and beyond the noise of earlier runs (never under 10 ms)
+                noisy = timing['seconds'] - median <= max(args.mad * mad, 0.01)
+                if ratio > args.threshold and not noisy and len(earlier) >= args.min_runs:
+                    regressions.append(record)
+                    flag = f'  REGRESSION vs median of {len(earlier)} runs'
+                ratio = f'{ratio:.2f}x'
+            prior = f'{median:.3f}' if earlier else '-'
+            spread = f'{mad:.3f}' if earlier else '-'
+            print(f"{timing['name']:<30} {n_rows:>9} {timing['seconds']:>9.3f} {prior:>9} {spread:>7} {ratio:>7}{flag}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.results)), exist_ok=True)
+    with open(args.results, 'a') as f:
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+
+    print(f"\n{len(records)} timings appended to {args.results}; {len(regressions)} regression(s)")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
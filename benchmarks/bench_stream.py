@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Peak memory of streaming ingestion against reading a raw export in one go.
+
+Synthetic raw exports (answer text, free-text columns, unnormalized
+demographics) are generated at growing sizes; each ingestion runs in a
+fresh interpreter so peak resident memory (Linux VmHWM) is measured
+independently. Streaming RSS should stay flat as the file grows.
+Run from the repository root:  python benchmarks/bench_stream.py
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from stream_ingest import FAMILY_SCALES
+
+# Timed inside the child process; prints JSON with seconds and RSS growth in MB
+CHILD = '''
+import json, sys, time
+sys.path.insert(0, {root!r})
+import pandas as pd
+from incremental import AggregateStore
+from stream_ingest import clean_chunk, stream_aggregates
+
+def rss_mb():
+    # VmHWM is per address space, so it is not inherited from the parent like ru_maxrss
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+
+base = rss_mb()
+start = time.perf_counter()
+{load}
+means = store.item_means()
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'rss_mb': rss_mb() - base}}))
+'''
+
+LOADS = {
+    'read_csv + clean': ("store = AggregateStore().ingest(clean_chunk(pd.read_csv({path!r}, dtype=str, "
+                         "keep_default_na=False, na_values=[''])))"),
+    'stream (20k chunks)': "store = stream_aggregates({path!r}, chunksize=20_000)"
+}
+
+
+def make_export(path, n_rows, seed=0, block=50_000):
+    # Resample the real 2024 respondents and write half of the answers as text, block by block
+    source = pd.read_csv(os.path.join(ROOT, 'cleaned_c24.csv'))
+    rng = np.random.default_rng(seed)
+
+    wording = {}
+    for prefix, scale, _, _ in FAMILY_SCALES:
+        reverse = {}
+        for text, code in scale.items():
+            reverse.setdefault(code, text.title())
+        for col in source.columns:
+            if col.startswith(prefix) and col not in wording:
+                wording[col] = reverse
+
+    for start in range(0, n_rows, block):
+        rows = source.iloc[rng.integers(0, len(source), min(block, n_rows - start))].reset_index(drop=True)
+        as_text = rng.random(len(rows)) < 0.5
+        columns = {}
+        for col in rows.columns:
+            if col in wording:
+                text = rows[col].map(wording[col])
+                columns[col] = rows[col].astype(object).where(~as_text | text.isna(), text)
+            else:
+                columns[col] = rows[col]
+        columns['RANK'] = rows['RANK'].replace({'Intructor/Lecturer': 'Instructor/Lecturer'})
+        columns['Comments'] = 'Free-text answer that the cleaning drops'
+        columns['StartDate'] = '2024-03-01 10:15:00'
+        pd.DataFrame(columns).to_csv(path, mode='w' if start == 0 else 'a', header=start == 0, index=False)
+
+
+def run_child(load):
+    code = CHILD.format(root=ROOT, load=load)
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout)
+
+
+def main():
+    print(f"{'rows':>9} {'file (MB)':>10} {'path':<20} {'seconds':>8} {'peak RSS (MB)':>14}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_rows in (25_000, 100_000, 400_000):
+            path = os.path.join(tmp, f'export_{n_rows}.csv')
+            make_export(path, n_rows)
+            size_mb = os.path.getsize(path) / 1024 ** 2
+
+            for name, load in LOADS.items():
+                result = run_child(load.format(path=path))
+                print(f"{n_rows:>9} {size_mb:>10.0f} {name:<20} {result['seconds']:>8.2f} {result['rss_mb']:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compare loading a cleaned wave from CSV against the columnar cache.
+
+Each load runs in a fresh interpreter so peak resident memory (Linux VmHWM)
+is measured independently. Run from the repository root:  python benchmarks/bench_wave_load.py
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from survey_store import build_cache
+
+# Timed inside the child process; prints JSON with seconds and RSS growth in MB
+CHILD = '''
+import json, sys, time
+sys.path.insert(0, {root!r})
+import numpy as np
+import pandas as pd
+from survey_store import load_wave, wave_columns
+
+def rss_mb():
+    # VmHWM is per address space, so it is not inherited from the parent like ru_maxrss
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+
+base = rss_mb()
+start = time.perf_counter()
+{load}
+# Touch the data so lazily mapped columns are actually read
+total = sum(float(df[c].astype('float64').sum()) for c in df.columns if c.startswith('USE_'))
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'rss_mb': rss_mb() - base}}))
+'''
+
+LOADS = {
+    'read_csv': "df = pd.read_csv({path!r})",
+    'cache (all columns)': "df = load_wave({path!r})",
+    'cache (USE_ only)': ("cols = [c for c in wave_columns({path!r}) if c.startswith('USE_')]\n"
+                          "df = load_wave({path!r}, columns=cols)")
+}
+
+
+def make_wave(path, n_rows, seed=0):
+    # Resample the real 2024 respondents up to the requested size
+    source = pd.read_csv(os.path.join(ROOT, 'cleaned_c24.csv'))
+    rows = np.random.default_rng(seed).integers(0, len(source), n_rows)
+    source.iloc[rows].to_csv(path, index=False)
+
+
+def run_child(load):
+    code = CHILD.format(root=ROOT, load=load)
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout)
+
+
+def main():
+    print(f"{'rows':>9} {'path':<22} {'seconds':>8} {'peak RSS (MB)':>14}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_rows in (10_000, 100_000, 500_000):
+            path = os.path.join(tmp, f'wave_{n_rows}.csv')
+            make_wave(path, n_rows)
+            build_cache(path)
+
+            for name, load in LOADS.items():
+                result = run_child(load.format(path=path))
+                print(f"{n_rows:>9} {name:<22} {result['seconds']:>8.3f} {result['rss_mb']:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
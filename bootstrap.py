@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Vectorized bootstrap confidence intervals for mean-based survey metrics.
+
+A resample is stored as a row of draw counts (how often each respondent was
+picked), so the resampled means of every item come out of one matrix
+product against the item block. The same resamples are shared by all items
+of a wave, which keeps paired gaps (importance - satisfaction, interest -
+skill) consistent within each resample. Large runs can be split into
+seeded chunks and spread over a process pool; results do not depend on the
+number of processes. Survey weights scale each respondent's draw count.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from survey_metrics import as_weights, column_stats, item_matrix, pair_columns
+
+
+def draw_counts(n_rows, n_resamples, rng):
+    """(resamples x rows) matrix of how many times each row was drawn"""
+    picks = rng.integers(0, n_rows, size=(n_resamples, n_rows))
+    offsets = np.arange(n_resamples)[:, None] * n_rows
+    counts = np.bincount((picks + offsets).ravel(), minlength=n_resamples * n_rows)
+    return counts.reshape(n_resamples, n_rows).astype(np.float64)
+
+
+def _seed_sequence(seed):
+    # Accept an int seed or an already spawned SeedSequence
+    return seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+
+
+def _resampled_means(values, n_resamples, seed, weights=None):
+    # Means of every column under n_resamples shared resamples
+    mask = ~np.isnan(values)
+    filled = np.where(mask, values, 0.0)
+    draws = draw_counts(values.shape[0], n_resamples, np.random.default_rng(seed))
+    if weights is not None:
+        draws *= weights
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (draws @ filled) / (draws @ mask.astype(np.float64))
+
+
+def bootstrap_means(values, n_resamples=10000, seed=0, chunk_size=2500, processes=None, weights=None):
+    """(resamples x columns) array of bootstrap column means, optionally computed in parallel chunks"""
+    weights = as_weights(weights)
+    # A chunk's draw counts are (chunk x rows) floats; about 4M entries per chunk keeps memory
+    # flat for large pooled waves (chunk_size is an upper bound)
+    chunk_size = max(1, min(chunk_size, (1 << 22) // max(values.shape[0], 1)))
+    # One child seed per chunk keeps the result independent of the process count
+    sizes = [min(chunk_size, n_resamples - start) for start in range(0, n_resamples, chunk_size)]
+    seeds = _seed_sequence(seed).spawn(len(sizes))
+
+    if processes and processes > 1 and len(sizes) > 1:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            chunks = list(pool.map(_resampled_means, [values] * len(sizes), sizes, seeds, [weights] * len(sizes)))
+    else:
+        chunks = [_resampled_means(values, size, s, weights) for size, s in zip(sizes, seeds)]
+    return np.vstack(chunks)
+
+
+def percentile_ci(samples, level=0.95):
+    """Percentile interval of each column of a resample matrix"""
+    alpha = (1 - level) / 2
+    with np.errstate(invalid='ignore'):
+        return np.nanquantile(samples, [alpha, 1 - alpha], axis=0)
+
+
+def bootstrap_item_cis(df, cols, level=0.95, **kwargs):
+    """Mean and bootstrap CI for each item column"""
+    values = item_matrix(df, cols)
+    _, means, _ = column_stats(values, weights=kwargs.get('weights'))
+    low, high = percentile_ci(bootstrap_means(values, **kwargs), level)
+    return pd.DataFrame({'item': cols, 'mean': means, 'ci_low': low, 'ci_high': high})
+
+
+def bootstrap_paired_cis(df, left_prefix, right_prefix, level=0.95, **kwargs):
+    """Means, left-minus-right gap and their CIs for every prefixed item pair"""
+    codes, left_cols, right_cols = pair_columns(df.columns, left_prefix, right_prefix)
+    k = len(codes)
+
+    values = item_matrix(df, left_cols + right_cols)
+    _, means, _ = column_stats(values, weights=kwargs.get('weights'))
+    samples = bootstrap_means(values, **kwargs)
+
+    # Gaps are taken within each resample, so both sides share the same respondents
+    gap_samples = samples[:, :k] - samples[:, k:]
+    left_ci = percentile_ci(samples[:, :k], level)
+    right_ci = percentile_ci(samples[:, k:], level)
+    gap_ci = percentile_ci(gap_samples, level)
+
+    return pd.DataFrame({
+        'service': codes,
+        'left_mean': means[:k],
+        'left_ci_low': left_ci[0],
+        'left_ci_high': left_ci[1],
+        'right_mean': means[k:],
+        'right_ci_low': right_ci[0],
+        'right_ci_high': right_ci[1],
+        'gap': means[:k] - means[k:],
+        'gap_ci_low': gap_ci[0],
+        'gap_ci_high': gap_ci[1]
+    })
+
+
+def imp_sat_cis(df, level=0.95, **kwargs):
+    """Importance-satisfaction frame with bootstrap CIs on both ratings and the gap"""
+    pairs = bootstrap_paired_cis(df, 'IMP_', 'DS_', level, **kwargs)
+    return pairs.rename(columns={
+        'left_mean': 'importance',
+        'left_ci_low': 'importance_ci_low',
+        'left_ci_high': 'importance_ci_high',
+        'right_mean': 'satisfaction',
+        'right_ci_low': 'satisfaction_ci_low',
+        'right_ci_high': 'satisfaction_ci_high'
+    })
+
+
+def bootstrap_change_cis(df_before, df_after, cols, level=0.95, seed=0, weights_before=None, weights_after=None,
+                         **kwargs):
+    """Change in item means between two waves, resampling each wave independently (with its own weights)"""
+    seed_before, seed_after = _seed_sequence(seed).spawn(2)
+    before = item_matrix(df_before, cols)
+    after = item_matrix(df_after, cols)
+
+    _, mean_before, _ = column_stats(before, weights=weights_before)
+    _, mean_after, _ = column_stats(after, weights=weights_after)
+    before_samples = bootstrap_means(before, seed=seed_before, weights=weights_before, **kwargs)
+    after_samples = bootstrap_means(after, seed=seed_after, weights=weights_after, **kwargs)
+    before_ci = percentile_ci(before_samples, level)
+    after_ci = percentile_ci(after_samples, level)
+    change_ci = percentile_ci(after_samples - before_samples, level)
+
+    return pd.DataFrame({
+        'item': cols,
+        'before': mean_before,
+        'before_ci_low': before_ci[0],
+        'before_ci_high': before_ci[1],
+        'after': mean_after,
+        'after_ci_low': after_ci[0],
+        'after_ci_high': after_ci[1],
+        'change': mean_after - mean_before,
+        'ci_low': change_ci[0],
+        'ci_high': change_ci[1]
+    })
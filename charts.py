@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Declarative chart specs and the renderer that draws them.
+
+A ChartSpec names a report figure, the kind of chart it is (quadrant
+matrix, heatmap, radar, grouped bars, area projection), the query that
+returns its data and the drawing options that differ between figures.
+Chart-specific marks (error bars, change labels, call-out arrows) are a
+small callback drawn on top of the chart's own marks.
+
+The palettes, colormaps and shared styling live here once. ChartRenderer
+draws any spec with them, warms the font lookups the report uses, and
+records how long each figure spent drawing and laying out, so chart cost
+is profiled in one place. Data preparation runs when the report scripts
+are imported and is timed by their 'prepare' spans (see instrument.py).
+"""
+
+import time
+
+import matplotlib.pyplot as plt
+import matplotlib.ticker as mtick
+import numpy as np
+import seaborn as sns
+from matplotlib import font_manager
+from matplotlib.colors import LinearSegmentedColormap
+
+from instrument import span
+from label_layout import label_points
+
+# Report palette (FV_2.py figures)
+color_black = '#000000'  # Black
+color_gray = '#979797'   # Gray
+color_gold = '#FFBA08'   # Gold/Yellow
+
+# Presentation palette (Final_visualizations .py figures): black, gray, yellow/gold
+COLOR_SCHEME = ['#000000', '#999999', '#FFC107']
+
+# Prebuilt colormaps, shared by every figure that uses them
+GAP_CMAP = LinearSegmentedColormap.from_list("custom", [color_black, color_gray, color_gold])
+SHARE_CMAP = LinearSegmentedColormap.from_list('custom_cmap', ['#FFFFFF', '#FFC107', '#000000'], N=100)
+
+# Series colors of the radar charts
+RADAR_COLORS = [color_black, color_gold, color_gray]
+
+# Font sizes and weights used across the report, looked up once per process
+REPORT_FONTS = [(size, weight) for size in (5, 8, 9, 10, 12, 14, 16) for weight in ('normal', 'bold')]
+
+
+def set_common_style(ax, title, xlabel=None, ylabel=None):
+    """Apply common styling elements to matplotlib axes"""
+    ax.set_title(title, fontsize=14, fontweight='bold', pad=20)
+    if xlabel:
+        ax.set_xlabel(xlabel, fontsize=12)
+    if ylabel:
+        ax.set_ylabel(ylabel, fontsize=12)
+    ax.spines['top'].set_visible(False)
+    ax.spines['right'].set_visible(False)
+    ax.tick_params(axis='both', labelsize=10)
+    ax.grid(False)  # Turn off grid for cleaner look
+
+
+def style_spines(ax):
+    """Black spines on every side of the axes"""
+    for spine in ax.spines.values():
+        spine.set_edgecolor(color_black)
+
+
+class ChartSpec:
+    """One report figure: chart kind, data query, optional extra marks and fixed drawing options"""
+
+    def __init__(self, name, kind, query, marks=None, **options):
+        if kind not in DRAWERS:
+            raise ValueError(f"Unknown chart kind {kind!r}; expected one of {tuple(DRAWERS)}")
+        self.name = name
+        self.kind = kind
+        self.query = query
+        self.marks = marks
+        self.options = options
+
+    def with_options(self, **options):
+        """Copy of the spec with some drawing options replaced"""
+        return ChartSpec(self.name, self.kind, self.query, self.marks, **{**self.options, **options})
+
+    def describe(self):
+        """Name, kind and options (the spec's data part, e.g. for figure cache keys)"""
+        return {'name': self.name, 'kind': self.kind, 'options': self.options}
+
+    def functions(self):
+        """Code the figure depends on: its drawer, query and marks"""
+        return [func for func in (DRAWERS[self.kind], self.query, self.marks) if func is not None]
+
+
+def draw_quadrant(data, marks, x, y, color, label, cbar_label, quadrant_labels, title, xlabel, ylabel,
+                  cmap=GAP_CMAP, split=(3, 3), limits=((1, 5), (1, 5)), figsize=(12, 10), label_layout=False):
+    """Scatter of two ratings colored by a third, split into labeled quadrants"""
+    plt.figure(figsize=figsize, facecolor='white')
+    scatter = plt.scatter(data[x], data[y], s=100, alpha=0.8, c=data[color], cmap=cmap,
+                          edgecolor='white', linewidth=0.5)
+    if marks:
+        marks(data)
+
+    cbar = plt.colorbar(scatter)
+    cbar.set_label(cbar_label, color=color_black)
+
+    plt.axvline(x=split[0], color=color_gray, linestyle='--', alpha=0.7)
+    plt.axhline(y=split[1], color=color_gray, linestyle='--', alpha=0.7)
+    for qx, qy, text, ha in quadrant_labels:
+        plt.text(qx, qy, text, fontsize=12, ha=ha, color=color_black)
+
+    if label_layout:
+        # Overlap-free placement for scatters with many points, largest gaps placed first
+        label_points(plt.gca(), data[x], data[y], data[label], offset=(3, 3), priority=data[color].abs(),
+                     fontsize=8, color=color_black)
+    else:
+        for _, row in data.iterrows():
+            plt.annotate(row[label], (row[x], row[y]), xytext=(3, 3), textcoords='offset points',
+                         fontsize=8, color=color_black)
+
+    plt.title(title, fontsize=16, color=color_black)
+    plt.xlabel(xlabel, fontsize=14, color=color_black)
+    plt.ylabel(ylabel, fontsize=14, color=color_black)
+    plt.xlim(*limits[0])
+    plt.ylim(*limits[1])
+    plt.grid(True, linestyle='--', alpha=0.3, color=color_gray)
+    plt.tick_params(colors=color_black)
+    return plt.gcf()
+
+
+def draw_heatmap(data, marks, title, cbar_label, heatmap, cmap=GAP_CMAP, xticks=None, yticks=None,
+                 cbar_tick_color=None, clear_axis_labels=False, figsize=(14, 8)):
+    """Seaborn heatmap of a frame with the report's colorbar and tick styling"""
+    plt.figure(figsize=figsize, facecolor='white')
+    ax = sns.heatmap(data, cmap=cmap, **heatmap)
+    if marks:
+        marks(data)
+
+    cbar = ax.collections[0].colorbar
+    if cbar_tick_color:
+        cbar.ax.yaxis.set_tick_params(color=cbar_tick_color)
+    cbar.outline.set_edgecolor(color_black)
+    cbar.ax.set_ylabel(cbar_label, color=color_black)
+
+    plt.xticks(**{'color': color_black, **(xticks or {})})
+    plt.yticks(**{'color': color_black, **(yticks or {})})
+    if clear_axis_labels:
+        plt.xlabel('')
+        plt.ylabel('')
+
+    plt.title(title, fontsize=16, color=color_black)
+    return plt.gcf()
+
+
+def draw_radar(data, marks, categories, title, colors=RADAR_COLORS, label='service', figsize=(10, 10)):
+    """One closed polygon per row over the category axes, rated 0-5"""
+    n = len(categories)
+    angles = [i / float(n) * 2 * np.pi for i in range(n)]
+    angles += angles[:1]  # Close the loop
+
+    fig, ax = plt.subplots(figsize=figsize, subplot_kw=dict(polar=True), facecolor='white')
+    plt.xticks(angles[:-1], categories, size=12, color=color_black)
+
+    ax.set_rlabel_position(0)
+    plt.yticks([1, 2, 3, 4], ['1', '2', '3', '4'], color=color_gray, size=10)
+    plt.ylim(0, 5)
+    ax.grid(color=color_gray, linestyle='--', alpha=0.7)
+    for tick in ax.get_yticklabels():
+        tick.set_color(color_black)
+
+    for i, (_, row) in enumerate(data.iterrows()):
+        values = [row[cat] for cat in categories]
+        values += values[:1]
+        color = colors[i % len(colors)]
+        ax.plot(angles, values, linewidth=2, linestyle='solid', color=color, label=row[label])
+        ax.fill(angles, values, color=color, alpha=0.2)
+    if marks:
+        marks(data, angles)
+
+    plt.legend(loc='upper right', bbox_to_anchor=(0.1, 0.1), frameon=True,
+               facecolor='white', edgecolor=color_black, labelcolor=color_black)
+    plt.title(title, size=16, y=1.1, color=color_black)
+    style_spines(ax)
+    return fig
+
+
+def draw_grouped_bars(data, marks, label, series, title, ylabel, bar_width=0.35, figsize=(12, 8)):
+    """Two bars per row (series = [(column, legend label, color)] x 2) with rotated row labels"""
+    plt.figure(figsize=figsize, facecolor='white')
+    x = np.arange(len(data))
+    for offset, (column, name, color) in zip((-bar_width / 2, bar_width / 2), series):
+        plt.bar(x + offset, data[column], bar_width, label=name, color=color, edgecolor=color_black)
+    if marks:
+        marks(data, x, bar_width)
+
+    plt.xticks(x, data[label], rotation=45, ha='right', color=color_black)
+    plt.yticks(color=color_black)
+    plt.title(title, fontsize=16, color=color_black)
+    plt.ylabel(ylabel, fontsize=14, color=color_black)
+    plt.legend(facecolor='white', edgecolor=color_black, framealpha=1, labelcolor=color_black)
+    plt.grid(axis='y', linestyle='--', alpha=0.3, color=color_gray)
+    style_spines(plt.gca())
+    return plt.gcf()
+
+
+def draw_area(data, marks, series, title, xlabel, ylabel, ylim=(0, 1.0), figsize=(12, 6)):
+    """Filled share-over-time areas (series = [(column, color)]) with a percent axis"""
+    fig, ax = plt.subplots(figsize=figsize)
+    for column, color in series:
+        ax.fill_between(data.index, data[column], alpha=0.7, color=color, label=column)
+    for column, color in series:
+        ax.plot(data.index, data[column], color=color, linewidth=2)
+    if marks:
+        marks(ax, data)
+
+    ax.set_xlim(data.index[0], data.index[-1])
+    ax.set_ylim(*ylim)
+    ax.yaxis.set_major_formatter(mtick.PercentFormatter(1.0))
+    set_common_style(ax, title, xlabel=xlabel, ylabel=ylabel)
+    ax.legend(loc='upper center', bbox_to_anchor=(0.5, -0.15), ncol=len(series), fontsize=10)
+    return fig
+
+
+DRAWERS = {
+    'quadrant': draw_quadrant,
+    'heatmap': draw_heatmap,
+    'radar': draw_radar,
+    'grouped_bars': draw_grouped_bars,
+    'area': draw_area
+}
+
+
+class ChartRenderer:
+    """Draws chart specs with the shared styles and records per-stage timings for each figure"""
+
+    def __init__(self):
+        self.timings = []
+        self.warmed = False
+
+    def warm(self):
+        """Resolve and load the report's fonts once, before the first figure needs them"""
+        if not self.warmed:
+            for size, weight in REPORT_FONTS:
+                path = font_manager.findfont(font_manager.FontProperties(size=size, weight=weight))
+                font_manager.get_font(path)
+            self.warmed = True
+
+    def render(self, spec, data=None, show=True, **flags):
+        """Query (unless data is given), draw and lay out one spec; flags go to the spec's marks"""
+        self.warm()
+        if data is None:
+            with span(f'{spec.name}.query', 'prepare'):
+                data = spec.query()
+        start = time.perf_counter()
+
+        marks = None
+        if spec.marks is not None:
+            marks = lambda *args: spec.marks(*args, **flags)
+        with span(f'draw_{spec.kind}', 'build', spec=spec.name):
+            fig = DRAWERS[spec.kind](data, marks, **spec.options)
+        drawn = time.perf_counter()
+
+        with span('tight_layout', 'layout'):
+            plt.tight_layout()
+        self.timings.append({'name': spec.name, 'kind': spec.kind, 'draw_seconds': drawn - start,
+                             'layout_seconds': time.perf_counter() - drawn})
+        if show:
+            plt.show()
+        return fig
+
+
+renderer = ChartRenderer()
+
+
+def render_chart(spec, data=None, **flags):
+    """Draw a spec with the shared renderer"""
+    return renderer.render(spec, data, **flags)
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Service codebook shared by every chart.
+
+One table maps each service code to its display label and category, and
+records which item families (USE/IMP/DS/SKL/LRN/DA...) ask about it in
+which waves. Families and wave availability are read from the wave headers
+on their first lookup, so importing the module touches no data; lookups are
+dict hits and whole label arrays are relabeled through one factorize/take.
+"""
+
+import numpy as np
+import pandas as pd
+
+from survey_store import wave_columns
+from wave_metrics import DATA_DIR, discover_waves
+
+# Item column prefixes, longest first so UAP_ is not read as AP_
+FAMILY_PREFIXES = ('USE_', 'IMP_', 'DS_', 'INF_', 'UAP_', 'AP_', 'OWN_', 'SKL_', 'LRN_')
+
+SERVICE_LABELS = {
+    'AORO': 'Access to Online Resources Off-campus',
+    'BL': 'Borrowing Laptops',
+    'CFUS': 'Copyright and Fair Use Support',
+    'CMS': 'Content Management System',
+    'CMSGB': 'Canvas Grade Book',
+    'CS': 'Classroom Support',
+    'CWS': 'Campus Wireless System',
+    'ERP': 'Enterprise Resource Planning',
+    'ERPSS': 'Enterprise Resource Planning System',
+    'FPC': 'Faculty Professional Community',
+    'GAIT': 'Generative AI Tools',
+    'IDS': 'Instructional Design Services',
+    'IFE': 'Identifying Fraudulent Emails',
+    'ITS': 'Instructional Technology Support',
+    'LC': 'Learning Commons',
+    'LCS': 'Lecture Capture Software',
+    'LEC': 'Learning Environment Configuration',
+    'LSG': 'Learning Support Group',
+    'OAV': 'Online Audio/Video',
+    'OLC': 'Online Learning Commons',
+    'PIRO': 'Protecting Identity/Reputation Online',
+    'STMS': 'Support for Technology in Meeting Spaces',
+    'SWC': 'Web Conferencing',
+    'TMS': 'Technology in Meeting Spaces',
+    'VPN': 'Virtual Private Network',
+    # Staff units rated on the DA<unit>_<attribute> items
+    'DAASC': 'Academic Support Center Staff',
+    'DAERPS': 'ERP System Support Staff',
+    'DAHD': 'Help Desk Staff',
+    'DAIT': 'Instructional Technology Staff',
+    'DAMMS': 'Multimedia Services Staff'
+}
+
+SERVICE_CATEGORIES = {
+    'Teaching & Learning': ['CMS', 'CMSGB', 'GAIT', 'IDS', 'ITS', 'LCS', 'OAV', 'OLC', 'SWC'],
+    'Learning Spaces': ['BL', 'CS', 'LC', 'LEC', 'LSG', 'STMS', 'TMS'],
+    'Infrastructure': ['AORO', 'CWS', 'ERP', 'ERPSS', 'VPN'],
+    'Professional Development': ['CFUS', 'FPC'],
+    'Security': ['IFE', 'PIRO'],
+    'Support Staff': ['DAASC', 'DAERPS', 'DAHD', 'DAIT', 'DAMMS']
+}
+
+# Rated attributes of the DA staff items
+STAFF_ATTRIBUTES = {'F': 'Friendly', 'K': 'Knowledgeable', 'RL': 'Reliable', 'RS': 'Responsive'}
+
+
+def split_item(column):
+    """(family, code) of an item column, or (None, column) for non-item columns"""
+    for prefix in FAMILY_PREFIXES:
+        if column.startswith(prefix):
+            return prefix[:-1], column[len(prefix):]
+    if column.startswith('DA') and '_' in column:
+        return 'DA', column.split('_', 1)[0]
+    return None, column
+
+
+class Codebook:
+    """Indexed service codebook: code -> label, category, item families and waves"""
+
+    def __init__(self, labels=SERVICE_LABELS, categories=SERVICE_CATEGORIES, folder=None):
+        self.labels = dict(labels)
+        self.categories = {code: name for name, codes in categories.items() for code in codes}
+        self._families = {}
+        self._waves = {}
+        # Wave folder still to be read; headers (and their caches) are only touched on first lookup
+        self._folder = folder
+
+    @classmethod
+    def from_folder(cls, folder=DATA_DIR):
+        """Codebook with families and wave availability read from every wave header on first use"""
+        return cls(folder=folder)
+
+    def _load(self):
+        if self._folder is not None:
+            folder, self._folder = self._folder, None
+            for wave, path in discover_waves(folder).items():
+                self.add_wave(wave, wave_columns(path))
+
+    @property
+    def families(self):
+        self._load()
+        return self._families
+
+    @property
+    def waves(self):
+        self._load()
+        return self._waves
+
+    def add_wave(self, wave, columns):
+        """Record which codes and families a wave's columns cover"""
+        self._load()
+        for column in columns:
+            family, code = split_item(column)
+            if family is None:
+                continue
+            self._families.setdefault(code, {}).setdefault(family, set()).add(str(wave))
+            self._waves.setdefault(code, set()).add(str(wave))
+
+    def label(self, code):
+        """Display label of a code (the code itself if it has none)"""
+        return self.labels.get(code, code)
+
+    def category(self, code):
+        return self.categories.get(code, 'Other')
+
+    def item_label(self, column):
+        """Display label of an item column such as USE_CMS or DAHD_K"""
+        return self.label(split_item(column)[1])
+
+    def relabel(self, codes):
+        """Labels for a whole array of codes, looking each distinct code up once"""
+        inverse, uniques = pd.factorize(np.asarray(codes, dtype=object), use_na_sentinel=False)
+        labels = np.array([self.labels.get(code, code) for code in uniques], dtype=object)
+        return labels[inverse]
+
+    def relabel_items(self, columns):
+        """Labels for a whole array of item columns (prefixes stripped)"""
+        inverse, uniques = pd.factorize(np.asarray(columns, dtype=object), use_na_sentinel=False)
+        return self.relabel([split_item(column)[1] for column in uniques])[inverse]
+
+    def label_index(self, index, items=False):
+        """Relabeled copy of a pandas Index, keeping its name"""
+        labels = self.relabel_items(index) if items else self.relabel(index)
+        return pd.Index(labels, name=index.name)
+
+    def codes(self, family=None, wave=None, category=None):
+        """Codes asked in a family and/or wave, or belonging to a category"""
+        found = sorted(set(self.labels) | set(self.waves))
+        if family is not None:
+            found = [code for code in found if family in self.families.get(code, {})]
+        if wave is not None:
+            found = [code for code in found if str(wave) in self.waves.get(code, ())]
+        if category is not None:
+            found = [code for code in found if self.category(code) == category]
+        return found
+
+    def table(self):
+        """The whole codebook as a frame indexed by code"""
+        codes = self.codes()
+        return pd.DataFrame({
+            'label': [self.label(code) for code in codes],
+            'category': [self.category(code) for code in codes],
+            'families': [','.join(sorted(self.families.get(code, ()))) for code in codes],
+            'waves': [','.join(sorted(self.waves.get(code, ()))) for code in codes]
+        }, index=pd.Index(codes, name='code'))
+
+
+# Shared by every chart; wave headers are read the first time families or waves are needed
+CODEBOOK = Codebook.from_folder()
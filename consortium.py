@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pooled multi-institution mode over partitioned survey waves.
+
+A consortium folder holds one sub-folder per institution, each laid out like
+the report's own data folder (cleaned_cYY.csv files with their columnar
+caches), so every (institution, wave) pair is a partition stored on its own.
+Partitions are aggregated independently across a process pool. Each worker
+reads its partition in row chunks and folds them into an AggregateStore
+(count / sum / sum of squares / histogram per division and item), so no
+process ever holds more than one chunk of respondents. The parent merges
+the per-partition statistics as they arrive, and only re-aggregates
+partitions whose source file changed since the last run.
+
+Peer benchmarks come from the same statistics: a campus is compared with
+the pool minus itself, for the importance-satisfaction matrix and the
+division usage heatmap.
+
+    python consortium.py /data/miso_consortium --wave 2024 --institution campus_017 --processes 8
+"""
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from incremental import AggregateStore
+from instrument import span
+from survey_metrics import item_columns
+from survey_store import ensure_cache, load_wave, load_weights, wave_columns
+from wave_metrics import discover_waves
+
+# Cells of the per-partition statistics; AGE_BAND etc. can be added at the cost of more cells
+PARTITION_KEYS = ('ADIV',)
+
+
+def discover_partitions(root, waves=None):
+    """Map (institution, wave) -> cleaned CSV path for every institution sub-folder of root"""
+    waves = None if waves is None else {str(w) for w in waves}
+    partitions = {}
+    for institution in sorted(os.listdir(root)):
+        folder = os.path.join(root, institution)
+        if os.path.isdir(folder) and not institution.startswith('.'):
+            for wave, path in discover_waves(folder).items():
+                if waves is None or wave in waves:
+                    partitions[institution, wave] = path
+    return partitions
+
+
+def file_stamp(path):
+    """Cheap change check of a source file: (size, mtime in ns)"""
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def aggregate_partition(path, by=PARTITION_KEYS, weights=None, chunk_rows=50_000, known=None):
+    """(sufficient statistics, source checksum) of one partition, read and folded in row chunks"""
+    # The cache is built or validated here, in the worker; known is the checksum the caller already
+    # has statistics for, so a touched-but-identical file comes back as (None, known) without a read
+    with span('aggregate_partition', 'prepare', source=path):
+        schema = ensure_cache(path)
+        if schema['source_sha256'] == known:
+            return None, known
+        n_rows = schema['n_rows']
+        header = wave_columns(path)
+        key_columns = ['AGE' if key == 'AGE_BAND' else key for key in by]
+        columns = item_columns(header) + [col for col in key_columns if col in header]
+
+        w = None
+        if weights is not None:
+            w = load_weights(path, weights)
+            if w is None:
+                raise KeyError(f"No weights named {weights!r} stored for {path}")
+
+        store = AggregateStore(by=by, weighted=w is not None)
+        for start in range(0, n_rows, chunk_rows):
+            rows = np.arange(start, min(start + chunk_rows, n_rows))
+            chunk = load_wave(path, columns=columns, rows=rows)
+            store.ingest(chunk, None if w is None else np.asarray(w[rows], dtype=np.float64))
+        return store, schema['source_sha256']
+
+
+class Consortium:
+    """Per-partition aggregates of many institutions' waves, merged through mergeable statistics"""
+
+    def __init__(self, root, waves=None, by=PARTITION_KEYS, weights=None, chunk_rows=50_000):
+        self.root = root
+        self.wave_filter = waves
+        self.by = tuple(by)
+        self.weights = weights
+        self.chunk_rows = chunk_rows
+        self.partitions = discover_partitions(root, waves)
+        self.stores = {}
+        self.stamps = {}
+
+    def institutions(self):
+        return sorted({institution for institution, _ in self.partitions})
+
+    def waves(self):
+        return sorted({wave for _, wave in self.partitions})
+
+    def aggregate(self, processes=None):
+        """Aggregate every new or changed partition over a process pool; returns how many were run"""
+        self.partitions = discover_partitions(self.root, self.wave_filter)
+        # Only a stat per partition here: parsing and hashing new or touched files happens in the workers
+        stale = {}
+        for key, path in self.partitions.items():
+            stamp = file_stamp(path)
+            if key not in self.stamps or self.stamps[key][0] != stamp:
+                stale[key] = (path, stamp)
+
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            futures = {pool.submit(aggregate_partition, path, self.by, self.weights, self.chunk_rows,
+                                   self.stamps.get(key, (None, None))[1]): (key, stamp)
+                       for key, (path, stamp) in stale.items()}
+            # Keep each partition's statistics as they arrive instead of waiting for the slowest
+            for future in as_completed(futures):
+                key, stamp = futures[future]
+                store, checksum = future.result()
+                if store is not None:
+                    self.stores[key] = store
+                self.stamps[key] = (stamp, checksum)
+
+        # Drop partitions whose files went away
+        for key in set(self.stores) - set(self.partitions):
+            del self.stores[key], self.stamps[key]
+        return len(stale)
+
+    def _require(self, wave, institution=None):
+        if not self.stores:
+            self.aggregate()
+        if institution is not None and (institution, str(wave)) not in self.stores:
+            raise KeyError(f"No partition for institution {institution!r}, wave {wave}")
+
+    def pooled(self, wave, exclude=None):
+        """Statistics of one wave merged over every institution, optionally leaving one out"""
+        self._require(wave, exclude)
+        store = AggregateStore(by=self.by, weighted=self.weights is not None)
+        for (institution, partition_wave), partition in sorted(self.stores.items()):
+            if partition_wave == str(wave) and institution != exclude:
+                store.merge(partition)
+        return store
+
+    def campus(self, institution, wave):
+        """Statistics of a single partition"""
+        self._require(wave, institution)
+        return self.stores[institution, str(wave)]
+
+    def peer_imp_sat(self, institution, wave):
+        """A campus's importance-satisfaction pairs next to the same pairs of all other campuses"""
+        own = self.campus(institution, wave).imp_sat().set_index('service')
+        pool = self.pooled(wave)
+        peers = pool.subtract(self.campus(institution, wave)).imp_sat().set_index('service')
+        peers = peers.reindex(own.index)
+
+        result = own[['importance', 'satisfaction', 'gap']].copy()
+        result['peer_importance'] = peers['importance']
+        result['peer_satisfaction'] = peers['satisfaction']
+        result['peer_gap'] = peers['gap']
+        # Positive: this campus has a larger unmet need than its peers for the service
+        result['gap_vs_peers'] = result['gap'] - result['peer_gap']
+        return result.reset_index()
+
+    def division_usage(self, wave, institution=None, prefix='USE_'):
+        """Mean of every usage item per division (division x item), pooled or for one campus"""
+        store = self.pooled(wave) if institution is None else self.campus(institution, wave)
+        means = store.summary(by=['ADIV'])['mean']
+        cols = [item for item in means.columns if item.startswith(prefix)]
+        return means[cols].dropna(how='all')
+
+    def peer_division_usage(self, institution, wave, prefix='USE_'):
+        """Campus minus peer usage per division and item (positive = the campus uses it more)"""
+        own = self.division_usage(wave, institution, prefix)
+        peers = self.pooled(wave).subtract(self.campus(institution, wave)).summary(by=['ADIV'])['mean']
+        return own - peers.reindex(index=own.index, columns=own.columns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Aggregate a consortium of campus waves and benchmark one campus')
+    parser.add_argument('root', help='folder with one sub-folder of cleaned waves per institution')
+    parser.add_argument('--wave', default='2024')
+    parser.add_argument('--institution', default=None, help='campus to benchmark against its peers')
+    parser.add_argument('--weights', default=None, help='stored weight set to apply in every partition')
+    parser.add_argument('--processes', type=int, default=None)
+    args = parser.parse_args()
+
+    consortium = Consortium(args.root, waves=[args.wave], weights=args.weights)
+    n = consortium.aggregate(processes=args.processes)
+    print(f"{len(consortium.institutions())} institutions, {n} partitions aggregated")
+
+    if args.institution is None:
+        print(consortium.pooled(args.wave).imp_sat().round(3).to_string(index=False))
+        print()
+        print(consortium.division_usage(args.wave).round(2).to_string())
+    else:
+        print(consortium.peer_imp_sat(args.institution, args.wave).round(3).to_string(index=False))
+        print()
+        print(consortium.peer_division_usage(args.institution, args.wave).round(2).to_string())
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
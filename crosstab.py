@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Contingency tables for any pair or triple of coded survey items.
+
+Each item is encoded once per wave into integer level codes (-1 for a
+missing answer) over a fixed level set: the family's answer range for coded
+items, the stored categories for demographics. A crosstab is then one
+bincount over the combined codes, optionally weighted, followed by row and
+column percentages and a chi-square test of independence. With a third
+item the table is split into layers and the test is for independence
+within every layer. Results are cached per wave until the file changes.
+
+    python crosstab.py 2024 TREM TLIVE
+"""
+
+import argparse
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+from distributions import chi2_sf
+from stream_ingest import FAMILY_SCALES
+from survey_store import ensure_cache, load_wave, load_weights
+
+
+def item_levels(column):
+    """Answer codes of a coded item family, or None for uncoded columns"""
+    for prefix, _, lo, hi in FAMILY_SCALES:
+        if column.startswith(prefix):
+            return list(range(lo, hi + 1))
+    return None
+
+
+def encode(values, levels=None):
+    """(codes, levels) of a column: codes index into levels, -1 where missing or off-scale"""
+    if isinstance(values, pd.Categorical):
+        levels = list(values.categories) if levels is None else list(levels)
+        codes = pd.Categorical(values, categories=levels).codes.astype(np.int64)
+        return codes, levels
+
+    values = pd.array(values)
+    if pd.api.types.is_numeric_dtype(values.dtype):
+        numbers = values.to_numpy(dtype=np.float64, na_value=np.nan)
+        if levels is None:
+            levels = [int(v) if v == int(v) else v for v in np.unique(numbers[~np.isnan(numbers)])]
+        # Off-scale codes and NaN are not in the index, so they come back as -1
+        codes = pd.Index(np.asarray(levels, dtype=np.float64)).get_indexer(numbers)
+        return codes.astype(np.int64), list(levels)
+
+    # Strings: levels in sorted order unless given
+    strings = pd.Series(values, dtype=object)
+    if levels is None:
+        levels = sorted(strings.dropna().unique())
+    return pd.Categorical(strings, categories=levels).codes.astype(np.int64), list(levels)
+
+
+def crosstab_counts(codes, sizes, weights=None):
+    """Counts (or weight totals) over every combination of level codes, shaped by sizes"""
+    codes = [np.asarray(c) for c in codes]
+    complete = np.logical_and.reduce([c >= 0 for c in codes])
+    flat = np.ravel_multi_index([c[complete] for c in codes], sizes)
+    w = None if weights is None else np.asarray(weights, dtype=np.float64)[complete]
+    return np.bincount(flat, weights=w, minlength=int(np.prod(sizes))).reshape(sizes)
+
+
+def chi_square(counts):
+    """Pearson chi-square and degrees of freedom for a (layers x rows x cols) table"""
+    counts = np.asarray(counts, dtype=np.float64)
+    if counts.ndim == 2:
+        counts = counts[np.newaxis]
+
+    stat, dof = 0.0, 0
+    for layer in counts:
+        rows, cols = layer.sum(axis=1), layer.sum(axis=0)
+        total = rows.sum()
+        if not total:
+            continue
+        expected = np.outer(rows, cols) / total
+        nonzero = expected > 0
+        stat += float((((layer - expected) ** 2)[nonzero] / expected[nonzero]).sum())
+        # Empty rows and columns carry no information
+        dof += max(int((rows > 0).sum()) - 1, 0) * max(int((cols > 0).sum()) - 1, 0)
+    return stat, dof
+
+
+def _share(counts, axis):
+    totals = counts.sum(axis=axis, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(totals > 0, counts / totals, np.nan)
+
+
+def summarize(counts, levels, items):
+    """Counts, percentages and chi-square of a 2-D or 3-D table as a dict of frames and numbers"""
+    stat, dof = chi_square(counts if counts.ndim == 2 else np.moveaxis(counts, 2, 0))
+    n = float(counts.sum())
+    result = {'items': tuple(items), 'n': n, 'chi2': stat, 'dof': dof, 'p_value': chi2_sf(stat, dof)}
+
+    if counts.ndim == 2:
+        index = pd.Index(levels[0], name=items[0])
+        columns = pd.Index(levels[1], name=items[1])
+        shares = {'row_pct': _share(counts, 1), 'col_pct': _share(counts, 0),
+                  'total_pct': counts / n if n else np.full(counts.shape, np.nan)}
+        k = min((counts.sum(axis=1) > 0).sum(), (counts.sum(axis=0) > 0).sum())
+        result['cramers_v'] = math.sqrt(stat / (n * (k - 1))) if n and k > 1 else np.nan
+    else:
+        # Layer item outermost, so each block of rows is one 2-D table
+        counts = np.moveaxis(counts, 2, 0)
+        index = pd.MultiIndex.from_product([levels[2], levels[0]], names=[items[2], items[0]])
+        columns = pd.Index(levels[1], name=items[1])
+        layer_n = counts.sum(axis=(1, 2), keepdims=True)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            total_pct = np.where(layer_n > 0, counts / layer_n, np.nan)
+        shares = {'row_pct': _share(counts, 2), 'col_pct': _share(counts, 1), 'total_pct': total_pct}
+        counts = counts.reshape(-1, counts.shape[2])
+        shares = {name: share.reshape(counts.shape) for name, share in shares.items()}
+
+    result['counts'] = pd.DataFrame(counts, index=index, columns=columns)
+    for name, share in shares.items():
+        result[name] = pd.DataFrame(share, index=index, columns=columns)
+    return result
+
+
+def contingency(df, items, weights=None, levels=None):
+    """Crosstab of two or three columns of a frame; levels optionally fixes each item's level list"""
+    if len(items) not in (2, 3):
+        raise ValueError(f"A crosstab takes two or three items, got {len(items)}")
+    levels = levels or [None] * len(items)
+    encoded = [encode(df[item].array, lv if lv is not None else item_levels(item))
+               for item, lv in zip(items, levels)]
+    codes = [c for c, _ in encoded]
+    found = [lv for _, lv in encoded]
+    counts = crosstab_counts(codes, [len(lv) for lv in found], weights)
+    return summarize(counts, found, items)
+
+
+class WaveCrosstabs:
+    """Per-wave crosstab cache: items are encoded once, tables are computed once per key"""
+
+    def __init__(self, csv_path):
+        self.csv_path = csv_path
+        self.stamp = None
+        self.refresh()
+
+    def refresh(self):
+        """Drop cached codes and tables if the wave file changed since they were built"""
+        stat = os.stat(self.csv_path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp != self.stamp:
+            ensure_cache(self.csv_path)
+            self.stamp = stamp
+            self.codes = {}
+            self.weights = {}
+            self.tables = {}
+
+    def _encoded(self, item, levels):
+        key = (item, None if levels is None else tuple(levels))
+        if key not in self.codes:
+            values = load_wave(self.csv_path, columns=[item])[item].array
+            self.codes[key] = encode(values, levels if levels is not None else item_levels(item))
+        return self.codes[key]
+
+    def _weights(self, name):
+        if name not in self.weights:
+            weights = load_weights(self.csv_path, name)
+            if weights is None:
+                raise KeyError(f"No weights named {name!r} stored for {self.csv_path}")
+            self.weights[name] = np.asarray(weights, dtype=np.float64)
+        return self.weights[name]
+
+    def crosstab(self, items, weights=None, levels=None):
+        """Cached crosstab of two or three items; weights names a stored weight set"""
+        items = tuple(items)
+        if len(items) not in (2, 3):
+            raise ValueError(f"A crosstab takes two or three items, got {len(items)}")
+        levels = tuple(None if lv is None else tuple(lv) for lv in (levels or [None] * len(items)))
+        key = (items, weights, levels)
+        if key not in self.tables:
+            encoded = [self._encoded(item, lv) for item, lv in zip(items, levels)]
+            w = None if weights is None else self._weights(weights)
+            counts = crosstab_counts([c for c, _ in encoded], [len(lv) for _, lv in encoded], w)
+            self.tables[key] = summarize(counts, [lv for _, lv in encoded], items)
+        return self.tables[key]
+
+
+_engines = {}
+
+
+def wave_crosstab(csv_path, items, weights=None, levels=None):
+    """Crosstab of items in one wave file, served from the per-wave cache"""
+    engine = _engines.get(csv_path)
+    if engine is None:
+        engine = _engines[csv_path] = WaveCrosstabs(csv_path)
+    else:
+        engine.refresh()
+    return engine.crosstab(items, weights, levels)
+
+
+def main():
+    from wave_metrics import discover_waves
+
+    parser = argparse.ArgumentParser(description='Crosstab two or three items of one survey wave')
+    parser.add_argument('wave', help='survey year, e.g. 2024')
+    parser.add_argument('items', nargs='+', help='two or three item columns (the third splits layers)')
+    parser.add_argument('--weights', default=None, help='stored weight set to apply')
+    parser.add_argument('--pct', choices=['counts', 'row_pct', 'col_pct', 'total_pct'], default='counts')
+    args = parser.parse_args()
+
+    result = wave_crosstab(discover_waves()[args.wave], args.items, args.weights)
+    print(result[args.pct].round(3).to_string())
+    print(f"\nn = {result['n']:.0f}, chi2 = {result['chi2']:.2f}, dof = {result['dof']}, "
+          f"p = {result['p_value']:.4g}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Self-contained HTML dashboard built from pre-aggregated data cubes.
+
+Respondents of every wave are reduced once into a base cuboid: the
+respondent count, weight total and weighted sum of every Likert item (all
+of which merge by addition) for each combination of the slicing dimensions
+(ADIV, RANK, TEN and the AGE band) that occurs. Every coarser group-by
+(16 cuboids for four dimensions, "All" standing in for the dimensions left
+out) is rolled up from the base cuboid by addition, never from the
+respondents again. Cells with fewer than min_cell respondents are
+suppressed, and empty ones are dropped.
+
+The cube is stored as gzipped JSON inside one HTML file with a small
+script (no external libraries, works offline), so the dashboard can be
+emailed and sliced by division, rank, tenure and age without Python.
+
+    python dashboard.py --out miso_dashboard.html --weights raking --min-cell 5
+"""
+
+import argparse
+import base64
+import gzip
+import json
+import os
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from charts import color_black, color_gold, color_gray
+from codebook import CODEBOOK
+from stream_ingest import FAMILY_SCALES
+from survey_metrics import age_band, item_matrix
+from wave_metrics import TENURE_LABELS
+
+# Slicing dimensions and how the dashboard names them
+DIMENSIONS = {'ADIV': 'Academic division', 'RANK': 'Rank', 'TEN': 'Tenure', 'AGE': 'Age'}
+# Likert families shown in the dashboard (checkbox families have no mean to compare)
+DASHBOARD_FAMILIES = {'USE_': 'Usage', 'IMP_': 'Importance', 'DS_': 'Satisfaction', 'SKL_': 'Skill',
+                      'LRN_': 'Learning interest', 'INF_': 'Infrastructure'}
+NO_ANSWER = 'No answer'
+
+
+def dimension_values(df, dim):
+    """A slicing dimension as a categorical with NaN for no answer (AGE is banded, TEN shortened)"""
+    if dim == 'AGE':
+        return age_band(df['AGE'])
+    values = df[dim].astype('category')
+    if dim == 'TEN':
+        # Relabel the categories, not every row
+        values = values.cat.rename_categories(lambda v: TENURE_LABELS.get(v, v))
+    return values
+
+
+def dimension_codes(frames, dimensions=tuple(DIMENSIONS)):
+    """Level lists shared by all waves and per-wave (rows x dimensions) level codes"""
+    values = {wave: [dimension_values(df, dim) for dim in dimensions] for wave, df in frames.items()}
+    levels = []
+    for d in range(len(dimensions)):
+        column = [values[wave][d] for wave in frames]
+        found = sorted(set().union(*(v.dropna().unique().tolist() for v in column)))
+        # Respondents who skipped the question still count towards "All"
+        levels.append(found + ([NO_ANSWER] if any(v.isna().any() for v in column) else []))
+
+    codes = {}
+    for wave in frames:
+        wave_codes = [pd.Series(v).cat.set_categories(lv[:len(lv) - (lv[-1] == NO_ANSWER)]).cat.codes
+                      .to_numpy(np.int64) for v, lv in zip(values[wave], levels)]
+        codes[wave] = np.column_stack([np.where(c < 0, len(lv) - 1, c) for c, lv in zip(wave_codes, levels)])
+    return levels, codes
+
+
+def base_cuboid(values, codes, sizes, weights=None):
+    """Level codes of the occupied cells with each item's respondent count, weight total and weighted sum"""
+    flat = np.ravel_multi_index(codes.T, sizes)
+    occupied, inverse = np.unique(flat, return_inverse=True)
+    n_cells, k = len(occupied), values.shape[1]
+
+    # Few cells and many rows: one bincount per item beats sorting the rows into groups
+    answered = ~np.isnan(values)
+    filled = np.where(answered, values, 0.0)
+    w = None if weights is None else np.asarray(weights, dtype=np.float64)
+    n, counts, sums = (np.empty((n_cells, k)) for _ in range(3))
+    for j in range(k):
+        n[:, j] = np.bincount(inverse, weights=answered[:, j], minlength=n_cells)
+        # The raw count decides suppression; weighted totals give the means
+        counts[:, j] = n[:, j] if w is None else np.bincount(inverse, weights=answered[:, j] * w, minlength=n_cells)
+        sums[:, j] = np.bincount(inverse, weights=filled[:, j] if w is None else filled[:, j] * w, minlength=n_cells)
+    cells = np.column_stack(np.unravel_index(occupied, sizes))
+    return cells, n, counts, sums
+
+
+def roll_up(cells, stats, keep):
+    """Sum (cells x items) stats over the dimensions not in keep; returns the kept cell codes and sums"""
+    if not keep:
+        return np.zeros((1, 0), dtype=np.int64), [stat.sum(axis=0, keepdims=True) for stat in stats]
+    kept = cells[:, keep]
+    order = np.lexsort(kept.T[::-1])
+    kept = kept[order]
+    starts = np.flatnonzero(np.r_[True, (kept[1:] != kept[:-1]).any(axis=1)])
+    return kept[starts], [np.add.reduceat(stat[order], starts, axis=0) for stat in stats]
+
+
+def build_cube(frames, items, weights=None, min_cell=5, dimensions=tuple(DIMENSIONS)):
+    """Every group-by of the dimensions for every wave, as the dashboard's JSON-ready dict"""
+    levels, codes = dimension_codes(frames, dimensions)
+    sizes = [len(lv) for lv in levels]
+    cuboids = []
+    for wave, df in frames.items():
+        w = None if weights is None else weights.get(wave)
+        cells, n, counts, sums = base_cuboid(item_matrix(df, items), codes[wave], sizes, w)
+
+        for size in range(len(dimensions) + 1):
+            for keep in combinations(range(len(dimensions)), size):
+                kept, (cell_n, cell_counts, cell_sums) = roll_up(cells, [n, counts, sums], list(keep))
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    means = cell_sums / cell_counts
+                shown = cell_n >= min_cell
+                rows = shown.any(axis=1)
+                cuboids.append({
+                    'wave': wave,
+                    'mask': sum(1 << d for d in keep),
+                    'cells': kept[rows].tolist(),
+                    # Suppressed and unasked entries are 0; means are stored in hundredths
+                    'n': np.where(shown, cell_n, 0)[rows].astype(np.int64).ravel().tolist(),
+                    'mean': np.where(shown, np.round(np.nan_to_num(means) * 100), 0)[rows]
+                              .astype(np.int64).ravel().tolist()
+                })
+
+    families = [prefix for prefix in DASHBOARD_FAMILIES if any(item.startswith(prefix) for item in items)]
+    return {
+        'waves': list(frames),
+        'min_cell': min_cell,
+        'weighted': weights is not None,
+        'dimensions': [{'name': dim, 'label': DIMENSIONS.get(dim, dim), 'levels': [str(lv) for lv in lvs]}
+                       for dim, lvs in zip(dimensions, levels)],
+        'families': [{'prefix': prefix, 'label': DASHBOARD_FAMILIES[prefix]} for prefix in families],
+        'items': [{'code': item, 'label': str(label), 'family': next(p for p in families if item.startswith(p)),
+                   'scale': _item_scale(item)} for item, label in zip(items, CODEBOOK.relabel_items(items))],
+        'cuboids': cuboids
+    }
+
+
+def _item_scale(item):
+    for prefix, _, lo, hi in FAMILY_SCALES:
+        if item.startswith(prefix):
+            return [lo, hi]
+    return [1, 5]
+
+
+def store_cube(store, waves=None, weights=None, min_cell=5):
+    """build_cube over the dashboard families of a LongitudinalStore's waves"""
+    waves = [str(w) for w in (waves if waves is not None else store.waves())]
+    items = [item for item in store.items(waves, shared=False) if item.startswith(tuple(DASHBOARD_FAMILIES))]
+    frames = {wave: store.frame(wave, items + list(DIMENSIONS)) for wave in waves}
+    w = None if weights is None else {wave: store.weights(wave, weights) for wave in waves}
+    return build_cube(frames, items, w, min_cell)
+
+
+def encode_cube(cube):
+    """Gzipped, base64-encoded JSON of a cube (what the HTML embeds)"""
+    raw = json.dumps(cube, separators=(',', ':')).encode()
+    return base64.b64encode(gzip.compress(raw, compresslevel=9, mtime=0)).decode('ascii')
+
+
+def render_dashboard(cube, title='MISO Faculty Survey Dashboard'):
+    """The self-contained dashboard page for a cube"""
+    palette = json.dumps({'black': color_black, 'gray': color_gray, 'gold': color_gold})
+    return (DASHBOARD_TEMPLATE.replace('__TITLE__', title).replace('__PALETTE__', palette)
+            .replace('__CUBE__', encode_cube(cube)))
+
+
+def write_dashboard(path, store=None, waves=None, weights=None, min_cell=5):
+    """Build the cube from the waves and write the dashboard; returns the file size in bytes"""
+    from longitudinal import LongitudinalStore
+
+    store = store or LongitudinalStore.from_folder()
+    html = render_dashboard(store_cube(store, waves, weights, min_cell))
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(html)
+    return os.path.getsize(path)
+
+
+DASHBOARD_TEMPLATE = r'''<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>__TITLE__</title>
+<style>
+  body { font-family: Helvetica, Arial, sans-serif; margin: 24px; color: #000; background: #fff; }
+  h1 { font-size: 22px; margin: 0 0 4px; }
+  #note { color: #555; font-size: 12px; margin-bottom: 16px; }
+  #controls { display: flex; flex-wrap: wrap; gap: 12px 20px; margin-bottom: 18px; }
+  #controls label { font-size: 12px; display: flex; flex-direction: column; gap: 3px; }
+  select { font-size: 13px; padding: 2px 4px; }
+  table { border-collapse: collapse; font-size: 12px; }
+  td, th { border: 1px solid #fff; padding: 3px 6px; text-align: center; }
+  th { background: #000; color: #fff; font-weight: normal; }
+  td.item { text-align: left; white-space: nowrap; }
+  svg text { font-size: 11px; }
+</style>
+</head>
+<body>
+<h1>__TITLE__</h1>
+<div id="note"></div>
+<div id="controls"></div>
+<div id="view"></div>
+<script>
+const PALETTE = __PALETTE__;
+const CUBE_DATA = "__CUBE__";
+
+async function loadCube() {
+  const bytes = Uint8Array.from(atob(CUBE_DATA), c => c.charCodeAt(0));
+  const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('gzip'));
+  return JSON.parse(await new Response(stream).text());
+}
+
+function el(tag, attrs, text) {
+  const node = document.createElement(tag);
+  for (const [k, v] of Object.entries(attrs || {})) node.setAttribute(k, v);
+  if (text !== undefined) node.textContent = text;
+  return node;
+}
+
+function svgEl(tag, attrs, text) {
+  const node = document.createElementNS('http://www.w3.org/2000/svg', tag);
+  for (const [k, v] of Object.entries(attrs || {})) node.setAttribute(k, v);
+  if (text !== undefined) node.textContent = text;
+  return node;
+}
+
+// Linear black -> gray -> gold ramp, like the report's heatmaps
+function rampColor(t) {
+  const stops = [PALETTE.black, PALETTE.gray, PALETTE.gold].map(h => [1, 3, 5].map(i => parseInt(h.substr(i, 2), 16)));
+  t = Math.max(0, Math.min(1, t)) * 2;
+  const i = Math.min(1, Math.floor(t)), f = t - i;
+  return 'rgb(' + stops[i].map((c, j) => Math.round(c + (stops[i + 1][j] - c) * f)).join(',') + ')';
+}
+
+function index(cube) {
+  // (wave, mask) -> {cell key -> row}, so every slice is one lookup
+  const lookup = {};
+  for (const cuboid of cube.cuboids) {
+    const rows = new Map();
+    cuboid.cells.forEach((cell, r) => rows.set(cell.join(','), r));
+    lookup[cuboid.wave + '|' + cuboid.mask] = {rows, cuboid};
+  }
+  return lookup;
+}
+
+function slice(cube, lookup, wave, filters) {
+  // Per-item {n, mean} for one wave and one setting of the dimension filters (-1 = All)
+  let mask = 0;
+  const key = [];
+  filters.forEach((level, d) => { if (level >= 0) { mask |= 1 << d; key.push(level); } });
+  const entry = lookup[wave + '|' + mask];
+  const row = entry ? entry.rows.get(key.join(',')) : undefined;
+  const k = cube.items.length;
+  return cube.items.map((item, j) => {
+    if (row === undefined) return {n: 0, mean: null};
+    const n = entry.cuboid.n[row * k + j];
+    return {n, mean: n ? entry.cuboid.mean[row * k + j] / 100 : null};
+  });
+}
+
+function barChart(cube, lookup, state, family) {
+  const items = cube.items.map((item, j) => [item, j]).filter(([item]) => item.family === family);
+  const stats = cube.waves.map(wave => slice(cube, lookup, wave, state.filters));
+  const latest = stats[stats.length - 1];
+  items.sort((a, b) => (latest[b[1]].mean ?? -1) - (latest[a[1]].mean ?? -1));
+
+  const colors = cube.waves.map((w, i) => i === cube.waves.length - 1 ? PALETTE.gold : (i === 0 ? PALETTE.gray : PALETTE.black));
+  const barH = 9, groupH = cube.waves.length * barH + 8, left = 240, width = 420;
+  const svg = svgEl('svg', {width: left + width + 140, height: items.length * groupH + 40});
+  const hi = Math.max(...items.map(([item]) => item.scale[1]));
+
+  cube.waves.forEach((wave, i) => {
+    svg.appendChild(svgEl('rect', {x: left + i * 70, y: 0, width: 10, height: 10, fill: colors[i], stroke: PALETTE.black}));
+    svg.appendChild(svgEl('text', {x: left + i * 70 + 14, y: 9}, wave));
+  });
+  items.forEach(([item, j], r) => {
+    const y = 20 + r * groupH;
+    svg.appendChild(svgEl('text', {x: left - 8, y: y + groupH / 2, 'text-anchor': 'end', 'dominant-baseline': 'middle'}, item.label));
+    stats.forEach((waveStats, i) => {
+      const s = waveStats[j], by = y + i * barH;
+      if (s.mean === null) {
+        svg.appendChild(svgEl('text', {x: left + 4, y: by + barH - 1, fill: '#888'}, 'n < ' + cube.min_cell + ' or not asked'));
+        return;
+      }
+      const rect = svgEl('rect', {x: left, y: by, width: width * s.mean / hi, height: barH - 1, fill: colors[i], stroke: PALETTE.black, 'stroke-width': 0.5});
+      rect.appendChild(svgEl('title', {}, cube.waves[i] + ': ' + s.mean.toFixed(2) + ' (n = ' + s.n + ')'));
+      svg.appendChild(rect);
+      svg.appendChild(svgEl('text', {x: left + width * s.mean / hi + 4, y: by + barH - 1}, s.mean.toFixed(2)));
+    });
+  });
+  return svg;
+}
+
+function breakdownTable(cube, lookup, state, family) {
+  const d = state.breakdown, dim = cube.dimensions[d];
+  const items = cube.items.map((item, j) => [item, j]).filter(([item]) => item.family === family);
+  const columns = dim.levels.map((level, l) => {
+    const filters = state.filters.slice();
+    filters[d] = l;
+    return slice(cube, lookup, state.wave, filters);
+  });
+
+  const table = el('table');
+  const head = el('tr');
+  head.appendChild(el('th', {}, dim.label + ' (' + state.wave + ')'));
+  dim.levels.forEach(level => head.appendChild(el('th', {}, level)));
+  table.appendChild(head);
+  for (const [item, j] of items) {
+    const tr = el('tr');
+    tr.appendChild(el('td', {class: 'item'}, item.label));
+    columns.forEach(column => {
+      const s = column[j];
+      const td = el('td', {}, s.mean === null ? '' : s.mean.toFixed(2));
+      if (s.mean !== null) {
+        const t = (s.mean - item.scale[0]) / (item.scale[1] - item.scale[0]);
+        td.style.background = rampColor(t);
+        td.style.color = t < 0.6 ? '#fff' : '#000';
+        td.title = 'n = ' + s.n;
+      }
+      tr.appendChild(td);
+    });
+    table.appendChild(tr);
+  }
+  return table;
+}
+
+function select(label, options, value, onChange) {
+  const wrap = el('label', {}, label);
+  const box = el('select');
+  options.forEach(([v, text]) => {
+    const option = el('option', {value: v}, text);
+    if (String(v) === String(value)) option.selected = true;
+    box.appendChild(option);
+  });
+  box.addEventListener('change', () => onChange(box.value));
+  wrap.appendChild(box);
+  return wrap;
+}
+
+function draw(cube, lookup, state) {
+  const controls = document.getElementById('controls');
+  controls.replaceChildren();
+  controls.appendChild(select('Question family', cube.families.map(f => [f.prefix, f.label]), state.family,
+    v => { state.family = v; draw(cube, lookup, state); }));
+  cube.dimensions.forEach((dim, d) => {
+    controls.appendChild(select(dim.label, [[-1, 'All']].concat(dim.levels.map((lv, l) => [l, lv])), state.filters[d],
+      v => { state.filters[d] = Number(v); draw(cube, lookup, state); }));
+  });
+  controls.appendChild(select('Break down by', [[-1, 'Nothing (compare waves)']].concat(cube.dimensions.map((dim, d) => [d, dim.label])),
+    state.breakdown, v => { state.breakdown = Number(v); draw(cube, lookup, state); }));
+  if (state.breakdown >= 0) {
+    controls.appendChild(select('Wave', cube.waves.map(w => [w, w]), state.wave,
+      v => { state.wave = v; draw(cube, lookup, state); }));
+  }
+
+  const view = document.getElementById('view');
+  view.replaceChildren(state.breakdown >= 0 ? breakdownTable(cube, lookup, state, state.family)
+                                            : barChart(cube, lookup, state, state.family));
+}
+
+loadCube().then(cube => {
+  document.getElementById('note').textContent =
+    'Average ratings' + (cube.weighted ? ' (survey-weighted)' : '') + '. Groups with fewer than ' +
+    cube.min_cell + ' respondents are hidden. Hover over a bar or cell for its respondent count.';
+  const state = {family: cube.families[0].prefix, filters: cube.dimensions.map(() => -1), breakdown: -1,
+                 wave: cube.waves[cube.waves.length - 1]};
+  draw(cube, index(cube), state);
+});
+</script>
+</body>
+</html>
+'''
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write the offline MISO survey dashboard')
+    parser.add_argument('--out', default='miso_dashboard.html', help='output HTML file')
+    parser.add_argument('--waves', nargs='*', default=None, help='survey years (default: all)')
+    parser.add_argument('--weights', default=None, help='stored survey weight set to apply')
+    parser.add_argument('--min-cell', type=int, default=5, help='smallest group shown')
+    args = parser.parse_args()
+
+    size = write_dashboard(args.out, waves=args.waves, weights=args.weights, min_cell=args.min_cell)
+    print(f"Wrote {args.out} ({size / 1024:.0f} KB)")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tail probabilities of the reference distributions used by the tests.
+
+Normal, Student t and chi-square upper tails from the standard special
+functions (erfc, regularized incomplete beta and gamma), so the crosstab
+and significance modules need nothing beyond numpy and the math module.
+Array arguments are evaluated element by element.
+"""
+
+import math
+
+import numpy as np
+
+_TINY = 1e-300
+
+
+def norm_sf(z):
+    """Upper tail of the standard normal distribution"""
+    return np.asarray(np.frompyfunc(lambda v: 0.5 * math.erfc(v / math.sqrt(2.0)), 1, 1)(z), dtype=np.float64)[()]
+
+
+def _beta_fraction(a, b, x):
+    # Continued fraction of the incomplete beta function (modified Lentz)
+    c = 1.0
+    d = 1.0 - (a + b) * x / (a + 1.0)
+    d = 1.0 / (_TINY if abs(d) < _TINY else d)
+    h = d
+    for m in range(1, 1000):
+        m2 = 2 * m
+        for step in (m * (b - m) * x / ((a + m2 - 1.0) * (a + m2)),
+                     -(a + m) * (a + b + m) * x / ((a + m2) * (a + m2 + 1.0))):
+            d = 1.0 + step * d
+            d = 1.0 / (_TINY if abs(d) < _TINY else d)
+            c = 1.0 + step / c
+            c = _TINY if abs(c) < _TINY else c
+            h *= d * c
+        if abs(d * c - 1.0) < 1e-15:
+            break
+    return h
+
+
+def betainc(a, b, x):
+    """Regularized incomplete beta function I_x(a, b) of scalars"""
+    if not 0.0 < x < 1.0:
+        return float(x >= 1.0) if np.isfinite(x) else np.nan
+    front = math.exp(math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) + a * math.log(x) + b * math.log1p(-x))
+    if x < (a + 1.0) / (a + b + 2.0):
+        return front * _beta_fraction(a, b, x) / a
+    return 1.0 - front * _beta_fraction(b, a, 1.0 - x) / b
+
+
+def t_sf(t, df):
+    """Upper tail of Student's t distribution"""
+    def tail(value, dof):
+        if not (np.isfinite(value) and dof > 0):
+            return np.nan
+        half = 0.5 * betainc(dof / 2.0, 0.5, dof / (dof + value * value))
+        return half if value > 0 else 1.0 - half
+    return np.asarray(np.frompyfunc(tail, 2, 1)(t, df), dtype=np.float64)[()]
+
+
+def t_pvalue(t, df):
+    """Two-sided p-value of t statistics"""
+    return np.minimum(2.0 * t_sf(np.abs(t), df), 1.0)
+
+
+def chi2_sf(stat, dof):
+    """Upper tail of the chi-square distribution (regularized upper incomplete gamma)"""
+    if dof <= 0 or not np.isfinite(stat):
+        return np.nan
+    a, x = dof / 2.0, stat / 2.0
+    if x <= 0:
+        return 1.0
+    scale = math.exp(-x + a * math.log(x) - math.lgamma(a))
+
+    # Series for the lower tail below the mean, continued fraction (Lentz) above it
+    if x < a + 1:
+        term = total = 1.0 / a
+        n = a
+        while abs(term) > abs(total) * 1e-15:
+            n += 1
+            term *= x / n
+            total += term
+        return max(0.0, 1.0 - total * scale)
+
+    tiny = 1e-300
+    b = x + 1.0 - a
+    c = 1.0 / tiny
+    d = 1.0 / b
+    h = d
+    for i in range(1, 1000):
+        an = -i * (i - a)
+        b += 2.0
+        d = an * d + b
+        d = tiny if abs(d) < tiny else d
+        c = b + an / c
+        c = tiny if abs(c) < tiny else c
+        d = 1.0 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1.0) < 1e-15:
+            break
+    return scale * h
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Small multiples of a report chart, one image per demographic facet.
+
+Facet data comes from one grouped query over the facet keys (RANK x TEN x
+AGE_BAND by default), split into the frame each chart's drawer expects.
+Drawing every facet as a new figure repeats the expensive part (axes,
+colorbar, ticks, labels, tight_layout) each time. FacetRenderer instead
+draws a chart spec once from a template frame with the layout every facet
+shares, marks the artists that carry data (heatmap cells and annotations,
+radar polygons, bars) as animated and caches the rendered background.
+Each facet then swaps those artists' data, restores the background, draws
+the animated artists and the chart's marks on top (blitting) and writes
+the canvas buffer, so all facets are exported in one pass over one figure.
+Color limits and value axes are fixed across facets so panels compare.
+Whatever the full figure draws above its data (radar grid lines, a legend
+over bars) stays in the cached background, beneath the blitted data.
+
+    python report_render.py --out report --facets usage_by_division service_quality skill_gap --facet-by RANK TEN
+"""
+
+import os
+import re
+
+import matplotlib.image as mimage
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from seaborn.utils import relative_luminance
+
+from charts import DRAWERS, color_black
+from instrument import span
+
+# Default demographic facets of the small multiples
+FACET_KEYS = ('RANK', 'TEN', 'AGE_BAND')
+
+# Facets with fewer answers than this to their best-answered item are left out
+MIN_RESPONDENTS = 5
+
+
+def facet_stats(query, by=FACET_KEYS, within=(), min_respondents=MIN_RESPONDENTS):
+    """{facet values: item means} from one grouped pass; a Series per facet, or a frame over `within` keys"""
+    stats = query.group_by(*by, *within).stats()
+    means, counts = stats['mean'], stats['count']
+    levels = list(range(len(by)))
+    facets = {}
+    for facet, part in means.groupby(level=levels, observed=True, sort=True):
+        # Respondents of the facet: answers to its best-answered item, summed over the `within` groups
+        if np.nanmax(np.nansum(counts.loc[part.index].to_numpy(), axis=0), initial=0) < min_respondents:
+            continue
+        facet = tuple(str(value) for value in (facet if isinstance(facet, tuple) else (facet,)))
+        facets[facet] = part.droplevel(levels) if within else part.iloc[0]
+    return facets
+
+
+def facet_label(facet):
+    """Caption of a facet, e.g. 'Professor / Tenured / 51-60'"""
+    return ' / '.join(facet)
+
+
+def facet_filename(facet, fmt='png'):
+    """File-safe name of a facet's image"""
+    return re.sub(r'[^A-Za-z0-9]+', '_', '__'.join(facet)).strip('_') + f'.{fmt}'
+
+
+def _bind_heatmap(fig, spec, template, frames):
+    # One QuadMesh plus (with annot) one Text per cell, in row-major order
+    ax = fig.axes[0]
+    mesh = ax.collections[0]
+    options = spec.options['heatmap']
+    texts = list(ax.texts) if options.get('annot') else []
+    if options.get('annot') and len(texts) != template.size:
+        raise ValueError(f"{spec.name}: the template must have no missing cells")
+    fmt = options.get('fmt', '.2g')
+    fixed_color = 'color' in options.get('annot_kws', {})
+
+    # Shared color limits, unless the spec fixes them
+    if 'vmin' not in options and 'vmax' not in options:
+        values = np.concatenate([frame.to_numpy(dtype=np.float64).ravel() for frame in frames])
+        mesh.set_clim(np.nanmin(values), np.nanmax(values))
+
+    def update(data):
+        values = data.to_numpy(dtype=np.float64)
+        mesh.set_array(np.ma.masked_invalid(values))
+        for text, value in zip(texts, values.ravel()):
+            text.set_text('' if np.isnan(value) else format(value, fmt))
+            if not fixed_color and not np.isnan(value):
+                # Seaborn's contrast rule for annotation colors
+                text.set_color('.15' if relative_luminance(mesh.cmap(mesh.norm(value))) > .408 else 'w')
+
+    return [mesh, *texts], update
+
+
+def _bind_radar(fig, spec, template, frames):
+    # draw_radar adds one line and one filled polygon per row
+    ax = fig.axes[0]
+    categories = spec.options['categories']
+    lines, fills = ax.lines[:len(template)], ax.patches[:len(template)]
+    angles = np.asarray(lines[0].get_xdata(), dtype=np.float64)
+
+    def update(data):
+        for line, fill, (_, row) in zip(lines, fills, data.iterrows()):
+            values = row[categories].to_numpy(dtype=np.float64)
+            values = np.append(values, values[:1])
+            line.set_data(angles, values)
+            fill.set_xy(np.column_stack([angles, values]))
+
+    return [*lines, *fills], update
+
+
+def _bind_grouped_bars(fig, spec, template, frames):
+    # One bar container per series; grid behind the bars, since they are drawn over the background
+    ax = fig.axes[0]
+    ax.set_axisbelow(True)
+    columns = [column for column, _, _ in spec.options['series']]
+    containers = ax.containers[:len(columns)]
+    top = max(np.nanmax(frame[columns].to_numpy(dtype=np.float64), initial=0) for frame in [template, *frames])
+    ax.set_ylim(0, top * 1.1)
+
+    def update(data):
+        for column, bars in zip(columns, containers):
+            for bar, value in zip(bars, np.nan_to_num(data[column].to_numpy(dtype=np.float64))):
+                bar.set_height(value)
+
+    return [bar for bars in containers for bar in bars], update
+
+
+BINDERS = {
+    'heatmap': _bind_heatmap,
+    'radar': _bind_radar,
+    'grouped_bars': _bind_grouped_bars
+}
+
+
+def _children(fig):
+    return [artist for ax in fig.axes for artist in ax.get_children()]
+
+
+class FacetRenderer:
+    """One chart spec drawn once as a skeleton, then re-rendered per facet by blitting its data artists"""
+
+    def __init__(self, spec, template, frames, dpi=150):
+        if spec.kind not in BINDERS:
+            raise ValueError(f"No facet renderer for {spec.kind!r} charts; expected one of {tuple(BINDERS)}")
+        self.spec = spec
+
+        # The skeleton is drawn without marks: they differ per facet and are redrawn with it
+        with span(f'draw_{spec.kind}', 'build', spec=spec.name):
+            self.fig = DRAWERS[spec.kind](template, None, **spec.options)
+            self.fig.set_dpi(dpi)
+            self.artists, self.update = BINDERS[spec.kind](self.fig, spec, template, frames)
+            self.caption = self.fig.text(0.01, 0.99, '', ha='left', va='top', fontsize=10, color=color_black)
+            self.artists.append(self.caption)
+        with span('tight_layout', 'layout'):
+            self.fig.tight_layout()
+
+        # Limits stay as laid out: marks added per facet must not rescale under the cached background
+        for ax in self.fig.axes:
+            ax.set_autoscale_on(False)
+        for artist in self.artists:
+            artist.set_animated(True)
+        self.canvas = self.fig.canvas
+        if not isinstance(self.canvas, FigureCanvasAgg):
+            raise TypeError("Facets are blitted on an Agg canvas; use an Agg-based backend (e.g. MPLBACKEND=Agg)")
+        with span('background', 'build', spec=spec.name):
+            self.canvas.draw()
+            self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self.marks = []
+
+    def render(self, facet, data):
+        """Blit one facet's data over the cached background; returns the RGBA buffer"""
+        self.update(data)
+        self.caption.set_text(facet_label(facet))
+        self.canvas.restore_region(self.background)
+
+        # Chart marks (gap lines, change labels) are rebuilt from the facet's own data
+        for artist in self.marks:
+            artist.remove()
+        self.marks = []
+        if self.spec.marks is not None:
+            before = set(map(id, _children(self.fig)))
+            plt.sca(self.fig.axes[0])
+            self.spec.marks(data, *self._mark_args(data))
+            self.marks = [artist for artist in _children(self.fig) if id(artist) not in before]
+
+        # Same order an axes draws in: by zorder, then insertion order
+        for artist in sorted(self.artists + self.marks, key=lambda artist: artist.get_zorder()):
+            self.fig.draw_artist(artist)
+        return np.asarray(self.canvas.buffer_rgba())
+
+    def _mark_args(self, data):
+        # Extra arguments the drawers pass to marks after the data
+        if self.spec.kind == 'grouped_bars':
+            return np.arange(len(data)), self.spec.options.get('bar_width', 0.35)
+        if self.spec.kind == 'radar':
+            n = len(self.spec.options['categories'])
+            angles = [i / float(n) * 2 * np.pi for i in range(n)]
+            return (angles + angles[:1],)
+        return ()
+
+    def close(self):
+        plt.close(self.fig)
+
+
+def render_facets(spec, facets, out_dir, template=None, dpi=150, compress_level=3):
+    """Write one PNG per facet ({facet: frame}) into out_dir; returns {facet: file name}"""
+    os.makedirs(out_dir, exist_ok=True)
+    if not facets:
+        return {}
+    template = spec.query() if template is None else template
+    renderer = FacetRenderer(spec, template, list(facets.values()), dpi=dpi)
+    try:
+        written = {}
+        for facet, data in facets.items():
+            with span(facet_label(facet), 'build', spec=spec.name):
+                image = renderer.render(facet, data)
+            name = facet_filename(facet)
+            with span('imsave', 'save', dpi=dpi):
+                # PNG encoding dominates once drawing is blitted; level 3 is ~4x faster than 6, ~10% larger
+                mimage.imsave(os.path.join(out_dir, name), image, dpi=dpi,
+                              pil_kwargs={'compress_level': compress_level})
+            written[facet] = name
+        return written
+    finally:
+        renderer.close()
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Content-addressed cache for rendered report figures.
+
+A figure's key hashes the plotting function's source (and the source of the
+helpers it calls), every data or style global it reads (aggregated frames,
+COLOR_SCHEME, colormaps, chart specs with their drawers), the wave files
+behind the report, the active rcParams and the output dpi/formats.
+Unchanged figures are served from disk; the cache is kept under a size and
+entry bound by evicting the least recently used entries.
+"""
+
+import hashlib
+import inspect
+import os
+import re
+import shutil
+import tempfile
+import time
+import types
+
+import numpy as np
+import pandas as pd
+
+from survey_store import ensure_cache
+from wave_metrics import DATA_DIR, PROJECT_DIR, discover_waves
+
+
+def _update(digest, obj, depth=0):
+    # Feed a stable byte representation of obj into the digest
+    from matplotlib.colors import Colormap
+
+    from charts import ChartSpec
+
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        digest.update(type(obj).__name__.encode())
+        digest.update(repr(list(obj.index)).encode())
+        if isinstance(obj, pd.DataFrame):
+            digest.update(repr(list(obj.columns)).encode())
+            digest.update(repr(list(obj.dtypes.astype(str))).encode())
+        digest.update(pd.util.hash_pandas_object(obj, index=False).to_numpy().tobytes())
+    elif isinstance(obj, np.ndarray):
+        digest.update(str(obj.dtype).encode())
+        digest.update(repr(obj.shape).encode())
+        digest.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, Colormap):
+        digest.update(obj.name.encode())
+        digest.update(obj(np.linspace(0, 1, obj.N)).tobytes())
+    elif isinstance(obj, dict) and depth < 4:
+        for key in sorted(obj, key=repr):
+            digest.update(repr(key).encode())
+            _update(digest, obj[key], depth + 1)
+    elif isinstance(obj, (list, tuple)) and depth < 4:
+        digest.update(type(obj).__name__.encode())
+        for item in obj:
+            _update(digest, item, depth + 1)
+    elif isinstance(obj, (set, frozenset)) and depth < 4:
+        # Set iteration order depends on the hash seed
+        digest.update(type(obj).__name__.encode())
+        for item in sorted(obj, key=repr):
+            _update(digest, item, depth + 1)
+    elif isinstance(obj, ChartSpec):
+        _update(digest, obj.describe(), depth)
+        for func in obj.functions():
+            digest.update(inspect.getsource(func).encode())
+    elif isinstance(obj, types.FunctionType):
+        digest.update(inspect.getsource(inspect.unwrap(obj)).encode())
+    elif type(obj).__repr__ is object.__repr__:
+        # Default reprs carry the object's address; stores and renderers are covered by data_fingerprint
+        digest.update(type(obj).__qualname__.encode())
+    else:
+        digest.update(repr(obj).encode())
+
+
+def data_fingerprint(folder=DATA_DIR):
+    """Hash of every cleaned wave file (and stored weight set) behind the report"""
+    digest = hashlib.sha256()
+    for wave, path in discover_waves(folder).items():
+        schema = ensure_cache(path)
+        digest.update(wave.encode())
+        digest.update(schema['source_sha256'].encode())
+        # Stored survey weights change the weighted figures without touching the CSV
+        for name, entry in sorted(schema.get('weights', {}).items()):
+            digest.update(name.encode())
+            digest.update(entry['checksum'].encode())
+    return digest.hexdigest()
+
+
+def _code_names(code):
+    # Global names read by a code object, including nested comprehensions and lambdas
+    names = list(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names.extend(_code_names(const))
+    return names
+
+
+def _is_constant(value, depth=0):
+    # Plain data (labels, orderings, palettes) as opposed to stores, renderers or memo caches
+    from matplotlib.colors import Colormap
+
+    if isinstance(value, (str, bytes, int, float, type(None), np.ndarray, Colormap, re.Pattern)):
+        return True
+    if isinstance(value, dict) and depth < 4:
+        return all(_is_constant(k, depth + 1) and _is_constant(v, depth + 1) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)) and depth < 4:
+        return all(_is_constant(item, depth + 1) for item in value)
+    return False
+
+
+def _referenced(func, module_globals, seen, with_data=True):
+    # Yield (name, value) for globals the function reads, following project helpers.
+    # seen holds (module, name) pairs so same-named globals of different modules are both followed.
+    # Other modules contribute only their public constants; their memo caches and
+    # stores are covered by data_fingerprint.
+    from matplotlib.colors import Colormap
+
+    from charts import ChartSpec
+
+    module = module_globals.get('__name__', '')
+    for name in _code_names(func.__code__):
+        if (module, name) in seen or name not in module_globals:
+            continue
+        seen.add((module, name))
+        value = module_globals[name]
+        qualified = f'{module}.{name}'
+        if isinstance(value, ChartSpec):
+            # Options are data; the drawer, query and marks are followed with their own module's globals
+            yield qualified, value.describe()
+            for spec_func in value.functions():
+                yield f'{qualified}.{spec_func.__name__}', inspect.getsource(spec_func)
+                yield from _referenced(spec_func, spec_func.__globals__, seen, True)
+            continue
+        if isinstance(value, types.FunctionType):
+            # Instrumented helpers are followed through to the function they wrap
+            value = inspect.unwrap(value)
+            # Follow helpers defined in this project (e.g. wave_metrics), not library code
+            source_file = inspect.getsourcefile(value) or ''
+            if os.path.dirname(os.path.abspath(source_file)) == PROJECT_DIR:
+                yield qualified, inspect.getsource(value)
+                same_module = value.__globals__ is module_globals
+                yield from _referenced(value, value.__globals__, seen, with_data and same_module)
+            continue
+        # Modules, classes and library callables do not carry figure data
+        if isinstance(value, (types.ModuleType, type)) or (callable(value) and not isinstance(value, Colormap)):
+            continue
+        if with_data or (not name.startswith('_') and _is_constant(value)):
+            yield qualified, value
+
+
+def figure_key(func, dpi, formats, extra=None):
+    """Content hash for one figure function and everything that shapes its output"""
+    import matplotlib
+
+    digest = hashlib.sha256()
+    digest.update(inspect.getsource(func).encode())
+    seen = {(func.__globals__.get('__name__', ''), func.__name__)}
+    for name, value in sorted(_referenced(func, func.__globals__, seen), key=lambda nv: nv[0]):
+        digest.update(name.encode())
+        _update(digest, value)
+
+    rc = {key: value for key, value in matplotlib.rcParams.items() if not key.startswith('backend')}
+    _update(digest, rc)
+    _update(digest, [dpi, list(formats), data_fingerprint(), extra])
+    return digest.hexdigest()
+
+
+class FigureCache:
+    """Directory of rendered figures keyed by content hash, with LRU eviction"""
+
+    def __init__(self, root, max_bytes=500 * 1024 * 1024, max_entries=2000):
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        os.makedirs(self.root, exist_ok=True)
+
+    def _entry(self, key):
+        return os.path.join(self.root, key)
+
+    def get(self, key):
+        """File paths stored under a key (empty list on a miss); marks the entry as used"""
+        entry = self._entry(key)
+        if not os.path.isdir(entry):
+            return []
+        now = time.time()
+        os.utime(entry, (now, now))
+        return sorted(os.path.join(entry, name) for name in os.listdir(entry))
+
+    def put(self, key, paths):
+        """Copy rendered files into the cache under a key, then enforce the bounds"""
+        entry = self._entry(key)
+        # Private staging directory per writer, published with one rename
+        tmp = tempfile.mkdtemp(dir=self.root, prefix=key + '.', suffix='.tmp')
+        try:
+            for path in paths:
+                shutil.copy2(path, os.path.join(tmp, os.path.basename(path)))
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        try:
+            os.rename(tmp, entry)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+            # Another writer published the same key first; entries are content-addressed
+            if not os.path.isdir(entry):
+                raise
+        self.evict()
+
+    def entries(self):
+        """(last used, size in bytes, path) for every cached entry"""
+        found = []
+        for name in os.listdir(self.root):
+            entry = os.path.join(self.root, name)
+            if name.endswith('.tmp') or not os.path.isdir(entry):
+                continue
+            size = sum(os.path.getsize(os.path.join(entry, f)) for f in os.listdir(entry))
+            found.append((os.path.getmtime(entry), size, entry))
+        return sorted(found)
+
+    def evict(self):
+        """Drop least recently used entries until size and count bounds hold"""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        while entries and (total > self.max_bytes or len(entries) > self.max_entries):
+            _, size, entry = entries.pop(0)
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
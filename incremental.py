@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Incremental survey aggregates built from mergeable sufficient statistics.
+
+For every demographic cell (ADIV x RANK x TEN x SEX x age band) and every
+item the store keeps the response count, sum, sum of squares and a histogram
+of answer codes (weight totals instead of counts for a weighted store).
+Ingesting a batch of new responses only touches that batch,
+and every summary (means, variances, importance-satisfaction gaps,
+ownership shares) is derived from the stored statistics.
+"""
+
+import numpy as np
+import pandas as pd
+
+from masked_items import MaskedItemBlock, masked_columns
+from survey_metrics import age_band, as_weights, grouped_sums, item_columns, item_matrix, pair_columns, stats_from_sums
+
+DEFAULT_KEYS = ('ADIV', 'RANK', 'TEN', 'SEX', 'AGE_BAND')
+
+
+def _key_series(batch, key):
+    # AGE_BAND is derived from AGE; every other key is a column of the batch
+    if key == 'AGE_BAND':
+        series = age_band(batch['AGE']) if 'AGE' in batch.columns else pd.Series(np.nan, index=batch.index)
+    elif key in batch.columns:
+        series = batch[key]
+    else:
+        series = pd.Series(np.nan, index=batch.index)
+    return series.astype(object).where(series.notna(), None)
+
+
+class AggregateStore:
+    """Per-cell, per-item count / sum / sum-of-squares / histogram accumulators"""
+
+    def __init__(self, items=None, by=DEFAULT_KEYS, n_bins=8, weighted=False):
+        self.by = list(by)
+        self.n_bins = n_bins
+        self.weighted = weighted
+        self.items = []
+        self.item_index = {}
+        self.cells = []
+        self.cell_index = {}
+        self.n_rows = 0
+
+        # Weighted stores accumulate weight totals, so counts and histograms are float.
+        # Buffers keep spare capacity and grow geometrically; the public arrays are views.
+        count_dtype = np.float64 if weighted else np.int64
+        self._counts = np.zeros((0, 0), dtype=count_dtype)
+        self._sums = np.zeros((0, 0))
+        self._sumsq = np.zeros((0, 0))
+        self._hist = np.zeros((0, 0, n_bins), dtype=count_dtype)
+        self._sizes = np.zeros(0, dtype=np.int64)
+
+        if items is not None:
+            self._add_items(items)
+
+    counts = property(lambda self: self._counts[:len(self.cells), :len(self.items)])
+    sums = property(lambda self: self._sums[:len(self.cells), :len(self.items)])
+    sumsq = property(lambda self: self._sumsq[:len(self.cells), :len(self.items)])
+    hist = property(lambda self: self._hist[:len(self.cells), :len(self.items)])
+    sizes = property(lambda self: self._sizes[:len(self.cells)])
+
+    def _reserve(self, n_cells, n_items):
+        # Double the buffers along any axis that is full, so growth costs amortized O(1) per cell or item
+        cap_cells, cap_items = self._counts.shape
+        if n_cells <= cap_cells and n_items <= cap_items:
+            return
+        if n_cells > cap_cells:
+            cap_cells = max(n_cells, 2 * cap_cells, 8)
+        if n_items > cap_items:
+            cap_items = max(n_items, 2 * cap_items, 8)
+        self._resize(cap_cells, cap_items)
+
+    def _resize(self, cap_cells, cap_items):
+        used = np.s_[:len(self.cells), :len(self.items)]
+        for name in ('_counts', '_sums', '_sumsq', '_hist'):
+            old = getattr(self, name)
+            new = np.zeros((cap_cells, cap_items) + old.shape[2:], dtype=old.dtype)
+            new[used] = old[used]
+            setattr(self, name, new)
+        sizes = np.zeros(cap_cells, dtype=np.int64)
+        sizes[:len(self.cells)] = self._sizes[:len(self.cells)]
+        self._sizes = sizes
+
+    def __getstate__(self):
+        # Pickle (e.g. back from consortium workers) without the spare capacity
+        state = self.__dict__.copy()
+        for name in ('counts', 'sums', 'sumsq', 'hist', 'sizes'):
+            state['_' + name] = getattr(self, name).copy()
+        return state
+
+    def _add_items(self, items):
+        new = [item for item in items if item not in self.item_index]
+        if not new:
+            return
+        self._reserve(len(self.cells), len(self.items) + len(new))
+        for item in new:
+            self.item_index[item] = len(self.items)
+            self.items.append(item)
+
+    def _add_cells(self, cells):
+        new = [cell for cell in cells if cell not in self.cell_index]
+        if not new:
+            return
+        self._reserve(len(self.cells) + len(new), len(self.items))
+        for cell in new:
+            self.cell_index[cell] = len(self.cells)
+            self.cells.append(cell)
+
+    def _batch_cells(self, batch):
+        # Factorize each key (missing kept as its own level) and combine per row
+        codes, levels = [], []
+        for key in self.by:
+            key_codes, uniques = pd.factorize(_key_series(batch, key), use_na_sentinel=False)
+            codes.append(key_codes)
+            levels.append([None if pd.isna(u) else u for u in uniques])
+
+        combined = np.ravel_multi_index(codes, [max(len(u), 1) for u in levels])
+        unique_combined, inverse = np.unique(combined, return_inverse=True)
+        unravelled = np.unravel_index(unique_combined, [max(len(u), 1) for u in levels])
+        cells = [tuple(levels[k][unravelled[k][i]] for k in range(len(self.by)))
+                 for i in range(len(unique_combined))]
+
+        # Store rows of the batch's distinct cells, and each row's index into them
+        self._add_cells(cells)
+        rows = np.array([self.cell_index[cell] for cell in cells], dtype=np.int64)
+        return rows, inverse.ravel()
+
+    def ingest(self, batch, weights=None):
+        """Fold a batch of new responses into every accumulator in O(batch)"""
+        if len(batch) == 0:
+            return self
+        if (weights is not None) != self.weighted:
+            raise ValueError("Weighted stores need weights for every batch, unweighted stores none")
+        weights = as_weights(weights)
+        batch_items = item_columns(batch.columns)
+        self._add_items(batch_items)
+
+        # Reduce over the batch's own cells and items, then scatter into the stored rows and columns
+        rows, row_cells = self._batch_cells(batch)
+        n_cells = len(rows)
+        self._sizes[rows] += np.bincount(row_cells, minlength=n_cells)
+
+        # Sparse families are reduced from their packed answers, the rest from one dense block
+        masked = masked_columns(batch_items)
+        skip = set(masked)
+        dense = [item for item in batch_items if item not in skip]
+        blocks = [(dense, item_matrix(batch, dense)), (masked, MaskedItemBlock.from_frame(batch, masked))]
+
+        for cols, block in blocks:
+            if not cols:
+                continue
+            pos = np.array([self.item_index[col] for col in cols], dtype=np.int64)
+            at = np.ix_(rows, pos)
+            _, counts, sums, sumsq = grouped_sums(block, row_cells, n_cells, weights)
+            self._counts[at] += counts
+            self._sums[at] += sums
+            self._sumsq[at] += sumsq
+            self._hist[at] += self._histogram(block, row_cells, n_cells, weights)
+
+        self.n_rows += len(batch)
+        return self
+
+    def _histogram(self, block, row_cells, n_cells, weights):
+        # Histogram of whole-number answer codes through one bincount
+        if isinstance(block, MaskedItemBlock):
+            return block.histogram(row_cells, n_cells, self.n_bins, weights)
+
+        k = block.shape[1]
+        rows, cols = np.nonzero(~np.isnan(block))
+        answers = block[rows, cols]
+        in_range = (answers >= 0) & (answers < self.n_bins) & (answers == np.round(answers))
+        flat = (row_cells[rows[in_range]] * k + cols[in_range]) * self.n_bins + answers[in_range].astype(np.int64)
+        w = None if weights is None else weights[rows[in_range]]
+        return np.bincount(flat, weights=w, minlength=n_cells * k * self.n_bins).reshape(n_cells, k, self.n_bins)
+
+    def merge(self, other):
+        """Add another store's statistics into this one"""
+        return self._combine(other, 1)
+
+    def subtract(self, other):
+        """Remove statistics that were merged in earlier (e.g. one campus from a pooled store)"""
+        if any(cell not in self.cell_index for cell in other.cells) or \
+                any(item not in self.item_index for item in other.items):
+            raise ValueError("Can only subtract a store whose cells and items are all in this one")
+        return self._combine(other, -1)
+
+    def _combine(self, other, sign):
+        if other.by != self.by or other.n_bins != self.n_bins or other.weighted != self.weighted:
+            raise ValueError("Aggregate stores must share grouping keys, histogram bins and weighting to merge")
+
+        self._add_items(other.items)
+        self._add_cells(other.cells)
+        rows = np.array([self.cell_index[cell] for cell in other.cells], dtype=np.int64)
+        cols = np.array([self.item_index[item] for item in other.items], dtype=np.int64)
+
+        at = np.ix_(rows, cols)
+        self._sizes[rows] += sign * other.sizes
+        self._counts[at] += sign * other.counts
+        self._sums[at] += sign * other.sums
+        self._sumsq[at] += sign * other.sumsq
+        self._hist[at] += sign * other.hist
+        self.n_rows += sign * other.n_rows
+        return self
+
+    def _rollup(self, by):
+        # Sum cell statistics into the requested (possibly empty) set of keys
+        if not by:
+            return (pd.Index(['All']), self.sizes.sum(keepdims=True), self.counts.sum(axis=0, keepdims=True),
+                    self.sums.sum(axis=0, keepdims=True), self.sumsq.sum(axis=0, keepdims=True),
+                    self.hist.sum(axis=0, keepdims=True))
+
+        positions = [self.by.index(key) for key in by]
+        labels = [tuple(cell[p] for p in positions) for cell in self.cells]
+        valid = np.array([all(v is not None for v in label) for label in labels], dtype=bool)
+
+        groups = sorted({label for label, ok in zip(labels, valid) if ok}, key=lambda t: tuple(map(str, t)))
+        lookup = {label: i for i, label in enumerate(groups)}
+        codes = np.array([lookup.get(label, -1) for label in labels], dtype=np.int64)
+
+        g = len(groups)
+        sel = codes >= 0
+        out = []
+        for array in (self.sizes, self.counts, self.sums, self.sumsq, self.hist):
+            total = np.zeros((g,) + array.shape[1:], dtype=array.dtype)
+            np.add.at(total, codes[sel], array[sel])
+            out.append(total)
+
+        if len(by) == 1:
+            index = pd.Index([label[0] for label in groups], name=by[0])
+        else:
+            index = pd.MultiIndex.from_tuples(groups, names=by)
+        return (index,) + tuple(out)
+
+    def summary(self, by=None):
+        """Count, mean, variance and sem frames (groups x items) from the stored statistics"""
+        index, sizes, counts, sums, sumsq, _ = self._rollup(by)
+        means, var = stats_from_sums(counts, sums, sumsq)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            sem = np.sqrt(var / counts)
+        frame = lambda values: pd.DataFrame(values, index=index, columns=self.items)
+        return {'count': frame(counts), 'mean': frame(means), 'var': frame(var), 'sem': frame(sem)}
+
+    def item_means(self):
+        """Overall mean of every item"""
+        return self.summary()['mean'].iloc[0]
+
+    def histogram(self, item, by=None):
+        """Answer-code counts for one item (groups x codes)"""
+        index, _, _, _, _, hist = self._rollup(by)
+        return pd.DataFrame(hist[:, self.item_index[item], :], index=index, columns=range(self.n_bins))
+
+    def paired_means(self, left_prefix, right_prefix):
+        """Means of every left/right item pair and the left-minus-right gap"""
+        codes, left_cols, right_cols = pair_columns(self.items, left_prefix, right_prefix)
+        means = self.item_means()
+        return pd.DataFrame({
+            'service': codes,
+            'left_mean': means[left_cols].to_numpy(),
+            'right_mean': means[right_cols].to_numpy(),
+            'gap': means[left_cols].to_numpy() - means[right_cols].to_numpy()
+        })
+
+    def imp_sat(self):
+        """Importance-satisfaction frame in the same shape as prepare_imp_sat_data"""
+        pairs = self.paired_means('IMP_', 'DS_')
+        return pairs.rename(columns={'left_mean': 'importance', 'right_mean': 'satisfaction'})
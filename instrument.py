@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Timing, allocation and call-count spans for the report pipeline.
+
+Stages wrap themselves in span(name, cat) or the traced() decorator:
+loading waves (cat 'load'), preparing figure data ('prepare'), building,
+laying out and saving figures ('build', 'layout', 'save'). Tracing is off
+by default; a disabled span is one shared no-op object, so instrumented
+hot paths pay a flag check and nothing else. Set MISO_TRACE=1 (or
+MISO_TRACE=alloc to also record net and peak traced allocations through
+tracemalloc), or pass --trace to report_render.py.
+
+Recorded spans export as a Chrome trace (chrome://tracing, Perfetto,
+speedscope) or as folded stacks for flamegraph.pl, and summarize into
+self time and call counts per stage.
+
+    python report_render.py --out report --trace report/trace.json
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+# Environment variable that switches tracing on in report workers ('1', or 'alloc' for allocations)
+TRACE_ENV = 'MISO_TRACE'
+
+# Pipeline stages, in the order summaries list them
+STAGES = ['import', 'load', 'prepare', 'build', 'layout', 'save']
+
+_state = {'enabled': False, 'allocations': False}
+_events = []
+_local = threading.local()
+
+
+def enable(allocations=False):
+    """Start recording spans (and traced allocations, which slow the traced code down)"""
+    _state['enabled'] = True
+    _state['allocations'] = allocations
+    if allocations and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable():
+    """Stop recording spans; events recorded so far are kept until drained"""
+    _state['enabled'] = False
+    if _state['allocations'] and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _state['allocations'] = False
+
+
+def is_enabled():
+    return _state['enabled']
+
+
+def _stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+class _NullSpan:
+    # Shared by every span while tracing is off
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """One timed stage: records start, duration, self time and allocations on exit"""
+
+    def __init__(self, name, cat, args):
+        self.name = name
+        self.cat = cat
+        self.args = args
+        self.children_ns = 0
+
+    def __enter__(self):
+        stack = _stack()
+        if _state['allocations']:
+            current, peak = tracemalloc.get_traced_memory()
+            # Hand the peak reached so far to the parent before this span resets it
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, peak)
+            tracemalloc.reset_peak()
+            self.mem_start = self.peak = current
+        self.path = (stack[-1].path if stack else ()) + (self.name,)
+        stack.append(self)
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        duration = time.perf_counter_ns() - self.start
+        stack = _stack()
+        stack.pop()
+        if stack:
+            stack[-1].children_ns += duration
+
+        args = dict(self.args)
+        if _state['allocations']:
+            current, peak = tracemalloc.get_traced_memory()
+            self.peak = max(self.peak, peak)
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, self.peak)
+            args['alloc_kb'] = round((current - self.mem_start) / 1024, 1)
+            args['peak_kb'] = round((self.peak - self.mem_start) / 1024, 1)
+        _events.append({'name': self.name, 'cat': self.cat, 'ts': self.start // 1000, 'dur': duration // 1000,
+                        'self': (duration - self.children_ns) // 1000, 'pid': os.getpid(),
+                        'tid': threading.get_ident(), 'stack': self.path, 'args': args})
+        return False
+
+
+def span(name, cat='report', **args):
+    """Context manager timing one stage; a shared no-op while tracing is off"""
+    if not _state['enabled']:
+        return _NULL_SPAN
+    return Span(name, cat, args)
+
+
+def traced(cat='report', name=None):
+    """Decorator wrapping every call of a function in a span named after it"""
+    def decorate(func):
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _state['enabled']:
+                return func(*args, **kwargs)
+            with Span(label, cat, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def drain():
+    """Recorded events, removed from the buffer (e.g. to ship them back from a worker)"""
+    events = list(_events)
+    del _events[:]
+    return events
+
+
+def summarize(events):
+    """Self time (ms) and call count per stage category, plus the largest traced peak (MB)"""
+    stages = {}
+    peak_kb = None
+    for event in events:
+        stage = stages.setdefault(event['cat'], {'ms': 0.0, 'calls': 0})
+        stage['ms'] += event['self'] / 1000
+        stage['calls'] += 1
+        if 'peak_kb' in event['args']:
+            peak_kb = max(peak_kb or 0.0, event['args']['peak_kb'])
+    return {'stages': stages, 'peak_mb': None if peak_kb is None else peak_kb / 1024}
+
+
+def format_summaries(summaries):
+    """Table of per-figure stage self times (ms), e.g. for the end of a report run"""
+    extra = sorted({cat for summary in summaries.values() for cat in summary['stages']} - set(STAGES))
+    columns = [cat for cat in STAGES + extra
+               if any(cat in summary['stages'] for summary in summaries.values())]
+    lines = [f"{'figure':<32}" + ''.join(f'{cat:>10}' for cat in columns) + f"{'peak MB':>10}"]
+    for name, summary in summaries.items():
+        cells = [summary['stages'].get(cat, {}).get('ms') for cat in columns]
+        row = f'{name:<32}' + ''.join(f'{ms:>10.1f}' if ms is not None else f"{'-':>10}" for ms in cells)
+        row += f"{summary['peak_mb']:>10.1f}" if summary['peak_mb'] is not None else f"{'-':>10}"
+        lines.append(row)
+    return '\n'.join(lines)
+
+
+def write_chrome_trace(path, events):
+    """Complete ('X') events in the Chrome trace format, one process track per worker"""
+    trace = [{'name': e['name'], 'cat': e['cat'], 'ph': 'X', 'ts': e['ts'], 'dur': e['dur'],
+              'pid': e['pid'], 'tid': e['tid'], 'args': dict(e['args'], self_us=e['self'])} for e in events]
+    with open(path, 'w') as f:
+        json.dump({'traceEvents': trace, 'displayTimeUnit': 'ms'}, f)
+
+
+def write_folded(path, events):
+    """Folded stacks (frame;frame;frame self-microseconds) for flamegraph.pl"""
+    totals = {}
+    for event in events:
+        key = ';'.join(event['stack'])
+        totals[key] = totals.get(key, 0) + event['self']
+    with open(path, 'w') as f:
+        for key, micros in sorted(totals.items()):
+            f.write(f'{key} {micros}\n')
+
+
+if os.environ.get(TRACE_ENV):
+    enable(allocations=os.environ[TRACE_ENV] == 'alloc')
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Overlap-free point labels for the quadrant scatters.
+
+Annotating every point at one fixed offset piles labels on top of each
+other once a scatter holds more than a few dozen services or campuses, and
+fixing that by testing every label against every other one is quadratic.
+label_points() instead adds a single artist that lays out all of an axes'
+labels when the figure is drawn, at the final axes size: each distinct
+string is measured once, labels are placed greedily (in priority order) at
+the first free candidate position around their point, and collisions are
+looked up in a uniform grid of the boxes placed so far, the point markers
+and the axes' other text. All candidate positions of a label are tested
+together against the few boxes in nearby cells. The placed labels are
+drawn through one reused Text rather than one artist per label.
+
+    label_points(ax, df['satisfaction'], df['importance'], df['service'], fontsize=8)
+"""
+
+import numpy as np
+from matplotlib.artist import Artist, allow_rasterization
+from matplotlib.text import Text
+from matplotlib.transforms import Bbox, IdentityTransform
+
+# Directions tried around a point after the caller's own offset
+DIRECTIONS = ((1, 1), (-1, 1), (1, -1), (-1, -1), (1, 0), (-1, 0), (0, 1), (0, -1))
+
+# Candidate rings, as multiples of the offset distance
+RINGS = (1, 3)
+
+_ANCHOR_X = {'left': 0.0, 'center': 0.5, 'right': 1.0}
+_ANCHOR_Y = {'bottom': 0.0, 'center': 0.5, 'top': 1.0}
+
+
+def _alignment(dx, dy):
+    ha = 'left' if dx > 0 else 'right' if dx < 0 else 'center'
+    va = 'bottom' if dy > 0 else 'top' if dy < 0 else 'center'
+    return ha, va
+
+
+def candidate_offsets(offset=(3, 3)):
+    """(dx, dy, ha, va) positions to try in points: the given offset first, then around the point"""
+    offset = tuple(offset)
+    distance = max(abs(offset[0]), abs(offset[1]), 1)
+    candidates = [(*offset, *_alignment(*offset))]
+    for ring in RINGS:
+        for ux, uy in DIRECTIONS:
+            dx, dy = ux * distance * ring, uy * distance * ring
+            if (dx, dy) != offset:
+                candidates.append((dx, dy, *_alignment(dx, dy)))
+    return candidates
+
+
+class BoxGrid:
+    """Uniform grid over display space holding (x0, y0, x1, y1) boxes for overlap queries"""
+
+    def __init__(self, cell, capacity=256):
+        self.cell = float(cell)
+        self.cells = {}
+        self.boxes = np.empty((capacity, 4))
+        self.size = 0
+
+    def _keys(self, box):
+        x0, y0, x1, y1 = box
+        for i in range(int(x0 // self.cell), int(x1 // self.cell) + 1):
+            for j in range(int(y0 // self.cell), int(y1 // self.cell) + 1):
+                yield i, j
+
+    def add(self, box):
+        if self.size == len(self.boxes):
+            self.boxes = np.concatenate([self.boxes, np.empty_like(self.boxes)])
+        index = self.size
+        self.boxes[index] = box
+        self.size += 1
+        for key in self._keys(box):
+            self.cells.setdefault(key, []).append(index)
+        return index
+
+    def nearby(self, box):
+        """Indices of the stored boxes sharing a cell with box"""
+        found = [index for key in self._keys(box) for index in self.cells.get(key, ())]
+        return np.unique(np.array(found, dtype=np.intp))
+
+    def overlaps(self, boxes, ignore=None):
+        """Number of stored boxes (other than index ignore) intersecting each row of an (n x 4) box array"""
+        # One lookup covers every candidate, then all of them are tested against those boxes at once
+        boxes = np.atleast_2d(boxes)
+        near = self.nearby((*boxes[:, :2].min(axis=0), *boxes[:, 2:].max(axis=0)))
+        if ignore is not None:
+            near = near[near != ignore]
+        other = self.boxes[near]
+        hit = ((boxes[:, 0, None] < other[:, 2]) & (other[:, 0] < boxes[:, 2, None]) &
+               (boxes[:, 1, None] < other[:, 3]) & (other[:, 1] < boxes[:, 3, None]))
+        return hit.sum(axis=1)
+
+
+class LabelLayout(Artist):
+    """Text labels of data points, placed around their points without overlaps at every draw"""
+
+    zorder = 3
+
+    def __init__(self, x, y, labels, offset=(3, 3), priority=None, hide_overlaps=False,
+                 point_radius=5, padding=1, **text_kw):
+        super().__init__()
+        xy = np.column_stack([np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)])
+        keep = np.isfinite(xy).all(axis=1)
+        self.xy = xy[keep]
+        self.labels = [str(label) for label, k in zip(labels, keep) if k]
+
+        # Higher priority labels are placed first and so keep their preferred position
+        if priority is None:
+            self.order = np.arange(len(self.labels))
+        else:
+            self.order = np.argsort(-np.asarray(priority, dtype=np.float64)[keep], kind='stable')
+
+        self.candidates = candidate_offsets(offset)
+        self.hide_overlaps = hide_overlaps
+        self.point_radius = point_radius
+        self.padding = padding
+        self.text = Text(**text_kw)
+        self.text.set_transform(IdentityTransform())
+        self.placements = []
+
+    def _sizes(self, renderer):
+        # Display size of each distinct string, measured once. Measuring through Text (rather than
+        # the renderer's own text metrics) fills matplotlib's metrics cache, which drawing the
+        # labels then hits instead of measuring every string a second time
+        text = self.text
+        text.set_figure(self.figure)
+        text.set_position((0, 0))
+        text.set_horizontalalignment('left')
+        text.set_verticalalignment('bottom')
+        measured = {}
+        for label in set(self.labels):
+            text.set_text(label)
+            extent = text.get_window_extent(renderer)
+            measured[label] = (extent.width, extent.height)
+        return np.array([measured[label] for label in self.labels], dtype=np.float64).reshape(-1, 2)
+
+    def layout(self, renderer):
+        """Place every label in display space; returns [(label index, x, y, ha, va, box)]"""
+        if not self.labels:
+            return []
+        points = renderer.points_to_pixels(1.0)
+        anchors = self.axes.transData.transform(self.xy)
+        sizes = self._sizes(renderer)
+        dx = np.array([c[0] for c in self.candidates], dtype=np.float64) * points
+        dy = np.array([c[1] for c in self.candidates], dtype=np.float64) * points
+        fx = np.array([_ANCHOR_X[c[2]] for c in self.candidates])
+        fy = np.array([_ANCHOR_Y[c[3]] for c in self.candidates])
+        pad = self.padding * points
+
+        # Cells about one typical label in size, so a box query touches a handful of cells
+        cell = max(*np.median(sizes, axis=0), 1.0)
+        grid = BoxGrid(cell, capacity=2 * len(anchors) + len(self.axes.texts) + 1)
+        radius = self.point_radius * points
+        # Point markers go in first, so marker i is box i
+        for px, py in anchors:
+            grid.add((px - radius, py - radius, px + radius, py + radius))
+        # Quadrant names and other text already on the axes are obstacles too
+        for text in self.axes.texts:
+            if text.get_visible() and text.get_text():
+                grid.add(tuple(text.get_window_extent(renderer).extents))
+
+        fx0, fy0, fx1, fy1 = self.axes.bbox.extents
+        placements = []
+        for i in self.order:
+            px, py = anchors[i]
+            w, h = sizes[i]
+            # Every candidate box of the label at once
+            x0, y0 = px + dx - w * fx, py + dy - h * fy
+            boxes = np.column_stack([x0 - pad, y0 - pad, x0 + w + pad, y0 + h + pad])
+            outside = (boxes[:, 0] < fx0) | (boxes[:, 1] < fy0) | (boxes[:, 2] > fx1) | (boxes[:, 3] > fy1)
+            hits = grid.overlaps(boxes, ignore=i)
+
+            # First position that is inside the axes and clear
+            free = np.flatnonzero(~outside & (hits == 0))
+            if free.size:
+                best = free[0]
+            elif self.hide_overlaps:
+                continue
+            else:
+                # Otherwise the least crowded position (leaving the axes counts as one collision)
+                best = np.argmin(hits + outside)
+            box = tuple(boxes[best])
+            grid.add(box)
+            _, _, ha, va = self.candidates[best]
+            placements.append((i, px + dx[best], py + dy[best], ha, va, box))
+        return placements
+
+    def get_window_extent(self, renderer=None):
+        if not self.placements:
+            return Bbox.null()
+        return Bbox.union([Bbox.from_extents(*placement[5]) for placement in self.placements])
+
+    @allow_rasterization
+    def draw(self, renderer):
+        if not self.get_visible() or self.axes is None:
+            return
+        self.placements = self.layout(renderer)
+        text = self.text
+        for i, x, y, ha, va, _ in self.placements:
+            text.set_text(self.labels[i])
+            text.set_position((x, y))
+            text.set_horizontalalignment(ha)
+            text.set_verticalalignment(va)
+            text.draw(renderer)
+        self.stale = False
+
+
+def label_points(ax, x, y, labels, offset=(3, 3), **kwargs):
+    """Label the points (x, y) of ax without overlaps; keyword arguments go to LabelLayout and Text"""
+    layout = LabelLayout(x, y, labels, offset, **kwargs)
+    ax.add_artist(layout)
+    return layout
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Multi-wave survey store with an item-code crosswalk and presence bitmaps.
+
+Waves are registered by year. Each source column is mapped to a canonical
+item through a versioned crosswalk (identity by default). Item presence is
+kept as one bitmask per item with a bit per wave, so finding the items
+shared by a set of waves is a bitwise AND rather than a header scan.
+"""
+
+import numpy as np
+import pandas as pd
+
+from masked_items import load_masked_block, masked_columns
+from survey_metrics import column_stats, item_matrix
+from survey_store import load_wave, load_weights, wave_columns
+from wave_metrics import DATA_DIR, discover_waves
+
+
+class LongitudinalStore:
+    """Registry of survey waves that serves aligned wide or long views"""
+
+    def __init__(self):
+        self.paths = {}
+        self.columns = {}
+        self.bits = {}
+        self.crosswalk = {}
+        self.crosswalk_version = 0
+        self.crosswalk_history = []
+        self.presence = {}
+        # Canonical items of each wave, and each item's first-seen order
+        self.wave_items = {}
+        self.order = {}
+        self._next_order = 0
+
+    @classmethod
+    def from_folder(cls, folder=DATA_DIR):
+        """Store with every cleaned wave file found in a folder registered"""
+        store = cls()
+        for wave, path in discover_waves(folder).items():
+            store.register(wave, path)
+        return store
+
+    def register(self, wave, path):
+        """Add a wave; only its header (from the cached schema) is read"""
+        wave = str(wave)
+        if wave not in self.bits:
+            self.bits[wave] = len(self.bits)
+        # Only this wave's bits change: clear them for a re-registered header, then set the new ones
+        bit = 1 << self.bits[wave]
+        for item in self.wave_items.get(wave, ()):
+            self._set_presence(item, self.presence[item] & ~bit)
+        self.paths[wave] = path
+        self.columns[wave] = wave_columns(path)
+        self.crosswalk.setdefault(wave, {})
+        self._add_presence(wave)
+
+    def map_items(self, wave, mapping):
+        """Record that source columns of a wave are named differently from the canonical items"""
+        self.crosswalk.setdefault(str(wave), {}).update(mapping)
+        self.crosswalk_version += 1
+        self.crosswalk_history.append((self.crosswalk_version, str(wave), dict(mapping)))
+        self._rebuild_presence()
+
+    def _set_presence(self, item, bits):
+        # Items no wave has leave presence; a cleared item keeps its order,
+        # so re-registering a wave does not reshuffle items()
+        if bits:
+            self.presence[item] = bits
+            if item not in self.order:
+                self.order[item] = self._next_order
+                self._next_order += 1
+        else:
+            self.presence.pop(item, None)
+
+    def _add_presence(self, wave):
+        # Set one wave's bit on every canonical item in its header
+        bit = 1 << self.bits[wave]
+        self.wave_items[wave] = dict.fromkeys(self.canonical(wave, col) for col in self.columns[wave])
+        for item in self.wave_items[wave]:
+            self._set_presence(item, self.presence.get(item, 0) | bit)
+
+    def _rebuild_presence(self):
+        # One integer bitmask per canonical item, bit i set if wave i has it (after crosswalk edits)
+        self.presence, self.wave_items, self.order = {}, {}, {}
+        for wave in self.columns:
+            self._add_presence(wave)
+
+    def canonical(self, wave, column):
+        """Canonical item name for a source column"""
+        return self.crosswalk.get(str(wave), {}).get(column, column)
+
+    def source_column(self, wave, item):
+        """Source column holding a canonical item in a wave"""
+        for col, mapped in self.crosswalk.get(str(wave), {}).items():
+            if mapped == item:
+                return col
+        return item
+
+    def waves(self):
+        return list(self.paths)
+
+    def _mask(self, waves):
+        mask = 0
+        for wave in waves:
+            mask |= 1 << self.bits[str(wave)]
+        return mask
+
+    def items(self, waves=None, prefix=None, shared=True):
+        """Canonical items present in all (shared=True) or any of the given waves"""
+        waves = [str(w) for w in (waves if waves is not None else self.waves())]
+        mask = self._mask(waves)
+        # Only the selected waves' items are visited: the smallest wave for shared items, all of them otherwise
+        if not waves:
+            candidates = self.presence if shared else ()
+        elif shared:
+            candidates = min((self.wave_items[wave] for wave in waves), key=len)
+        else:
+            candidates = dict.fromkeys(item for wave in waves for item in self.wave_items[wave])
+        if shared:
+            found = [item for item in candidates if self.presence[item] & mask == mask]
+        else:
+            found = list(candidates)
+        found.sort(key=self.order.__getitem__)
+        if prefix is not None:
+            found = [item for item in found if item.startswith(prefix)]
+        return found
+
+    def shared_items(self, waves, prefix=None):
+        return self.items(waves, prefix=prefix, shared=True)
+
+    def has_item(self, wave, item):
+        return bool(self.presence.get(item, 0) & (1 << self.bits[str(wave)]))
+
+    def frame(self, wave, items=None):
+        """One wave with canonical column names, projected to the given items"""
+        wave = str(wave)
+        if items is None:
+            items = [self.canonical(wave, col) for col in self.columns[wave]]
+
+        present = [item for item in items if self.has_item(wave, item)]
+        df = load_wave(self.paths[wave], columns=[self.source_column(wave, item) for item in present])
+        df.columns = present
+
+        # Items the wave never asked come back as all-missing columns
+        return df.reindex(columns=items)
+
+    def wide(self, waves=None, items=None, prefix=None):
+        """Respondents from several waves stacked on aligned item columns"""
+        waves = [str(w) for w in (waves if waves is not None else self.waves())]
+        if items is None:
+            items = self.items(waves, prefix=prefix, shared=False)
+
+        frames = [self.frame(wave, items) for wave in waves]
+        return pd.concat(frames, keys=waves, names=['wave', 'respondent'])
+
+    def long(self, waves=None, items=None, prefix=None):
+        """Tidy wave/respondent/item/value view of the aligned items"""
+        wide = self.wide(waves, items, prefix)
+        long = wide.melt(ignore_index=False, var_name='item', value_name='value')
+        return long.dropna(subset=['value']).reset_index()
+
+    def weights(self, wave, name):
+        """Stored weight set of a wave (see weighting.py)"""
+        weights = load_weights(self.paths[str(wave)], name)
+        if weights is None:
+            raise KeyError(f"No weights named {name!r} stored for wave {wave}")
+        return weights
+
+    def item_means(self, waves=None, items=None, prefix=None, weights=None):
+        """Mean of every aligned item per wave (waves x items), optionally with a named weight set"""
+        waves = [str(w) for w in (waves if waves is not None else self.waves())]
+        if items is None:
+            items = self.items(waves, prefix=prefix, shared=False)
+
+        rows = {}
+        for wave in waves:
+            w = None if weights is None else self.weights(wave, weights)
+            means = pd.Series(np.nan, index=items)
+
+            # Sparse families are reduced from packed answers read straight from the cache
+            masked = [item for item in masked_columns(items) if self.has_item(wave, item)]
+            skip = set(masked)
+            dense = [item for item in items if item not in skip]
+            _, dense_means, _ = column_stats(item_matrix(self.frame(wave, dense), dense), weights=w)
+            means[dense] = dense_means
+            if masked:
+                block = load_masked_block(self.paths[wave], [self.source_column(wave, item) for item in masked])
+                means[masked] = block.item_means(w).to_numpy()
+
+            rows[wave] = means.to_numpy()
+        return pd.DataFrame.from_dict(rows, orient='index', columns=items)
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Packed storage for the largely-missing item families (DA*, INF_, DS_).
+
+Respondents skip the staff and satisfaction items of services they do not
+use, so these blocks are mostly empty. A MaskedItemBlock keeps only the
+answers that were given, as int8 values packed column after column, plus
+one validity bitmap per column (a bit per respondent). Counts, sums and
+grouped reductions run over the packed answers with bincount, so they touch
+only present values and never build a float64 NaN matrix.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from survey_metrics import as_weights, stats_from_sums
+from survey_store import cache_path, ensure_cache
+
+# Item families stored in masked form
+MASKED_PREFIXES = ('DA', 'INF_', 'DS_')
+
+
+def masked_columns(columns):
+    """Columns of the item families kept in masked form, in their original order"""
+    return [col for col in columns if col.startswith(MASKED_PREFIXES)]
+
+
+class MaskedItemBlock:
+    """Present answers of a block of items as packed int8 values with validity bitmaps"""
+
+    def __init__(self, columns, n_rows, masks, values, offsets):
+        self.columns = list(columns)
+        self.n_rows = n_rows
+        self.masks = masks          # (items x ceil(rows / 8)) uint8, little-endian bit order
+        self.values = values        # int8 answers of column 0, then column 1, ...
+        self.offsets = offsets      # start of each column in values, plus the end
+        self.index = {col: j for j, col in enumerate(self.columns)}
+
+    @classmethod
+    def from_arrays(cls, columns, n_rows, present, answers):
+        """Block from per-column validity masks and the matching present answers"""
+        for col, values in zip(columns, answers):
+            if values.size and (values.min() < -128 or values.max() > 127 or np.any(values != np.round(values))):
+                raise ValueError(f"Column {col!r} does not hold int8 answer codes")
+
+        masks = np.packbits(np.asarray(present, dtype=bool).reshape(len(columns), n_rows), axis=1,
+                            bitorder='little')
+        sizes = [len(values) for values in answers]
+        offsets = np.concatenate(([0], np.cumsum(sizes))).astype(np.int64)
+        values = np.concatenate([np.asarray(v).astype(np.int8) for v in answers]) if answers else \
+            np.zeros(0, dtype=np.int8)
+        return cls(columns, n_rows, masks, values, offsets)
+
+    @classmethod
+    def from_frame(cls, df, cols):
+        """Pack the given columns of a frame (float NaN or nullable integer)"""
+        present, answers = [], []
+        for col in cols:
+            valid = df[col].notna().to_numpy()
+            present.append(valid)
+            answers.append(df[col].to_numpy(dtype=np.float64, na_value=np.nan)[valid])
+        return cls.from_arrays(cols, len(df), np.array(present).reshape(len(cols), len(df)), answers)
+
+    @property
+    def nbytes(self):
+        return self.masks.nbytes + self.values.nbytes + self.offsets.nbytes
+
+    def counts(self):
+        """Number of answers per item, straight from the bitmaps"""
+        return np.bitwise_count(self.masks).sum(axis=1, dtype=np.int64)
+
+    def positions(self):
+        """(item, row) of every packed answer, in packing order"""
+        # One item's bitmap is unpacked at a time, so no dense items x rows array is built
+        rows = [np.flatnonzero(np.unpackbits(mask, count=self.n_rows, bitorder='little')) for mask in self.masks]
+        return self._item_ids(), np.concatenate(rows) if rows else np.empty(0, dtype=np.intp)
+
+    def column(self, col):
+        """One item as a float array with NaN for missing"""
+        j = self.index[col]
+        valid = np.unpackbits(self.masks[j], count=self.n_rows, bitorder='little').astype(bool)
+        out = np.full(self.n_rows, np.nan)
+        out[valid] = self.values[self.offsets[j]:self.offsets[j + 1]]
+        return out
+
+    def to_matrix(self, cols=None):
+        """Dense (rows x items) float matrix with NaN for missing"""
+        cols = self.columns if cols is None else cols
+        return np.column_stack([self.column(col) for col in cols]) if cols else np.empty((self.n_rows, 0))
+
+    def _item_ids(self):
+        return np.repeat(np.arange(len(self.columns)), np.diff(self.offsets))
+
+    def sums(self, weights=None):
+        """Raw count, sum and sum of squares per item, which merge by addition"""
+        k = len(self.columns)
+        values = self.values.astype(np.float64)
+        weights = as_weights(weights)
+        if weights is None:
+            items = self._item_ids()
+            counts = np.diff(self.offsets)
+            w = None
+        else:
+            items, rows = self.positions()
+            w = weights[rows]
+            counts = np.bincount(items, weights=w, minlength=k)
+        sums = np.bincount(items, weights=values if w is None else values * w, minlength=k)
+        sumsq = np.bincount(items, weights=values * values if w is None else values * values * w, minlength=k)
+        return counts, sums, sumsq
+
+    def column_stats(self, weights=None):
+        """Count, mean and sample variance of every item, like survey_metrics.column_stats"""
+        counts, sums, sumsq = self.sums(weights)
+        means, var = stats_from_sums(counts, sums, sumsq)
+        return counts, means, var
+
+    def grouped_sums(self, codes, n_groups, weights=None):
+        """Raw count, sum and sum of squares per group and item, like survey_metrics.grouped_sums"""
+        k = len(self.columns)
+        codes = np.asarray(codes)
+        sizes = np.bincount(codes[codes >= 0], minlength=n_groups)
+
+        items, rows = self.positions()
+        groups = codes[rows]
+        keep = groups >= 0
+        cell = groups[keep] * k + items[keep]
+        values = self.values[keep].astype(np.float64)
+
+        weights = as_weights(weights)
+        w = None if weights is None else weights[rows[keep]]
+        shape = (n_groups, k)
+        counts = np.bincount(cell, weights=w, minlength=n_groups * k).reshape(shape)
+        sums = np.bincount(cell, weights=values if w is None else values * w, minlength=n_groups * k)
+        sumsq = np.bincount(cell, weights=values * values if w is None else values * values * w,
+                            minlength=n_groups * k)
+        return sizes, counts, sums.reshape(shape), sumsq.reshape(shape)
+
+    def grouped_column_stats(self, codes, n_groups, weights=None):
+        """Count, mean and sample variance of every item within every group code"""
+        sizes, counts, sums, sumsq = self.grouped_sums(codes, n_groups, weights)
+        means, var = stats_from_sums(counts, sums, sumsq)
+        return sizes, counts, means, var
+
+    def histogram(self, codes, n_groups, n_bins, weights=None):
+        """Answer-code counts per group and item (groups x items x bins)"""
+        k = len(self.columns)
+        items, rows = self.positions()
+        groups = np.asarray(codes)[rows]
+        keep = (groups >= 0) & (self.values >= 0) & (self.values < n_bins)
+        flat = (groups[keep] * k + items[keep]) * n_bins + self.values[keep]
+        weights = as_weights(weights)
+        w = None if weights is None else weights[rows[keep]]
+        return np.bincount(flat, weights=w, minlength=n_groups * k * n_bins).reshape(n_groups, k, n_bins)
+
+    def item_means(self, weights=None):
+        """Mean of every item as a Series"""
+        _, means, _ = self.column_stats(weights)
+        return pd.Series(means, index=self.columns)
+
+
+def load_masked_block(csv_path, columns):
+    """Masked block read straight from a wave's columnar cache (no float conversion)"""
+    schema = ensure_cache(csv_path)
+    folder = cache_path(csv_path)
+    entries = {entry['name']: entry for entry in schema['columns']}
+    n = schema['n_rows']
+
+    present, answers = [], []
+    for col in columns:
+        entry = entries[col]
+        values = np.load(os.path.join(folder, f"{entry['file']}.values.npy"), mmap_mode='r')
+        if entry['kind'] == 'int':
+            # Cached nullable integers already hold int codes and a missing mask
+            valid = np.ones(n, dtype=bool)
+            if 'mask' in entry['checksums']:
+                valid = ~np.load(os.path.join(folder, f"{entry['file']}.mask.npy"), mmap_mode='r')
+        else:
+            valid = ~np.isnan(values)
+        present.append(valid)
+        answers.append(values[valid])
+
+    return MaskedItemBlock.from_arrays(columns, n, np.array(present).reshape(len(columns), n), answers)
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Reliability and factor structure of the survey's item families.
+
+Each family (USE_, IMP_, DS_, SKL_, LRN_, INF_) and each DA staff unit
+(DAHD_F/K/RL/RS, ...) is treated as a scale. One call works out every
+scale in every group (division, wave, or both):
+
+- Pairwise-complete covariance matrices per group, built from contiguous
+  runs of group-sorted rows.
+- Cronbach's alpha, corrected item-total correlations, alpha-if-deleted
+  and first-principal-component loadings, vectorized over the stacked
+  (groups x items x items) matrices with batched eigh.
+
+Pairwise covariances are used (as in psych::alpha(use="pairwise")) because
+the DA/DS items are mostly skipped and almost nobody answers all of them.
+Composite scores (the mean of a respondent's answered items) are what the
+radar and quadrant charts plot.
+
+    python psychometrics.py 2024 --by ADIV
+"""
+
+import argparse
+import re
+
+import numpy as np
+import pandas as pd
+
+from association import PairwiseSums
+from survey_metrics import as_weights, column_stats, group_codes, grouped_column_stats, item_matrix
+
+# Item families that form a scale; UAP_/OWN_/AP_ are unrelated checkboxes
+SCALE_PREFIXES = ('USE_', 'IMP_', 'DS_', 'SKL_', 'LRN_', 'INF_')
+STAFF_UNIT = re.compile(r'^(DA[A-Z]+)_[A-Z]+$')
+
+
+def family_scales(columns, min_items=3):
+    """{scale: items} for every item family and DA staff unit with at least min_items items"""
+    scales = {}
+    for col in columns:
+        unit = STAFF_UNIT.match(col)
+        if unit:
+            scales.setdefault(unit.group(1), []).append(col)
+            continue
+        for prefix in SCALE_PREFIXES:
+            if col.startswith(prefix):
+                scales.setdefault(prefix[:-1], []).append(col)
+                break
+    return {name: items for name, items in scales.items() if len(items) >= min_items}
+
+
+def _grouped_covariances(values, codes, n_groups, weights=None):
+    # Pairwise-complete covariance and pair counts per group (groups x items x items)
+    weights = as_weights(weights)
+    k = values.shape[1]
+    cov = np.full((n_groups, k, k), np.nan)
+    counts = np.zeros((n_groups, k, k))
+
+    # Sort rows by group once, then reduce each contiguous run
+    keep = codes >= 0
+    order = np.argsort(codes[keep], kind='stable')
+    rows = values[keep][order]
+    w = None if weights is None else weights[keep][order]
+    sizes = np.bincount(codes[keep], minlength=n_groups)
+    ends = np.cumsum(sizes)
+    for group in np.flatnonzero(sizes):
+        run = slice(ends[group] - sizes[group], ends[group])
+        sums = PairwiseSums(range(k)).add(rows[run], None if w is None else w[run])
+        cov[group] = sums.covariance()
+        counts[group] = sums.n
+    return cov, counts
+
+
+def scale_statistics(cov):
+    """Alpha, item-total r, alpha-if-deleted, PC1 loadings and explained share for stacked covariances"""
+    # Items with a NaN variance are left out of their group's scale
+    cov = np.asarray(cov, dtype=np.float64)
+    included = np.isfinite(np.diagonal(cov, axis1=-2, axis2=-1))
+    pairs = included[..., :, np.newaxis] & included[..., np.newaxis, :]
+    cov = np.where(pairs, cov, 0.0)
+    k = included.sum(axis=-1).astype(np.float64)
+
+    diag = np.diagonal(cov, axis1=-2, axis2=-1)
+    total = cov.sum(axis=(-2, -1))
+    trace = diag.sum(axis=-1)
+    rowsum = cov.sum(axis=-1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        alpha = np.where(k > 1, k / (k - 1) * (1 - trace / total), np.nan)
+
+        # Each item against the sum of the other items
+        rest_var = total[..., np.newaxis] - 2 * rowsum + diag
+        item_total = (rowsum - diag) / np.sqrt(diag * rest_var)
+        kk = k[..., np.newaxis]
+        alpha_if_deleted = np.where(kk > 2, (kk - 1) / (kk - 2) * (1 - (trace[..., np.newaxis] - diag) / rest_var),
+                                    np.nan)
+
+        corr = np.where(pairs, cov / np.sqrt(diag[..., :, np.newaxis] * diag[..., np.newaxis, :]), 0.0)
+
+    # First principal component of the correlation matrix; left-out items add zero eigenvalues
+    loadings = np.full(diag.shape, np.nan)
+    explained = np.full(total.shape, np.nan)
+    valid = np.isfinite(corr).all(axis=(-2, -1)) & (k > 1)
+    if valid.any():
+        values, vectors = np.linalg.eigh(corr[valid])
+        first = np.maximum(values[..., -1], 0.0)
+        vector = vectors[..., -1]
+        # Orient each component so the loadings are mostly positive
+        vector *= np.where(vector.sum(axis=-1, keepdims=True) < 0, -1.0, 1.0)
+        loadings[valid] = vector * np.sqrt(first)[..., np.newaxis]
+        explained[valid] = first / k[valid]
+
+    item_total[~included] = np.nan
+    alpha_if_deleted[~included] = np.nan
+    loadings[~included] = np.nan
+    return {'alpha': alpha, 'item_total': item_total, 'alpha_if_deleted': alpha_if_deleted,
+            'loading': loadings, 'explained': explained, 'items': k}
+
+
+def reliability(df, scales=None, by=None, weights=None, min_count=10):
+    """Scale and item reliability tables for every scale within every group, in one call"""
+    scales = family_scales(df.columns) if scales is None else scales
+    if by is None:
+        codes, index = np.zeros(len(df), dtype=np.int64), pd.Index(['All'], name='group')
+    else:
+        codes, index = group_codes(df, by)
+    names = list(index.names)
+
+    scale_rows, item_rows = [], []
+    for scale, items in scales.items():
+        cov, counts = _grouped_covariances(item_matrix(df, items), codes, len(index), weights)
+        answered = np.diagonal(counts, axis1=-2, axis2=-1)
+
+        # Items a group barely answered (or a wave never asked) drop out of that group's scale
+        sparse = answered < min_count
+        cov[np.broadcast_to(sparse[:, :, np.newaxis], cov.shape)] = np.nan
+        cov[np.broadcast_to(sparse[:, np.newaxis, :], cov.shape)] = np.nan
+        stats = scale_statistics(cov)
+
+        for g, key in enumerate(index):
+            if sparse[g].all():
+                continue
+            key = key if isinstance(key, tuple) else (key,)
+            scale_rows.append(key + (scale, answered[g].max(), int(stats['items'][g]), stats['alpha'][g],
+                                     stats['explained'][g]))
+            for j, item in enumerate(items):
+                if not sparse[g, j]:
+                    item_rows.append(key + (scale, item, answered[g, j], stats['item_total'][g, j],
+                                            stats['alpha_if_deleted'][g, j], stats['loading'][g, j]))
+
+    return {
+        'scales': pd.DataFrame(scale_rows, columns=names + ['scale', 'n', 'items', 'alpha', 'explained'])
+                    .set_index(names + ['scale']),
+        'items': pd.DataFrame(item_rows, columns=names + ['scale', 'item', 'n', 'item_total',
+                                                          'alpha_if_deleted', 'loading'])
+                   .set_index(names + ['scale', 'item'])
+    }
+
+
+def composite_scores(df, scales=None, min_answered=0.5):
+    """Per-respondent scale scores: mean of the answered items, NaN below min_answered of them"""
+    scales = family_scales(df.columns) if scales is None else scales
+    scores = {}
+    for scale, items in scales.items():
+        values = item_matrix(df, items)
+        answered = (~np.isnan(values)).sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            score = np.where(np.isnan(values), 0.0, values).sum(axis=1) / answered
+        scores[scale] = np.where(answered >= min_answered * len(items), score, np.nan)
+    return pd.DataFrame(scores, index=df.index)
+
+
+def composite_means(df, scales=None, by=None, weights=None, min_answered=0.5):
+    """Mean composite score of every scale, overall (Series) or per group (groups x scales)"""
+    scores = composite_scores(df, scales, min_answered)
+    if by is None:
+        _, means, _ = column_stats(scores.to_numpy(), weights=weights)
+        return pd.Series(means, index=scores.columns)
+
+    codes, index = group_codes(df, by)
+    sizes, _, means, _ = grouped_column_stats(scores.to_numpy(), codes, len(index), weights)
+    present = sizes > 0
+    return pd.DataFrame(means[present], index=index[present], columns=scores.columns)
+
+
+def wave_reliability(store, waves=None, by=None, weights=None, min_count=10):
+    """reliability() over several waves of a LongitudinalStore at once, grouped by wave (and by)"""
+    waves = [str(w) for w in (waves if waves is not None else store.waves())]
+    items = [item for item in store.items(waves, shared=False)
+             if STAFF_UNIT.match(item) or item.startswith(SCALE_PREFIXES)]
+    keys = [] if by is None else ([by] if isinstance(by, str) else list(by))
+    wide = store.wide(waves, items + keys).reset_index(level='wave')
+    w = None if weights is None else np.concatenate([store.weights(wave, weights) for wave in waves])
+    return reliability(wide.reset_index(drop=True), family_scales(items), ['wave'] + keys, w, min_count)
+
+
+def main():
+    from survey_store import load_wave, load_weights
+    from wave_metrics import discover_waves
+
+    parser = argparse.ArgumentParser(description='Reliability of every item family in one survey wave')
+    parser.add_argument('wave', help='survey year, e.g. 2024')
+    parser.add_argument('--by', nargs='*', default=None, help='grouping columns, e.g. ADIV')
+    parser.add_argument('--weights', default=None, help='stored weight set to apply')
+    parser.add_argument('--items', action='store_true', help='also list item-total r and loadings')
+    args = parser.parse_args()
+
+    path = discover_waves()[args.wave]
+    weights = None if args.weights is None else load_weights(path, args.weights)
+    tables = reliability(load_wave(path), by=args.by, weights=weights)
+    print(tables['scales'].round(3).to_string())
+    if args.items:
+        print()
+        print(tables['items'].round(3).to_string())
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
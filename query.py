@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Lazy queries over survey waves with column and predicate pushdown.
+
+    wave('2024').items('USE_*').where(TEN='Tenured').group_by('ADIV').mean()
+
+Every method returns a new Query and nothing is read until a terminal call
+(collect, stats, mean, count). Planning uses the cached schema only: item
+patterns are expanded against its column list, and several waves are
+aligned on the items they share. On execution each wave reads its filter
+columns first (categorical filters compare stored codes), turns them into
+one set of row positions, then reads only the projected item and key
+columns at those rows. Unfiltered means over the sparse DA*/INF_/DS_
+families are reduced from their packed answers.
+
+    python query.py 2024 --items 'USE_*' --where TEN=Tenured --by ADIV --explain
+"""
+
+import argparse
+import fnmatch
+
+import numpy as np
+import pandas as pd
+
+from masked_items import load_masked_block, masked_columns
+from survey_metrics import age_band, column_stats, grouped_item_stats, item_columns, item_matrix
+from survey_store import FILTER_OPS, ensure_cache, load_wave, load_weights, select_rows, wave_columns
+from wave_metrics import DATA_DIR, discover_waves
+
+# Grouping keys derived from a stored column rather than read directly
+DERIVED_KEYS = {
+    'AGE_BAND': ('AGE', lambda age: age_band(age).rename('AGE_BAND'))
+}
+
+
+def expand_items(columns, patterns):
+    """Columns matching any of the glob patterns, pattern by pattern, without repeats"""
+    found = []
+    for pattern in patterns:
+        found.extend(col for col in columns if fnmatch.fnmatchcase(col, pattern) and col not in found)
+    return found
+
+
+class Query:
+    """Plan over one or more waves: projected items, row filters, grouping keys and weights"""
+
+    def __init__(self, waves, folder=DATA_DIR, patterns=(), filters=(), keys=(), weights=None):
+        self.waves = [str(w) for w in waves]
+        self.folder = folder
+        self.patterns = tuple(patterns)
+        self.filters = tuple(filters)
+        self.keys = tuple(keys)
+        self.weights = weights
+
+        paths = discover_waves(folder)
+        missing = [w for w in self.waves if w not in paths]
+        if missing:
+            raise KeyError(f"No cleaned wave file for {missing} in {folder}")
+        self.paths = {w: paths[w] for w in self.waves}
+
+    def _replace(self, **changes):
+        plan = {'patterns': self.patterns, 'filters': self.filters, 'keys': self.keys, 'weights': self.weights}
+        plan.update(changes)
+        return Query(self.waves, self.folder, **plan)
+
+    def items(self, *patterns):
+        """Project to the items matching glob patterns such as 'USE_*' (or exact column names)"""
+        return self._replace(patterns=self.patterns + patterns)
+
+    def where(self, column=None, op='==', value=None, **equals):
+        """Keep rows where column <op> value, or column == value for each keyword (lists mean 'in')"""
+        filters = []
+        if column is not None:
+            if op not in FILTER_OPS:
+                raise ValueError(f"Unknown filter operator {op!r}; expected one of {tuple(FILTER_OPS)}")
+            filters.append((column, op, value))
+        for name, wanted in equals.items():
+            if isinstance(wanted, (list, tuple, set)):
+                filters.append((name, 'in', tuple(wanted)))
+            else:
+                filters.append((name, '==', wanted))
+        return self._replace(filters=self.filters + tuple(filters))
+
+    def group_by(self, *keys):
+        """Group by columns (or derived keys such as AGE_BAND)"""
+        return self._replace(keys=self.keys + keys)
+
+    def weighted(self, weights):
+        """Use a stored weight set (by name) or, for a single wave, a full-length weight array"""
+        if weights is not None and not isinstance(weights, str) and len(self.waves) != 1:
+            raise ValueError("A weight array only applies to a single wave; name a stored weight set instead")
+        return self._replace(weights=weights)
+
+    def columns(self):
+        """Projected items, resolved from the cached schemas (shared by every wave of the query)"""
+        headers = [wave_columns(self.paths[w]) for w in self.waves]
+        first = headers[0]
+        items = expand_items(first, self.patterns) if self.patterns else item_columns(first)
+        for header in headers[1:]:
+            present = set(header)
+            items = [item for item in items if item in present]
+        return items
+
+    def _key_columns(self):
+        # Stored columns the grouping keys are read from
+        return [DERIVED_KEYS[key][0] if key in DERIVED_KEYS else key for key in self.keys]
+
+    def _wave_weights(self, wave, rows):
+        if self.weights is None:
+            return None
+        if isinstance(self.weights, str):
+            weights = load_weights(self.paths[wave], self.weights)
+            if weights is None:
+                raise KeyError(f"No weights named {self.weights!r} stored for wave {wave}")
+        else:
+            weights = self.weights
+        weights = np.asarray(weights, dtype=np.float64)
+        return weights if rows is None else weights[rows]
+
+    def _scan(self, wave, items):
+        # Filters first, then one projected read of the matching rows
+        path = self.paths[wave]
+        rows = select_rows(path, self.filters) if self.filters else None
+        columns = items + [col for col in self._key_columns() if col not in items]
+        return load_wave(path, columns=columns, rows=rows), rows
+
+    def _group_keys(self, df):
+        return [DERIVED_KEYS[key][1](df[DERIVED_KEYS[key][0]]) if key in DERIVED_KEYS else key
+                for key in self.keys]
+
+    def collect(self):
+        """Matching rows of the projected items and key columns (wave level added for several waves)"""
+        items = self.columns()
+        frames = [self._scan(wave, items)[0] for wave in self.waves]
+        if len(frames) == 1:
+            return frames[0]
+        return pd.concat(frames, keys=self.waves, names=['wave', 'respondent'])
+
+    def _wave_stats(self, wave, items):
+        path = self.paths[wave]
+        masked = masked_columns(items) if not self.filters and not self.keys else []
+        if masked:
+            # Sparse families are reduced from packed answers read straight from the cache
+            weights = self._wave_weights(wave, None)
+            skip = set(masked)
+            dense = [item for item in items if item not in skip]
+            counts, means, var = (pd.Series(np.nan, index=items) for _ in range(3))
+            if dense:
+                stats = column_stats(item_matrix(load_wave(path, columns=dense), dense), weights=weights)
+                for series, values in zip((counts, means, var), stats):
+                    series[dense] = values
+            stats = load_masked_block(path, masked).column_stats(weights)
+            for series, values in zip((counts, means, var), stats):
+                series[masked] = values
+            counts, means, var = counts.to_numpy(), means.to_numpy(), var.to_numpy()
+        else:
+            df, rows = self._scan(wave, items)
+            weights = self._wave_weights(wave, rows)
+            if self.keys:
+                return grouped_item_stats(df, items, self._group_keys(df), weights)
+            counts, means, var = column_stats(item_matrix(df, items), weights=weights)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            sem = np.sqrt(var / counts)
+        return {'mean': pd.Series(means, index=items), 'count': pd.Series(counts, index=items),
+                'sem': pd.Series(sem, index=items)}
+
+    def stats(self):
+        """Mean, count and standard error of every item: Series per item, or groups x items frames"""
+        items = self.columns()
+        per_wave = {wave: self._wave_stats(wave, items) for wave in self.waves}
+        if len(self.waves) == 1:
+            return per_wave[self.waves[0]]
+
+        # Several waves: waves x items, or (wave, group) x items when grouped
+        result = {}
+        for stat in ('mean', 'count', 'sem'):
+            parts = [per_wave[wave][stat] for wave in self.waves]
+            if self.keys:
+                result[stat] = pd.concat(parts, keys=self.waves, names=['wave'])
+            else:
+                result[stat] = pd.DataFrame([part.to_numpy() for part in parts], index=self.waves, columns=items)
+        return result
+
+    def mean(self):
+        """Mean of every item (per group when grouped)"""
+        return self.stats()['mean']
+
+    def count(self):
+        """Answer count (weight total when weighted) of every item"""
+        return self.stats()['count']
+
+    def explain(self):
+        """The plan as text: what each wave reads, filters and groups"""
+        items = self.columns()
+        lines = []
+        for wave in self.waves:
+            schema = ensure_cache(self.paths[wave])
+            lines.append(f"wave {wave}: {schema['source']} ({schema['n_rows']} rows)")
+            for column, op, value in self.filters:
+                lines.append(f"  filter  {column} {op} {value!r}  (read {column} only)")
+            lines.append(f"  project {len(items)} items: {', '.join(items[:8])}{' ...' if len(items) > 8 else ''}")
+            if self.keys:
+                lines.append(f"  group   {', '.join(self.keys)}")
+            if self.weights is not None:
+                name = self.weights if isinstance(self.weights, str) else 'array'
+                lines.append(f"  weights {name}")
+        return '\n'.join(lines)
+
+
+def wave(year, folder=DATA_DIR):
+    """Query over one survey wave"""
+    return Query([year], folder)
+
+
+def waves(*years, folder=DATA_DIR):
+    """Query over several waves, aligned on the items they share (all waves if none are given)"""
+    return Query(years or list(discover_waves(folder)), folder)
+
+
+def _parse_filter(text):
+    # 'TEN=Tenured', 'AGE>=40' or 'ADIV=College of STEM'; numbers are compared as numbers
+    for op in ('>=', '<=', '!=', '==', '>', '<', '='):
+        if op in text:
+            column, value = text.split(op, 1)
+            try:
+                value = float(value)
+            except ValueError:
+                pass
+            return column.strip(), '==' if op == '=' else op, value
+    raise ValueError(f"Cannot parse filter {text!r}; expected e.g. TEN=Tenured or AGE>=40")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Item means of survey waves, filtered and grouped')
+    parser.add_argument('waves', nargs='+', help='survey years, e.g. 2024 (several are aligned on shared items)')
+    parser.add_argument('--items', nargs='*', default=['USE_*'], help="item patterns, e.g. 'USE_*' 'IMP_*'")
+    parser.add_argument('--where', nargs='*', default=[], help='filters such as TEN=Tenured or AGE>=40')
+    parser.add_argument('--by', nargs='*', default=[], help='grouping keys, e.g. ADIV or AGE_BAND')
+    parser.add_argument('--weights', default=None, help='stored weight set to apply')
+    parser.add_argument('--stat', choices=['mean', 'count', 'sem'], default='mean')
+    parser.add_argument('--explain', action='store_true', help='print the plan before the result')
+    args = parser.parse_args()
+
+    query = waves(*args.waves).items(*args.items).group_by(*args.by).weighted(args.weights)
+    for text in args.where:
+        query = query.where(*_parse_filter(text))
+    if args.explain:
+        print(query.explain() + '\n')
+    print(query.stats()[args.stat].round(3).to_string())
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
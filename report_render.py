@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Headless report renderer.
+
+Runs every figure function from FV_2.py and Final_visualizations .py across a
+process pool on the Agg backend, saves each figure in the requested formats
+and writes a manifest.json with per-figure timings (split into draw and
+layout stages for figures drawn from chart specs). With --cache, figures
+whose inputs are unchanged are copied from the content-addressed figure
+cache instead of being redrawn. --weights renders the survey-weighted report
+from a weight set stored with the waves (see weighting.py). --dashboard also
+writes the offline HTML dashboard (see dashboard.py) next to the figures.
+--trace records load / prepare / build / layout / save spans in every worker
+(see instrument.py), writes them as a Chrome trace and prints the self time
+of each stage per figure. --facets exports small multiples of the division
+heatmap, service quality radar or skill-gap bars per RANK x TEN x AGE_BAND
+facet (see facets.py).
+
+    python report_render.py --out report --formats png svg pdf --processes 4 --cache .figure_cache --dashboard
+    python report_render.py --out report --trace report/trace.json --trace-allocations
+    python report_render.py --out report --facets usage_by_division service_quality skill_gap --facet-by RANK TEN
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import re
+import shutil
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+import instrument
+from figure_cache import FigureCache, figure_key
+from instrument import span
+from weighting import WEIGHTS_ENV
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+FV2_SCRIPT = os.path.join(ROOT, 'FV_2.py')
+FINAL_SCRIPT = os.path.join(ROOT, 'Final_visualizations .py')
+
+# Every chart in the report, in presentation order
+REPORT_JOBS = [
+    (FV2_SCRIPT, 'plot_importance_satisfaction'),
+    (FV2_SCRIPT, 'plot_usage_by_division'),
+    (FV2_SCRIPT, 'plot_service_quality'),
+    (FV2_SCRIPT, 'plot_staff_composites'),
+    (FV2_SCRIPT, 'plot_skill_gap'),
+    (FV2_SCRIPT, 'plot_usage_comparison'),
+    (FV2_SCRIPT, 'plot_device_ownership'),
+    (FV2_SCRIPT, 'plot_item_associations'),
+    (FINAL_SCRIPT, 'plot_tech_by_age'),
+    (FINAL_SCRIPT, 'plot_tech_by_tenure'),
+    (FINAL_SCRIPT, 'plot_roi_matrix'),
+    (FINAL_SCRIPT, 'plot_strategic_quadrants'),
+    (FINAL_SCRIPT, 'plot_teaching_modalities'),
+    (FINAL_SCRIPT, 'plot_instruction_types'),
+    (FINAL_SCRIPT, 'plot_teaching_relationship'),
+    (FINAL_SCRIPT, 'plot_tech_growth'),
+    (FINAL_SCRIPT, 'plot_skill_learning_gap'),
+    (FINAL_SCRIPT, 'plot_tech_projection'),
+]
+
+_scripts = {}
+
+
+def load_script(path):
+    """Import a report script by file path (the file names are not valid module names)"""
+    if path not in _scripts:
+        name = re.sub(r'\W', '_', os.path.splitext(os.path.basename(path))[0])
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _scripts[path] = module
+    return _scripts[path]
+
+
+def _init_worker(out_dir):
+    # Headless backend before pyplot is imported; stray savefig() calls land in out_dir
+    import matplotlib
+    matplotlib.use('Agg', force=True)
+    os.chdir(out_dir)
+
+    # Fonts are looked up and loaded once per worker, not by whichever figure draws text first
+    from charts import renderer
+    renderer.warm()
+
+
+def warm_caches(weights=None):
+    """Build the columnar cache of every wave (and open the selected weight set) before workers start"""
+    # Workers importing the scripts would otherwise all rebuild the same missing caches at once
+    from survey_store import ensure_cache, load_weights
+    from wave_metrics import DATA_DIR, discover_waves
+
+    weights = weights or os.environ.get(WEIGHTS_ENV)
+    for path in discover_waves(DATA_DIR).values():
+        with span('ensure_cache', 'load', source=os.path.basename(path)):
+            ensure_cache(path)
+            if weights:
+                load_weights(path, weights)
+
+
+def render_job(job, out_dir, formats=('png',), dpi=150, cache_dir=None, cache_max_bytes=500 * 1024 * 1024):
+    """Build one figure function (or fetch it from the cache) and save every figure it opened"""
+    import matplotlib.pyplot as plt
+
+    script, function = job
+    entry = {'name': function, 'script': os.path.basename(script), 'pid': os.getpid(),
+             'outputs': [], 'cached': False}
+    try:
+        with span(function, 'job'):
+            _run_job(entry, script, function, out_dir, formats, dpi, cache_dir, cache_max_bytes)
+    except Exception:
+        entry['error'] = traceback.format_exc()
+    finally:
+        plt.close('all')
+
+    # Spans recorded in this worker travel back with the entry
+    if instrument.is_enabled():
+        entry['trace'] = instrument.drain()
+    return entry
+
+
+def _run_job(entry, script, function, out_dir, formats, dpi, cache_dir, cache_max_bytes):
+    import matplotlib.pyplot as plt
+
+    from charts import renderer
+
+    start = time.perf_counter()
+    with span(os.path.basename(script), 'import'):
+        module = load_script(script)
+    entry['import_seconds'] = time.perf_counter() - start
+
+    cache = key = None
+    if cache_dir:
+        start = time.perf_counter()
+        with span('figure_key', 'cache'):
+            cache = FigureCache(cache_dir, max_bytes=cache_max_bytes)
+            key = figure_key(getattr(module, function), dpi, formats)
+            hits = cache.get(key)
+        entry['key_seconds'] = time.perf_counter() - start
+        if hits:
+            for path in hits:
+                shutil.copy2(path, os.path.join(out_dir, os.path.basename(path)))
+                entry['outputs'].append(os.path.basename(path))
+            entry.update(cached=True, build_seconds=0.0, save_seconds=0.0)
+            return
+
+    plt.close('all')
+    first_stage = len(renderer.timings)
+    start = time.perf_counter()
+    with span(function, 'build'):
+        getattr(module, function)()
+    entry['build_seconds'] = time.perf_counter() - start
+    entry['stages'] = renderer.timings[first_stage:]
+
+    start = time.perf_counter()
+    for i, num in enumerate(plt.get_fignums()):
+        fig = plt.figure(num)
+        stem = function if i == 0 else f'{function}_{i + 1}'
+        for fmt in formats:
+            path = os.path.join(out_dir, f'{stem}.{fmt}')
+            with span('savefig', 'save', format=fmt, dpi=dpi):
+                fig.savefig(path, dpi=dpi, facecolor='white')
+            entry['outputs'].append(os.path.basename(path))
+    entry['save_seconds'] = time.perf_counter() - start
+
+    if cache is not None:
+        with span('cache_put', 'cache'):
+            cache.put(key, [os.path.join(out_dir, name) for name in entry['outputs']])
+
+
+def facet_job(chart, out_dir, by=None, dpi=150):
+    """Export one chart's small multiples (FV_2.FACET_CHARTS) into out_dir/facets/<chart>"""
+    import matplotlib.pyplot as plt
+
+    entry = {'name': chart, 'pid': os.getpid(), 'dir': os.path.join('facets', chart)}
+    start = time.perf_counter()
+    try:
+        with span(chart, 'job'):
+            module = load_script(FV2_SCRIPT)
+            kwargs = {} if by is None else {'by': tuple(by)}
+            written = module.plot_facets(chart, os.path.join(out_dir, entry['dir']), dpi=dpi, **kwargs)
+        entry['facets'] = {name: list(facet) for facet, name in written.items()}
+    except Exception:
+        entry['error'] = traceback.format_exc()
+    finally:
+        plt.close('all')
+    entry['seconds'] = time.perf_counter() - start
+    return entry
+
+
+def render_facet_sets(charts, out_dir='report', by=None, processes=None, dpi=150):
+    """Small multiples of several charts, one chart per worker; returns an entry per chart"""
+    out_dir = os.path.abspath(out_dir)
+    os.makedirs(out_dir, exist_ok=True)
+    warm_caches()
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(out_dir,)) as pool:
+        futures = [pool.submit(facet_job, chart, out_dir, by, dpi) for chart in charts]
+        return [future.result() for future in futures]
+
+
+def render_report(jobs=REPORT_JOBS, out_dir='report', formats=('png',), processes=None, dpi=150,
+                  cache_dir=None, cache_max_bytes=500 * 1024 * 1024, trace_path=None):
+    """Render every job across a process pool and write out_dir/manifest.json (and a trace if asked)"""
+    out_dir = os.path.abspath(out_dir)
+    os.makedirs(out_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    warm_caches()
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(out_dir,)) as pool:
+        futures = [pool.submit(render_job, job, out_dir, tuple(formats), dpi, cache_dir, cache_max_bytes)
+                   for job in jobs]
+        figures = [future.result() for future in futures]
+
+    # Per-figure stage summaries go into the manifest, the raw spans into the trace file
+    events = []
+    for fig in figures:
+        if 'trace' in fig:
+            fig['spans'] = instrument.summarize(fig['trace'])
+            events.extend(fig.pop('trace'))
+    if trace_path:
+        instrument.write_chrome_trace(trace_path, events)
+
+    manifest = {
+        'total_seconds': time.perf_counter() - start,
+        'cached': sum(1 for fig in figures if fig.get('cached')),
+        'processes': processes or os.cpu_count(),
+        'formats': list(formats),
+        'dpi': dpi,
+        'figures': figures
+    }
+    with open(os.path.join(out_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=1)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Render the MISO survey report headlessly')
+    parser.add_argument('--out', default='report', help='output directory')
+    parser.add_argument('--formats', nargs='+', default=['png'], choices=['png', 'svg', 'pdf'])
+    parser.add_argument('--processes', type=int, default=None, help='worker processes (default: all cores)')
+    parser.add_argument('--dpi', type=int, default=150)
+    parser.add_argument('--cache', default=None, help='figure cache directory (default: no caching)')
+    parser.add_argument('--cache-max-mb', type=int, default=500)
+    parser.add_argument('--weights', default=None, help='stored survey weight set to apply (default: unweighted)')
+    parser.add_argument('--dashboard', action='store_true', help='also write dashboard.html into the output directory')
+    parser.add_argument('--trace', default=None, help='write a Chrome trace of every stage span to this file')
+    parser.add_argument('--trace-allocations', action='store_true', help='also trace allocations (slower)')
+    parser.add_argument('--facets', nargs='+', default=[], choices=['usage_by_division', 'service_quality', 'skill_gap'],
+                        help='also export these charts per demographic facet into <out>/facets/')
+    parser.add_argument('--facet-by', nargs='+', default=None, help='facet keys (default: RANK TEN AGE_BAND)')
+    args = parser.parse_args()
+
+    # Workers inherit the environment, so the scripts pick the weight set up at import
+    if args.weights:
+        os.environ[WEIGHTS_ENV] = args.weights
+    if args.trace:
+        os.environ[instrument.TRACE_ENV] = 'alloc' if args.trace_allocations else '1'
+        instrument.enable(allocations=args.trace_allocations)
+
+    cache_dir = os.path.abspath(args.cache) if args.cache else None
+    manifest = render_report(out_dir=args.out, formats=args.formats, processes=args.processes, dpi=args.dpi,
+                             cache_dir=cache_dir, cache_max_bytes=args.cache_max_mb * 1024 * 1024,
+                             trace_path=args.trace)
+    for fig in manifest['figures']:
+        if 'error' in fig:
+            status = 'FAILED'
+        elif fig['cached']:
+            status = 'cached'
+        else:
+            status = f"{fig['build_seconds'] + fig['save_seconds']:.2f}s"
+        print(f"{fig['name']:<32} {status}")
+    print(f"Total: {manifest['total_seconds']:.2f}s")
+
+    if args.trace:
+        summaries = {fig['name']: fig['spans'] for fig in manifest['figures'] if 'spans' in fig}
+        print('\nSelf time per stage (ms):')
+        print(instrument.format_summaries(summaries))
+        print(f"Trace written to {args.trace}")
+
+    if args.dashboard:
+        from dashboard import write_dashboard
+
+        start = time.perf_counter()
+        size = write_dashboard(os.path.join(args.out, 'dashboard.html'), weights=args.weights)
+        print(f"{'dashboard.html':<32} {time.perf_counter() - start:.2f}s, {size / 1024:.0f} KB")
+
+    facet_sets = []
+    if args.facets:
+        facet_sets = render_facet_sets(args.facets, args.out, by=args.facet_by, processes=args.processes, dpi=args.dpi)
+        for entry in facet_sets:
+            status = 'FAILED' if 'error' in entry else f"{len(entry['facets'])} facets, {entry['seconds']:.2f}s"
+            print(f"{entry['dir']:<32} {status}")
+
+    failed = [fig for fig in manifest['figures'] + facet_sets if 'error' in fig]
+    for fig in failed:
+        print(f"\n{fig['name']}:\n{fig['error']}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Batched significance tests for wave-to-wave item comparisons.
+
+Every shared item of two waves is tested at once:
+
+- Welch t from per-item count / mean / variance (column_stats).
+- Mann-Whitney U with tie-corrected normal approximation. Midranks for
+  all items come from a single lexsort of the stacked (item, value) pairs.
+- Permutation test on the difference in means. One matrix of permuted
+  wave labels is shared by all items, and each permutation's group sums
+  and counts are two matrix products with the zero-filled answers and
+  the answered mask, so missing answers stay pairwise per item.
+
+p-values are adjusted across the compared items (Holm or
+Benjamini-Hochberg). With survey weights, Welch uses weighted counts, means
+and variances and the permutation test weighted means (each respondent's
+weight moves with them); Mann-Whitney is only run unweighted.
+
+    python significance.py 2018 2024 --prefix USE_ IMP_ DS_ --permutations 10000
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from distributions import norm_sf, t_pvalue
+from survey_metrics import as_weights, column_stats, item_matrix
+
+TESTS = ('welch', 'mannwhitney', 'permutation')
+
+
+def holm(p):
+    """Holm step-down adjusted p-values (NaN entries are left out of the family)"""
+    p = np.asarray(p, dtype=np.float64)
+    out = np.full(p.shape, np.nan)
+    valid = np.flatnonzero(~np.isnan(p))
+    order = valid[np.argsort(p[valid], kind='stable')]
+    m = len(order)
+    adjusted = np.maximum.accumulate((m - np.arange(m)) * p[order]) if m else np.zeros(0)
+    out[order] = np.minimum(adjusted, 1.0)
+    return out
+
+
+def benjamini_hochberg(p):
+    """Benjamini-Hochberg false-discovery-rate adjusted p-values"""
+    p = np.asarray(p, dtype=np.float64)
+    out = np.full(p.shape, np.nan)
+    valid = np.flatnonzero(~np.isnan(p))
+    order = valid[np.argsort(p[valid], kind='stable')]
+    m = len(order)
+    scaled = p[order] * m / np.arange(1, m + 1)
+    out[order] = np.minimum(np.minimum.accumulate(scaled[::-1])[::-1], 1.0) if m else scaled
+    return out
+
+
+CORRECTIONS = {'holm': holm, 'bh': benjamini_hochberg, 'none': lambda p: np.asarray(p, dtype=np.float64)}
+
+
+def welch_tests(before, after, weights_before=None, weights_after=None):
+    """Welch t, degrees of freedom and two-sided p for every column of two (rows x items) blocks"""
+    n1, m1, v1 = column_stats(before, weights=weights_before)
+    n2, m2, v2 = column_stats(after, weights=weights_after)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        s1, s2 = v1 / n1, v2 / n2
+        t = (m2 - m1) / np.sqrt(s1 + s2)
+        dof = (s1 + s2) ** 2 / (s1 ** 2 / (n1 - 1) + s2 ** 2 / (n2 - 1))
+    return t, dof, t_pvalue(t, dof)
+
+
+def midranks(values, items, n_items):
+    """Midranks of values within each item id (ties share their average rank)"""
+    order = np.lexsort((values, items))
+    sorted_items, sorted_values = items[order], values[order]
+    starts = np.cumsum(np.bincount(items, minlength=n_items)) - np.bincount(items, minlength=n_items)
+
+    # Ranks are positions within the item; tied runs take the mean of their positions
+    position = np.arange(len(order)) - starts[sorted_items] + 1.0
+    new_run = np.ones(len(order), dtype=bool)
+    new_run[1:] = (sorted_items[1:] != sorted_items[:-1]) | (sorted_values[1:] != sorted_values[:-1])
+    run = np.cumsum(new_run) - 1
+    run_size = np.bincount(run)
+    run_first = position[new_run]
+
+    ranks = np.empty(len(order))
+    ranks[order] = run_first[run] + (run_size[run] - 1) / 2.0
+    return ranks, run_size, sorted_items[new_run]
+
+
+def mann_whitney_tests(before, after):
+    """Mann-Whitney U (of the second block), tie-corrected z and two-sided p for every column"""
+    k = before.shape[1]
+    stacked = np.vstack([before, after]).T
+    items, rows = np.nonzero(~np.isnan(stacked))
+    values = stacked[items, rows]
+    later = rows >= len(before)
+
+    ranks, run_size, run_item = midranks(values, items, k)
+    n = np.bincount(items, minlength=k).astype(np.float64)
+    n2 = np.bincount(items, weights=later, minlength=k)
+    n1 = n - n2
+    u = np.bincount(items, weights=ranks * later, minlength=k) - n2 * (n2 + 1) / 2
+
+    ties = np.bincount(run_item, weights=run_size ** 3.0 - run_size, minlength=k)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        var = n1 * n2 / 12.0 * ((n + 1) - ties / (n * (n - 1)))
+        centered = u - n1 * n2 / 2.0
+        # Continuity correction towards zero
+        z = (centered - 0.5 * np.sign(centered)) / np.sqrt(var)
+    z = np.where(var > 0, z, np.nan)
+    p = np.minimum(2.0 * norm_sf(np.abs(np.nan_to_num(z))), 1.0)
+    return u, z, np.where(np.isnan(z), np.nan, p)
+
+
+def permutation_tests(before, after, n_permutations=10000, seed=0, block=None, weights_before=None,
+                      weights_after=None):
+    """Two-sided permutation p-values of the difference in means, one shared label matrix for all items"""
+    stacked = np.vstack([before, after])
+    answered = ~np.isnan(stacked)
+    filled = np.where(answered, stacked, 0.0)
+    answered = answered.astype(np.float64)
+    n = len(stacked)
+
+    # Weighted means: scale each respondent's row, so the weight follows them through every permutation
+    if weights_before is not None or weights_after is not None:
+        w = np.r_[np.ones(len(before)) if weights_before is None else as_weights(weights_before),
+                  np.ones(len(after)) if weights_after is None else as_weights(weights_after)]
+        filled, answered = filled * w[:, None], answered * w[:, None]
+
+    total_sums, total_counts = filled.sum(axis=0), answered.sum(axis=0)
+    labels = np.r_[np.zeros(len(before)), np.ones(len(after))]
+
+    def mean_gap(later):
+        # later is (permutations x respondents) 0/1; every item is reduced by the same two products
+        sums, counts = later @ filled, later @ answered
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return sums / counts - (total_sums - sums) / (total_counts - counts)
+
+    observed = np.abs(mean_gap(labels[np.newaxis]))[0]
+    # Small tolerance so permutations that reproduce the observed split count as extreme
+    threshold = observed - 1e-12 * np.maximum(observed, 1.0)
+
+    # About 4M label entries per block keeps memory flat for large pooled waves
+    block = block or max(1, min(n_permutations, (1 << 22) // max(n, 1)))
+    rng = np.random.default_rng(seed)
+    extreme = np.zeros(stacked.shape[1])
+    for start in range(0, n_permutations, block):
+        shuffled = rng.permuted(np.tile(labels, (min(block, n_permutations - start), 1)), axis=1)
+        extreme += (np.abs(mean_gap(shuffled)) >= threshold).sum(axis=0)
+
+    p = (extreme + 1) / (n_permutations + 1)
+    return np.where(np.isnan(observed), np.nan, p)
+
+
+def compare_waves(before, after, cols, tests=TESTS, correction='holm', n_permutations=10000, seed=0,
+                  weights_before=None, weights_after=None):
+    """Per-item means, differences and adjusted test results for two waves' frames"""
+    if correction not in CORRECTIONS:
+        raise ValueError(f"Unknown correction {correction!r}; expected one of {tuple(CORRECTIONS)}")
+    weighted = weights_before is not None or weights_after is not None
+    if weighted and 'mannwhitney' in tests:
+        raise ValueError("Mann-Whitney is only run on unweighted respondents; drop it from tests to use weights")
+    x, y = item_matrix(before, cols), item_matrix(after, cols)
+    n1, m1, _ = column_stats(x, weights=weights_before)
+    n2, m2, _ = column_stats(y, weights=weights_after)
+    result = pd.DataFrame({'n_before': n1, 'n_after': n2, 'mean_before': m1, 'mean_after': m2,
+                           'diff': m2 - m1}, index=pd.Index(cols, name='item'))
+
+    adjust = CORRECTIONS[correction]
+    if 'welch' in tests:
+        result['welch_t'], result['welch_df'], result['welch_p'] = welch_tests(x, y, weights_before, weights_after)
+        result['welch_p_adj'] = adjust(result['welch_p'])
+    if 'mannwhitney' in tests:
+        result['mw_u'], result['mw_z'], result['mw_p'] = mann_whitney_tests(x, y)
+        result['mw_p_adj'] = adjust(result['mw_p'])
+    if 'permutation' in tests:
+        result['perm_p'] = permutation_tests(x, y, n_permutations, seed, weights_before=weights_before,
+                                             weights_after=weights_after)
+        result['perm_p_adj'] = adjust(result['perm_p'])
+    return result
+
+
+def store_comparison(store, before='2018', after='2024', prefixes=('USE_', 'IMP_', 'DS_'), **kwargs):
+    """compare_waves over every item of the given families shared by two waves of a LongitudinalStore"""
+    cols = [item for prefix in prefixes for item in store.shared_items([before, after], prefix=prefix)]
+    return compare_waves(store.frame(before, cols), store.frame(after, cols), cols, **kwargs)
+
+
+def main():
+    from longitudinal import LongitudinalStore
+
+    parser = argparse.ArgumentParser(description='Test every shared item between two survey waves')
+    parser.add_argument('before', help='earlier survey year, e.g. 2018')
+    parser.add_argument('after', help='later survey year, e.g. 2024')
+    parser.add_argument('--prefix', nargs='*', default=['USE_', 'IMP_', 'DS_'])
+    parser.add_argument('--tests', nargs='*', choices=TESTS, default=list(TESTS))
+    parser.add_argument('--correction', choices=sorted(CORRECTIONS), default='holm')
+    parser.add_argument('--permutations', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    result = store_comparison(LongitudinalStore.from_folder(), args.before, args.after, tuple(args.prefix),
+                              tests=args.tests, correction=args.correction,
+                              n_permutations=args.permutations, seed=args.seed)
+    adjusted = [col for col in result.columns if col.endswith('_p_adj')]
+    print(result[['n_before', 'n_after', 'mean_before', 'mean_after', 'diff'] + adjusted]
+          .sort_values(adjusted[0]).round(4).to_string())
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
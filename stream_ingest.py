@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Streaming ingestion of raw MISO exports that do not fit in memory.
+
+The export is read in fixed-size chunks, restricted to the survey item and
+demographic columns at parse time, and each chunk gets the cleaning behind
+cleaned_c18.csv / cleaned_c24.csv: answer text (or numeric codes) coded onto
+each family's Likert range, demographics normalized to the cleaned
+spellings and AGE bands reduced to their midpoints. Cleaned chunks are
+folded into an AggregateStore, so memory is bounded by the chunk size and
+the number of demographic cells, not by the file size.
+
+    python stream_ingest.py raw_export.csv --out cleaned_c26.csv --chunksize 50000
+"""
+
+import argparse
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from incremental import AggregateStore, DEFAULT_KEYS
+from survey_metrics import ITEM_COLUMNS, ITEM_PREFIXES, item_columns
+
+DEMOGRAPHIC_COLUMNS = ['Year started', 'FTIME', 'RANK', 'TEN', 'ADIV', 'SEX', 'AGE']
+
+# Answer wording per item family -> code; numeric codes in the valid range pass through
+FREQUENCY_SCALE = {'never': 1, 'rarely': 2, 'once or twice a semester': 2, 'sometimes': 3, 'monthly': 3,
+                   'often': 4, 'weekly': 4, 'always': 5, 'daily': 5}
+SKILL_SCALE = {'none': 1, 'beginner': 2, 'intermediate': 3, 'advanced': 4, 'expert': 5}
+MODALITY_SCALE = {'entirely in-person': 1, 'mostly in-person': 2, 'equal mix': 3, 'mostly remote': 4,
+                  'entirely remote': 5, 'entirely live': 1, 'mostly live': 2, 'mostly recorded': 4,
+                  'entirely recorded': 5}
+IMPORTANCE_SCALE = {'not important': 1, 'somewhat important': 2, 'important': 3, 'very important': 4}
+SATISFACTION_SCALE = {'dissatisfied': 1, 'somewhat dissatisfied': 2, 'somewhat satisfied': 3, 'satisfied': 4}
+AGREEMENT_SCALE = {'strongly disagree': 1, 'disagree': 2, 'agree': 3, 'strongly agree': 4}
+INTEREST_SCALE = {'not interested': 1, 'somewhat interested': 2, 'interested': 3, 'very interested': 4}
+CHECKED_SCALE = {'no': 0, 'unchecked': 0, 'yes': 1, 'checked': 1}
+
+# (prefix, answer wording, lowest code, highest code); anything else becomes missing
+FAMILY_SCALES = [
+    ('USE_', FREQUENCY_SCALE, 1, 5),
+    ('SKL_', SKILL_SCALE, 1, 5),
+    ('AP_', FREQUENCY_SCALE, 1, 5),
+    ('UAP_', CHECKED_SCALE, 0, 1),
+    ('OWN_', CHECKED_SCALE, 0, 1),
+    ('IMP_', IMPORTANCE_SCALE, 1, 4),
+    ('DS_', SATISFACTION_SCALE, 1, 4),
+    ('INF_', AGREEMENT_SCALE, 1, 4),
+    ('DA', AGREEMENT_SCALE, 1, 4),
+    ('LRN_', INTEREST_SCALE, 1, 4),
+    ('TREM', MODALITY_SCALE, 1, 5),
+    ('TLIVE', MODALITY_SCALE, 1, 5)
+]
+
+# Spellings seen in raw exports -> the spelling used in the cleaned files
+DEMOGRAPHIC_ALIASES = {
+    'RANK': {'instructor/lecturer': 'Intructor/Lecturer', 'intructor/lecturer': 'Intructor/Lecturer',
+             'lecturer': 'Intructor/Lecturer', 'instructor': 'Intructor/Lecturer',
+             'assistant professor': 'Assistant Professor', 'associate professor': 'Associate Professor',
+             'professor': 'Professor', 'full professor': 'Professor', 'other': 'Other'},
+    'TEN': {'tenured': 'Tenured', 'tenure track, but not tenured': 'Tenured Track, but not Tenure',
+            'tenured track, but not tenure': 'Tenured Track, but not Tenure',
+            'tenure track': 'Tenured Track, but not Tenure', 'not on tenure track': 'Not on Tenure',
+            'not on tenure': 'Not on Tenure'},
+    'SEX': {'male': 'Male', 'm': 'Male', 'female': 'Female', 'f': 'Female'},
+    'FTIME': {'yes': 'Yes', 'y': 'Yes', 'full-time': 'Yes', 'no': 'No', 'n': 'No', 'part-time': 'No'}
+}
+
+# Demographic answers that mean "not given"
+MISSING_ANSWERS = {'', 'na', 'n/a', 'none', 'prefer not to answer', 'prefer not to say'}
+
+AGE_BAND = re.compile(r'^(\d+)\s*(?:-|to)\s*(\d+)$')
+AGE_UNDER = re.compile(r'^(?:under|less than)\s*(\d+)$')
+AGE_OVER = re.compile(r'^(\d+)\s*(?:\+|or older|and older|and over)$')
+
+
+def keep_column(name):
+    """Whether a raw export column survives cleaning (items and demographics only)"""
+    return name.startswith(ITEM_PREFIXES) or name in ITEM_COLUMNS or name in DEMOGRAPHIC_COLUMNS
+
+
+def _family(column):
+    # Position of the item's family in FAMILY_SCALES
+    for i, (prefix, _, _, _) in enumerate(FAMILY_SCALES):
+        if column.startswith(prefix):
+            return i
+
+
+def _translate(text, scale, lo, hi):
+    # One answer string -> code, or NaN for skips, "don't know" and out-of-range codes
+    if text in scale:
+        return float(scale[text])
+    try:
+        value = float(text)
+    except ValueError:
+        return np.nan
+    return value if lo <= value <= hi and value == int(value) else np.nan
+
+
+def code_answers(block, scale, lo, hi):
+    """Code a (rows x items) block of raw answers through one factorize of its distinct strings"""
+    # Strip and lower-case only the distinct answers, never the whole block
+    inverse, uniques = pd.factorize(block.ravel())
+    codes = np.array([_translate(str(text).strip().lower(), scale, lo, hi) for text in uniques] + [np.nan])
+    return codes[inverse].reshape(block.shape)
+
+
+def _age_midpoint(text):
+    # Raw AGE comes as a number or a band; the cleaned files keep band midpoints
+    text = text.strip().lower()
+    match = AGE_BAND.match(text)
+    if match:
+        return (int(match.group(1)) + int(match.group(2))) // 2
+    match = AGE_UNDER.match(text)
+    if match:
+        return int(match.group(1)) - 2
+    match = AGE_OVER.match(text)
+    if match:
+        return int(match.group(1)) + 2
+    try:
+        return float(text)
+    except ValueError:
+        return np.nan
+
+
+def _normalize(series, aliases):
+    # Map distinct values once; unknown spellings are kept (trimmed) rather than dropped
+    stripped = series.str.strip()
+    inverse, uniques = pd.factorize(stripped)
+    mapped = np.array([np.nan if value.lower() in MISSING_ANSWERS else aliases.get(value.lower(), value)
+                       for value in uniques] + [np.nan], dtype=object)
+    return pd.Series(mapped[inverse], index=series.index)
+
+
+def clean_chunk(chunk):
+    """Apply the cleaned-wave coding to one chunk of a raw export (read as strings)"""
+    items = item_columns([col for col in chunk.columns if keep_column(col)])
+    cleaned = {}
+
+    # Items are coded one family block at a time
+    families = {}
+    for col in items:
+        families.setdefault(_family(col), []).append(col)
+    for family, cols in families.items():
+        _, scale, lo, hi = FAMILY_SCALES[family]
+        values = code_answers(chunk[cols].to_numpy(dtype=object), scale, lo, hi)
+        cleaned.update({col: values[:, j] for j, col in enumerate(cols)})
+
+    # Demographics in the cleaned files' spelling, after the items as in cleaned_cYY.csv
+    for col in DEMOGRAPHIC_COLUMNS:
+        if col not in chunk.columns:
+            continue
+        if col in DEMOGRAPHIC_ALIASES:
+            cleaned[col] = _normalize(chunk[col], DEMOGRAPHIC_ALIASES[col])
+        elif col == 'AGE':
+            inverse, uniques = pd.factorize(chunk[col])
+            ages = np.array([_age_midpoint(value) for value in uniques] + [np.nan], dtype=float)
+            cleaned[col] = pd.Series(ages[inverse], index=chunk.index)
+        elif col == 'Year started':
+            cleaned[col] = pd.to_numeric(chunk[col], errors='coerce')
+        else:
+            cleaned[col] = _normalize(chunk[col], {})
+
+    return pd.DataFrame(cleaned, index=chunk.index)
+
+
+def iter_clean_chunks(path, chunksize=50_000):
+    """Cleaned chunks of a raw export; unused columns are never parsed"""
+    # Only empty cells are missing at parse time: "None" is a valid skill answer
+    reader = pd.read_csv(path, chunksize=chunksize, usecols=keep_column, dtype=str,
+                         keep_default_na=False, na_values=[''], low_memory=False)
+    for chunk in reader:
+        yield clean_chunk(chunk)
+
+
+def stream_aggregates(path, chunksize=50_000, by=DEFAULT_KEYS, out=None):
+    """Fold a raw export into an AggregateStore chunk by chunk, optionally writing the cleaned rows"""
+    store = AggregateStore(by=by)
+    for i, chunk in enumerate(iter_clean_chunks(path, chunksize)):
+        store.ingest(chunk)
+        if out is not None:
+            chunk.to_csv(out, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Clean and aggregate a raw MISO export in bounded memory')
+    parser.add_argument('export', help='raw export CSV')
+    parser.add_argument('--out', default=None, help='also write the cleaned rows to this CSV')
+    parser.add_argument('--chunksize', type=int, default=50_000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    store = stream_aggregates(args.export, args.chunksize, out=args.out)
+    elapsed = time.perf_counter() - start
+
+    print(f"{store.n_rows} rows, {len(store.items)} items, {len(store.cells)} demographic cells "
+          f"in {elapsed:.1f}s")
+    print(store.imp_sat().sort_values('gap', ascending=False).head(10).to_string(index=False))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Vectorized aggregation helpers shared by the MISO visualization scripts.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+# Column families that hold survey items (as opposed to demographics)
+ITEM_PREFIXES = ('USE_', 'IMP_', 'DS_', 'INF_', 'DA', 'AP_', 'UAP_', 'OWN_', 'SKL_', 'LRN_')
+ITEM_COLUMNS = ('TREM', 'TLIVE')
+
+
+def item_columns(columns):
+    """Survey item columns, in their original order"""
+    return [col for col in columns if col.startswith(ITEM_PREFIXES) or col in ITEM_COLUMNS]
+
+
+def item_matrix(df, cols):
+    """Return the given columns as one float (rows x items) array with NaN for missing"""
+    return df[cols].to_numpy(dtype=float, na_value=np.nan)
+
+
+def as_weights(weights):
+    """Weights as a float array (None stays None for the unweighted path)"""
+    return None if weights is None else np.asarray(weights, dtype=np.float64)
+
+
+def column_stats(values, block=2048, weights=None):
+    """Compute count, mean and sample variance of every column in one reduction"""
+    # Weighted counts are weight totals and the variance follows the frequency-weight
+    # convention, so weights scaled to mean 1 keep counts close to the respondent count
+    weights = as_weights(weights)
+
+    # Masked blocks (masked_items.MaskedItemBlock) reduce their packed answers directly
+    if hasattr(values, 'grouped_sums'):
+        return values.column_stats(weights)
+
+    # Work on the (items x rows) view so each block is a run of contiguous rows
+    items = values.T
+    k, n = items.shape
+
+    # Shift everything to >= 1 so fmax can zero the NaNs without a masked write
+    lo = np.fmin.reduce(items, axis=None) if items.size else np.nan
+    shift = lo - 1.0 if not np.isnan(lo) else 0.0
+
+    counts = np.zeros(k, dtype=np.int64 if weights is None else np.float64)
+    sums = np.zeros(k)
+    sumsq = np.zeros(k)
+    buf = np.empty((k, min(block, n)))
+    for start in range(0, n, block):
+        chunk = items[:, start:start + block]
+        shifted = buf[:, :chunk.shape[1]]
+        np.subtract(chunk, shift, out=shifted)
+        np.fmax(shifted, 0.0, out=shifted)
+
+        if weights is None:
+            counts += np.count_nonzero(shifted, axis=1)
+            sums += shifted.sum(axis=1)
+            sumsq += np.einsum('ij,ij->i', shifted, shifted)
+        else:
+            # Weighted reductions are matrix-vector products over the same block
+            w = weights[start:start + block]
+            counts += (shifted > 0) @ w
+            sums += shifted @ w
+            sumsq += (shifted * shifted) @ w
+
+    # Columns with no responses come back as NaN, like pandas .mean()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        shifted_means = sums / counts
+        var = (sumsq - counts * shifted_means * shifted_means) / (counts - 1)
+    var = np.where(counts > 1, np.maximum(var, 0.0), np.nan)
+
+    return counts, shifted_means + shift, var
+
+
+def pair_columns(columns, left_prefix, right_prefix):
+    """Align prefixed item pairs (e.g. IMP_X with DS_X) in the order of the left columns"""
+    columns = list(columns)
+    available = set(columns)
+
+    codes, left_cols, right_cols = [], [], []
+    for col in columns:
+        if not col.startswith(left_prefix):
+            continue
+        code = col[len(left_prefix):]
+        if right_prefix + code in available:
+            codes.append(code)
+            left_cols.append(col)
+            right_cols.append(right_prefix + code)
+
+    return codes, left_cols, right_cols
+
+
+def paired_item_stats(df, left_prefix, right_prefix, weights=None):
+    """Summarize every left/right item pair and the left-minus-right gap (e.g. importance - satisfaction) in one pass"""
+    codes, left_cols, right_cols = pair_columns(df.columns, left_prefix, right_prefix)
+    k = len(codes)
+
+    # One stacked array so both sides of every pair are reduced together
+    counts, means, var = column_stats(item_matrix(df, left_cols + right_cols), weights=weights)
+
+    return pd.DataFrame({
+        'service': codes,
+        'left_mean': means[:k],
+        'right_mean': means[k:],
+        'left_n': counts[:k],
+        'right_n': counts[k:],
+        'left_var': var[:k],
+        'right_var': var[k:],
+        'gap': means[:k] - means[k:]
+    })
+
+
+def imp_sat_gaps(df, weights=None):
+    """Importance-satisfaction summary for every IMP_/DS_ service pair"""
+    stats = paired_item_stats(df, 'IMP_', 'DS_', weights)
+    return stats.rename(columns={
+        'left_mean': 'importance',
+        'right_mean': 'satisfaction',
+        'left_n': 'importance_n',
+        'right_n': 'satisfaction_n',
+        'left_var': 'importance_var',
+        'right_var': 'satisfaction_var'
+    })[['service', 'importance', 'satisfaction', 'gap',
+        'importance_n', 'satisfaction_n', 'importance_var', 'satisfaction_var']]
+
+
+def age_band(age):
+    """Bucket raw AGE values into the bands used across the report"""
+    return pd.cut(age, bins=[0, 30, 40, 50, 60, np.inf],
+                  labels=['21-30', '31-40', '41-50', '51-60', '61+'])
+
+
+def group_codes(df, by):
+    """Integer-code one or more grouping columns; rows with a missing key get -1"""
+    if isinstance(by, (str, pd.Series)):
+        by = [by]
+
+    # Keys may be column names or derived Series such as age_band(df['AGE'])
+    keys = [col if isinstance(col, pd.Series) else df[col] for col in by]
+    names = [key.name for key in keys]
+
+    codes, levels = [], []
+    for key in keys:
+        key_codes, uniques = pd.factorize(key, sort=True)
+        codes.append(key_codes)
+        levels.append(uniques)
+
+    if len(by) == 1:
+        return codes[0], pd.Index(levels[0], name=names[0])
+
+    # Combine the per-column codes into one flat cell index
+    missing = np.any([c < 0 for c in codes], axis=0)
+    combined = np.ravel_multi_index([np.where(missing, 0, c) for c in codes],
+                                    [len(u) for u in levels])
+    combined[missing] = -1
+    return combined, pd.MultiIndex.from_product(levels, names=names)
+
+
+def _grouped_shifted_sums(values, codes, n_groups, weights=None):
+    # Sort rows by group once, then reduce each contiguous run of rows
+    weights = as_weights(weights)
+    k = values.shape[1]
+    counts = np.zeros((n_groups, k), dtype=np.int64 if weights is None else np.float64)
+    sums = np.zeros((n_groups, k))
+    sumsq = np.zeros((n_groups, k))
+
+    keep = codes >= 0
+    order = np.argsort(codes[keep], kind='stable')
+    sizes = np.bincount(codes[keep], minlength=n_groups)
+    present = np.flatnonzero(sizes)
+    starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))[present]
+
+    shift = 0.0
+    if len(present):
+        rows = values[keep][order]
+        lo = np.fmin.reduce(rows, axis=None)
+        shift = lo - 1.0 if not np.isnan(lo) else 0.0
+        shifted = np.fmax(rows - shift, 0.0)
+
+        if weights is None:
+            counts[present] = np.add.reduceat(shifted > 0, starts, axis=0)
+            sums[present] = np.add.reduceat(shifted, starts, axis=0)
+            sumsq[present] = np.add.reduceat(shifted * shifted, starts, axis=0)
+        else:
+            w = weights[keep][order][:, None]
+            weighted = shifted * w
+            counts[present] = np.add.reduceat((shifted > 0) * w, starts, axis=0)
+            sums[present] = np.add.reduceat(weighted, starts, axis=0)
+            sumsq[present] = np.add.reduceat(weighted * shifted, starts, axis=0)
+
+    return sizes, counts, sums, sumsq, shift
+
+
+def grouped_column_stats(values, codes, n_groups, weights=None):
+    """Count, mean and sample variance of every column within every group code"""
+    if hasattr(values, 'grouped_sums'):
+        return values.grouped_column_stats(codes, n_groups, weights)
+    sizes, counts, sums, sumsq, shift = _grouped_shifted_sums(values, codes, n_groups, weights)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        shifted_means = sums / counts
+        var = (sumsq - counts * shifted_means * shifted_means) / (counts - 1)
+    var = np.where(counts > 1, np.maximum(var, 0.0), np.nan)
+
+    return sizes, counts, shifted_means + shift, var
+
+
+def grouped_sums(values, codes, n_groups, weights=None):
+    """Raw count, sum and sum of squares per group and column, which merge by addition"""
+    if hasattr(values, 'grouped_sums'):
+        return values.grouped_sums(codes, n_groups, weights)
+    sizes, counts, sums, sumsq, shift = _grouped_shifted_sums(values, codes, n_groups, weights)
+    raw_sums = sums + counts * shift
+    raw_sumsq = sumsq + 2.0 * shift * sums + counts * shift * shift
+    return sizes, counts, raw_sums, raw_sumsq
+
+
+def stats_from_sums(counts, sums, sumsq):
+    """Mean and sample variance from mergeable count / sum / sum-of-squares arrays"""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / counts
+        var = (sumsq - counts * means * means) / (counts - 1)
+    var = np.where(counts > 1, np.maximum(var, 0.0), np.nan)
+    return means, var
+
+
+def grouped_item_stats(df, cols, by, weights=None):
+    """Wide mean/count/sem frames (groups x items) for every item in one grouped pass"""
+    codes, index = group_codes(df, by)
+    sizes, counts, means, var = grouped_column_stats(item_matrix(df, cols), codes, len(index), weights)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sem = np.sqrt(var / counts)
+
+    # Only keep cells that actually have respondents
+    present = sizes > 0
+    index = index[present]
+    return {
+        'mean': pd.DataFrame(means[present], index=index, columns=cols),
+        'count': pd.DataFrame(counts[present], index=index, columns=cols),
+        'sem': pd.DataFrame(sem[present], index=index, columns=cols)
+    }
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Columnar on-disk cache for the cleaned MISO survey waves.
+
+Each cleaned CSV is converted once into one .npy file per column under
+.survey_cache/<wave>/ next to the source file, plus a schema.json holding
+dtypes, categories and checksums. Later loads memory-map only the columns
+that were asked for. Row filters are evaluated on the stored arrays (category
+codes, integer values and their missing masks) before any other column is
+read, so a filtered load only takes the matching rows of each projected
+column. Survey weights fitted to a wave are stored in the same directory and
+dropped automatically when the source file changes.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from instrument import span
+
+SCHEMA_VERSION = 1
+CACHE_DIR = '.survey_cache'
+
+# Columns that are always stored as categoricals
+CATEGORICAL_COLUMNS = ['RANK', 'TEN', 'ADIV', 'SEX', 'FTIME']
+
+# Comparison operators a row filter may use ('in' takes a collection of values)
+FILTER_OPS = {
+    '==': np.equal,
+    '!=': np.not_equal,
+    '<': np.less,
+    '<=': np.less_equal,
+    '>': np.greater,
+    '>=': np.greater_equal,
+    'in': None
+}
+
+
+def file_checksum(path, chunk_size=1 << 20):
+    """SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_path(csv_path):
+    """Directory holding the columnar copy of a cleaned wave"""
+    folder, name = os.path.split(os.path.abspath(csv_path))
+    return os.path.join(folder, CACHE_DIR, os.path.splitext(name)[0])
+
+
+def _column_file(name):
+    # Column names such as 'Year started' need a filesystem-safe form
+    safe = ''.join(ch if ch.isalnum() or ch in '_-' else '_' for ch in name)
+    return safe + '-' + hashlib.md5(name.encode('utf-8')).hexdigest()[:6]
+
+
+def _smallest_int_dtype(lo, hi):
+    for dtype in (np.int8, np.int16, np.int32, np.int64):
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return np.dtype(dtype)
+
+
+def _encode_column(series):
+    """Split a column into the arrays to store and its schema entry"""
+    if series.name in CATEGORICAL_COLUMNS or not pd.api.types.is_numeric_dtype(series):
+        cat = series.astype('category')
+        categories = cat.cat.categories
+        codes = cat.cat.codes.to_numpy()
+        codes = codes.astype(_smallest_int_dtype(-1, len(categories)))
+        return {'values': codes}, {'kind': 'category', 'categories': categories.tolist()}
+
+    values = series.to_numpy(dtype=float, na_value=np.nan)
+    mask = np.isnan(values)
+    present = values[~mask]
+
+    # Likert, binary and other whole-number items become nullable integers
+    if present.size == 0 or np.array_equal(present, np.round(present)):
+        lo, hi = (present.min(), present.max()) if present.size else (0, 0)
+        dtype = _smallest_int_dtype(lo, hi)
+        arrays = {'values': np.where(mask, 0, values).astype(dtype)}
+        if mask.any():
+            arrays['mask'] = mask
+        return arrays, {'kind': 'int', 'dtype': dtype.name}
+
+    return {'values': values}, {'kind': 'float', 'dtype': 'float64'}
+
+
+def _publish(folder, name, write, mode='wb'):
+    """Write a cache file under a unique temp name and move it into place; returns its checksum"""
+    # Processes building the same wave at once each stage their own file, and
+    # readers only ever see a complete one (os.replace is atomic)
+    f = tempfile.NamedTemporaryFile(mode, dir=folder, prefix=name + '.', suffix='.tmp', delete=False)
+    tmp = f.name
+    try:
+        with f:
+            write(f)
+        checksum = file_checksum(tmp)
+        os.replace(tmp, os.path.join(folder, name))
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return checksum
+
+
+def _write_schema(folder, schema):
+    # The schema marks the cache valid, so it is always published after the files it lists
+    _publish(folder, 'schema.json', lambda f: json.dump(schema, f, indent=1), mode='w')
+
+
+def build_cache(csv_path):
+    """Convert a cleaned wave CSV into the columnar cache and return its schema"""
+    with span('parse_csv', 'load', source=os.path.basename(csv_path)):
+        df = pd.read_csv(csv_path)
+        return write_columns(csv_path, (df[name] for name in df.columns), len(df))
+
+
+def write_columns(csv_path, columns, n_rows):
+    """Write the columnar cache of a wave from named Series (consumed one at a time) and return its schema"""
+    target = cache_path(csv_path)
+    os.makedirs(target, exist_ok=True)
+
+    stat = os.stat(csv_path)
+    schema = {
+        'version': SCHEMA_VERSION,
+        'source': os.path.basename(csv_path),
+        'source_size': stat.st_size,
+        'source_mtime_ns': stat.st_mtime_ns,
+        'source_sha256': file_checksum(csv_path),
+        'n_rows': n_rows,
+        'columns': []
+    }
+
+    for series in columns:
+        if len(series) != n_rows:
+            raise ValueError(f"Column {series.name!r} has {len(series)} rows, expected {n_rows}")
+        arrays, entry = _encode_column(series)
+        entry['name'] = series.name
+        entry['file'] = _column_file(series.name)
+        entry['checksums'] = {}
+        for part, array in arrays.items():
+            name = f"{entry['file']}.{part}.npy"
+            entry['checksums'][part] = _publish(target, name, lambda f, array=array: np.save(f, array))
+        schema['columns'].append(entry)
+
+    # Write the schema last so a half-built cache is never picked up
+    _write_schema(target, schema)
+    return schema
+
+
+def read_schema(csv_path):
+    """Load the cached schema, or None if there is no cache yet"""
+    path = os.path.join(cache_path(csv_path), 'schema.json')
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def is_current(schema, csv_path):
+    """Check whether a cached schema still matches its source CSV"""
+    if schema is None or schema.get('version') != SCHEMA_VERSION:
+        return False
+
+    stat = os.stat(csv_path)
+    if stat.st_size != schema['source_size']:
+        return False
+    if stat.st_mtime_ns == schema['source_mtime_ns']:
+        return True
+
+    # Touched but possibly unchanged: fall back to the content hash
+    return file_checksum(csv_path) == schema['source_sha256']
+
+
+def ensure_cache(csv_path):
+    """Return an up-to-date schema, rebuilding the cache if the CSV changed"""
+    schema = read_schema(csv_path)
+    if not is_current(schema, csv_path):
+        return build_cache(csv_path)
+
+    # Remember the new mtime of a touched-but-identical file to skip rehashing
+    mtime_ns = os.stat(csv_path).st_mtime_ns
+    if mtime_ns != schema['source_mtime_ns']:
+        schema['source_mtime_ns'] = mtime_ns
+        _write_schema(cache_path(csv_path), schema)
+    return schema
+
+
+def _load_column(folder, entry, mmap_mode, verify, rows=None):
+    arrays = {}
+    for part, checksum in entry['checksums'].items():
+        path = os.path.join(folder, f"{entry['file']}.{part}.npy")
+        if verify and file_checksum(path) != checksum:
+            raise ValueError(f"Checksum mismatch for column {entry['name']!r} in {folder}")
+        arrays[part] = np.load(path, mmap_mode=mmap_mode)
+        if rows is not None:
+            arrays[part] = arrays[part][rows]
+
+    values = arrays['values']
+    if entry['kind'] == 'category':
+        return pd.Categorical.from_codes(values, entry['categories'])
+    if entry['kind'] == 'int':
+        mask = arrays.get('mask')
+        if mask is None:
+            mask = np.zeros(len(values), dtype=bool)
+        return pd.arrays.IntegerArray(values, np.asarray(mask), copy=False)
+    return values
+
+
+def _filter_mask(folder, entry, op, value):
+    # Rows of one column matching a comparison; missing answers never match
+    if op not in FILTER_OPS:
+        raise ValueError(f"Unknown filter operator {op!r}; expected one of {tuple(FILTER_OPS)}")
+    values = np.load(os.path.join(folder, f"{entry['file']}.values.npy"), mmap_mode='r')
+    wanted = list(value) if op == 'in' else [value]
+
+    if entry['kind'] == 'category':
+        # Compare codes, not strings: the values become the codes of the stored categories
+        if op not in ('==', '!=', 'in'):
+            raise ValueError(f"Categorical column {entry['name']!r} only supports ==, != and in")
+        codes = [entry['categories'].index(v) for v in wanted if v in entry['categories']]
+        match = np.isin(values, codes)
+        return (values >= 0) & ~match if op == '!=' else match
+
+    if entry['kind'] == 'int':
+        present = np.ones(len(values), dtype=bool)
+        if 'mask' in entry['checksums']:
+            present = ~np.load(os.path.join(folder, f"{entry['file']}.mask.npy"), mmap_mode='r')
+    else:
+        present = ~np.isnan(values)
+    match = np.isin(values, wanted) if op == 'in' else FILTER_OPS[op](values, value)
+    return present & match
+
+
+def select_rows(csv_path, filters):
+    """Positions of the rows matching every (column, op, value) filter, read from the filter columns only"""
+    schema = ensure_cache(csv_path)
+    folder = cache_path(csv_path)
+    entries = {entry['name']: entry for entry in schema['columns']}
+
+    keep = np.ones(schema['n_rows'], dtype=bool)
+    for column, op, value in filters:
+        if column not in entries:
+            raise KeyError(f"Column not in {schema['source']}: {column!r}")
+        keep &= _filter_mask(folder, entries[column], op, value)
+    return np.flatnonzero(keep)
+
+
+def load_wave(csv_path, columns=None, mmap_mode='r', verify=False, rows=None):
+    """Load a cleaned wave through the columnar cache, projecting to the given columns (and rows)"""
+    # rows are positions (e.g. from select_rows); the frame keeps them as its index
+    with span('load_wave', 'load', source=os.path.basename(csv_path)):
+        schema = ensure_cache(csv_path)
+        folder = cache_path(csv_path)
+
+        entries = {entry['name']: entry for entry in schema['columns']}
+        if columns is None:
+            columns = [entry['name'] for entry in schema['columns']]
+
+        missing = [col for col in columns if col not in entries]
+        if missing:
+            raise KeyError(f"Columns not in {schema['source']}: {missing}")
+
+        data = {col: _load_column(folder, entries[col], mmap_mode, verify, rows) for col in columns}
+        index = pd.RangeIndex(schema['n_rows']) if rows is None else pd.Index(rows)
+        return pd.DataFrame(data, index=index, copy=False)
+
+
+def wave_columns(csv_path):
+    """Column names of a wave, read from the schema without touching the data"""
+    return [entry['name'] for entry in ensure_cache(csv_path)['columns']]
+
+
+def save_weights(csv_path, weights, name='default', margins=None):
+    """Store a respondent weight vector alongside a wave's columnar cache"""
+    schema = ensure_cache(csv_path)
+    weights = np.asarray(weights, dtype=np.float64)
+    if weights.shape != (schema['n_rows'],):
+        raise ValueError(f"Expected {schema['n_rows']} weights for {schema['source']}, got {weights.shape}")
+
+    folder = cache_path(csv_path)
+    file = 'weights-' + _column_file(name)
+    checksum = _publish(folder, file + '.npy', lambda f: np.save(f, weights))
+
+    # Rebuilding the cache writes a fresh schema, so weights never outlive their source
+    schema.setdefault('weights', {})[name] = {
+        'file': file,
+        'checksum': checksum,
+        'margins': margins
+    }
+    _write_schema(folder, schema)
+    return schema['weights'][name]
+
+
+def load_weights(csv_path, name='default', mmap_mode='r'):
+    """Stored weights of a wave, or None if none were saved for its current contents"""
+    schema = ensure_cache(csv_path)
+    entry = schema.get('weights', {}).get(name)
+    if entry is None:
+        return None
+    return np.load(os.path.join(cache_path(csv_path), entry['file'] + '.npy'), mmap_mode=mmap_mode)
+
+
+def weight_names(csv_path):
+    """Names of the weight sets stored for a wave"""
+    return list(ensure_cache(csv_path).get('weights', {}))
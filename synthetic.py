@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Synthetic MISO waves shaped like the cleaned 2018 and 2024 files.
+
+A profile is read from a real wave: its columns in order, the joint mix of
+the demographic columns (respondents' ADIV, RANK, TEN, SEX, FTIME, AGE and
+Year started are drawn together) and, for every item, the distribution of
+answers (missing included) within each academic division. A synthetic wave
+draws demographic rows from that mix and then every item conditionally on
+the drawn division, so Likert shapes, missingness rates and division
+differences carry over at any size from 10^2 to 10^7 rows.
+
+Columns are generated one at a time and written straight into the columnar
+cache. The CSV is written in full up to csv_limit rows; above that it holds
+only the header, since the report reads waves through the cache alone.
+
+    python synthetic.py /tmp/miso_1e6 --rows 1000000
+    MISO_DATA_DIR=/tmp/miso_1e6 python report_render.py --out /tmp/report_1e6
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from stream_ingest import DEMOGRAPHIC_COLUMNS
+from survey_store import ensure_cache, load_wave, write_columns
+from wave_metrics import PROJECT_DIR, discover_waves
+
+# Division column the items are conditioned on
+DIVISION = 'ADIV'
+
+
+def wave_profile(csv_path):
+    """Columns, demographic rows and per-division answer distributions of a real wave"""
+    df = load_wave(csv_path)
+    demographics = df[[col for col in df.columns if col in DEMOGRAPHIC_COLUMNS]].copy()
+
+    # Division 0 is a missing ADIV, then one per stored category
+    division = df[DIVISION].cat.codes.to_numpy().astype(np.int64) + 1
+    n_divisions = len(df[DIVISION].cat.categories) + 1
+
+    items = {}
+    for col in df.columns:
+        if col in demographics.columns:
+            continue
+        values = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+        missing = np.isnan(values)
+        levels = np.unique(values[~missing])
+
+        # Answer level per respondent; the last level stands for a missing answer
+        level = np.full(len(values), len(levels))
+        level[~missing] = np.searchsorted(levels, values[~missing])
+        counts = np.bincount(division * (len(levels) + 1) + level,
+                             minlength=n_divisions * (len(levels) + 1)).reshape(n_divisions, -1)
+
+        # Divisions without respondents fall back to the wave-wide distribution
+        overall = counts.sum(axis=0)
+        counts[counts.sum(axis=1) == 0] = overall
+        items[col] = (np.append(levels, np.nan), counts / counts.sum(axis=1, keepdims=True))
+
+    return {'columns': list(df.columns), 'demographics': demographics, 'division': division, 'items': items}
+
+
+def synthetic_columns(profile, n_rows, seed=0):
+    """Yield the columns of a synthetic wave one at a time, as named Series"""
+    rng = np.random.default_rng(seed)
+    rows = rng.integers(0, len(profile['demographics']), n_rows)
+    division = profile['division'][rows]
+
+    for col in profile['columns']:
+        if col in profile['demographics'].columns:
+            yield pd.Series(profile['demographics'][col].array.take(rows), name=col)
+            continue
+        levels, probs = profile['items'][col]
+        # Inverse-CDF draw against each respondent's division distribution
+        cumulative = np.cumsum(probs, axis=1)
+        cumulative[:, -1] = 1.0
+        u = rng.random(n_rows)
+        level = np.zeros(n_rows, dtype=np.int64)
+        for j in range(len(levels) - 1):
+            level += u >= cumulative[division, j]
+        yield pd.Series(levels[level], name=col)
+
+
+def write_synthetic_wave(folder, wave, n_rows, profile, seed=0, csv_limit=100_000):
+    """Write a synthetic cleaned_cYY.csv (header only above csv_limit rows) and its columnar cache"""
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f'cleaned_c{str(wave)[-2:]}.csv')
+    if n_rows <= csv_limit:
+        pd.concat(list(synthetic_columns(profile, n_rows, seed)), axis=1).to_csv(path, index=False)
+        ensure_cache(path)
+    else:
+        pd.DataFrame(columns=profile['columns']).to_csv(path, index=False)
+        write_columns(path, synthetic_columns(profile, n_rows, seed), n_rows)
+    return path
+
+
+def synthetic_waves(folder, n_rows, source=PROJECT_DIR, seed=0, csv_limit=100_000):
+    """Synthetic copies of every real wave in source, each with n_rows respondents"""
+    paths = {}
+    for i, (wave, path) in enumerate(discover_waves(source).items()):
+        paths[wave] = write_synthetic_wave(folder, wave, n_rows, wave_profile(path), seed + i, csv_limit)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write synthetic survey waves shaped like the real ones')
+    parser.add_argument('folder', help='output folder (point MISO_DATA_DIR at it)')
+    parser.add_argument('--rows', type=float, default=10_000, help='respondents per wave, e.g. 1e6')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--csv-limit', type=float, default=100_000, help='largest wave written out as full CSV')
+    args = parser.parse_args()
+
+    paths = synthetic_waves(args.folder, int(args.rows), seed=args.seed, csv_limit=int(args.csv_limit))
+    for wave, path in paths.items():
+        print(f"{wave}: {path} ({ensure_cache(path)['n_rows']} rows)")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
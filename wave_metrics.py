@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Report metrics computed directly from the cleaned survey waves.
+
+Every cleaned_cYY.csv next to this file (or in the folder named by
+MISO_DATA_DIR) is picked up as wave 20YY, so adding a survey year is a
+matter of dropping in its cleaned file. Metrics are
+computed once per wave (and weight set) and memoized until the source file
+changes.
+"""
+
+import glob
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from bootstrap import bootstrap_change_cis
+from crosstab import contingency
+from instrument import span
+from psychometrics import composite_means, reliability
+from significance import compare_waves
+from survey_metrics import age_band, column_stats, grouped_item_stats, imp_sat_gaps, item_matrix
+from survey_store import ensure_cache, load_wave, load_weights
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# MISO_DATA_DIR points the report at another folder of wave files (e.g. synthetic waves)
+DATA_ENV = 'MISO_DATA_DIR'
+DATA_DIR = os.path.abspath(os.environ.get(DATA_ENV) or PROJECT_DIR)
+WAVE_PATTERN = re.compile(r'cleaned_c(\d{2})\.csv$')
+
+AGE_GROUPS = ['21-30', '31-40', '41-50', '51-60', '61+']
+
+# Short labels used on the charts for the TEN answers
+TENURE_LABELS = {
+    'Tenured': 'Tenured',
+    'Tenured Track, but not Tenure': 'Tenure Track',
+    'Not on Tenure': 'Not Tenured'
+}
+TENURE_GROUPS = ['Tenured', 'Tenure Track', 'Not Tenured']
+
+# TREM / TLIVE answer codes 1-5
+MODALITY_LABELS = ['Entirely in-person', 'Mostly in-person', 'Equal mix', 'Mostly remote', 'Entirely remote']
+INSTRUCTION_LABELS = ['Entirely live', 'Mostly live', 'Equal mix', 'Mostly recorded', 'Entirely recorded']
+
+_metrics_cache = {}
+
+
+def discover_waves(folder=DATA_DIR):
+    """Map survey year -> cleaned CSV path for every wave file in a folder"""
+    waves = {}
+    for path in glob.glob(os.path.join(folder, 'cleaned_c*.csv')):
+        match = WAVE_PATTERN.search(os.path.basename(path))
+        if match:
+            waves[f'20{match.group(1)}'] = path
+    return dict(sorted(waves.items()))
+
+
+def _code_shares(values, n_codes, weights=None):
+    # Share of respondents giving each answer code 1..n_codes
+    present = ~np.isnan(values)
+    w = None if weights is None else weights[present]
+    counts = np.bincount(values[present].astype(np.int64), weights=w, minlength=n_codes + 1)[1:n_codes + 1]
+    return counts / counts.sum() if counts.sum() else counts.astype(float)
+
+
+def compute_wave_metrics(df, weights=None):
+    """Derive every report table for one wave in a single batched pass per table"""
+    use_cols = [col for col in df.columns if col.startswith('USE_')]
+    use_codes = [col[4:] for col in use_cols]
+    metrics = {}
+
+    # Overall, age-band and tenure usage, all from the same USE_ block
+    _, means, _ = column_stats(item_matrix(df, use_cols), weights=weights)
+    metrics['usage'] = pd.Series(means, index=use_codes)
+
+    by_age = grouped_item_stats(df, use_cols, age_band(df['AGE']), weights)['mean']
+    by_age.index = by_age.index.astype(str)
+    by_age.columns = use_codes
+    metrics['usage_by_age'] = by_age.reindex(AGE_GROUPS)
+
+    by_tenure = grouped_item_stats(df, use_cols, 'TEN', weights)['mean']
+    by_tenure.index = by_tenure.index.map(lambda v: TENURE_LABELS.get(v, v))
+    by_tenure.columns = use_codes
+    metrics['usage_by_tenure'] = by_tenure.reindex(TENURE_GROUPS)
+
+    metrics['imp_sat'] = imp_sat_gaps(df, weights).set_index('service')
+
+    # Item families as scales: reliability and the mean composite score of each
+    metrics['scales'] = reliability(df, weights=weights)['scales'].droplevel('group')
+    metrics['composites'] = composite_means(df, weights=weights)
+
+    # Teaching modality items only exist from 2024 onwards
+    if 'TREM' in df.columns and 'TLIVE' in df.columns:
+        modes = item_matrix(df, ['TREM', 'TLIVE'])
+        metrics['modality_shares'] = pd.Series(_code_shares(modes[:, 0], 5, weights), index=MODALITY_LABELS)
+        metrics['instruction_shares'] = pd.Series(_code_shares(modes[:, 1], 5, weights), index=INSTRUCTION_LABELS)
+
+        counts = contingency(df, ['TREM', 'TLIVE'], weights)['counts'].to_numpy()
+        metrics['modality_crosstab'] = pd.DataFrame(counts, index=MODALITY_LABELS, columns=INSTRUCTION_LABELS)
+
+    return metrics
+
+
+def _wave_weights(path, weights, wave):
+    # weights names a weight set stored with the wave (see weighting.py); None is unweighted
+    if weights is None:
+        return None
+    w = load_weights(path, weights)
+    if w is None:
+        raise KeyError(f"No weights named {weights!r} stored for wave {wave}")
+    return w
+
+
+def wave_metrics(wave, folder=DATA_DIR, weights=None):
+    """Memoized metrics for one survey year, recomputed only when its file changes"""
+    path = discover_waves(folder)[str(wave)]
+    key = (path, ensure_cache(path)['source_sha256'], weights)
+    if key not in _metrics_cache:
+        w = _wave_weights(path, weights, wave)
+        with span('compute_wave_metrics', 'prepare', wave=str(wave)):
+            _metrics_cache[key] = compute_wave_metrics(load_wave(path), w)
+    return _metrics_cache[key]
+
+
+def usage_table(metrics, table, services, scale=5.0):
+    """Usage means for the given services from a grouped table, normalized to 0-1"""
+    return metrics[table][services] / scale
+
+
+def usage_change_cis(services, before='2018', after='2024', folder=DATA_DIR, scale=5.0, weights=None, **kwargs):
+    """Bootstrap CIs on per-wave usage and its change for the given services, normalized to 0-1"""
+    # With a weight set, each wave's draw counts are scaled by its respondents' weights
+    waves = discover_waves(folder)
+    cols = ['USE_' + service for service in services]
+    path_before, path_after = waves[str(before)], waves[str(after)]
+    change = bootstrap_change_cis(load_wave(path_before, columns=cols), load_wave(path_after, columns=cols), cols,
+                                  weights_before=_wave_weights(path_before, weights, before),
+                                  weights_after=_wave_weights(path_after, weights, after), **kwargs)
+    change.index = list(services)
+    return change.drop(columns='item') / scale
+
+
+def usage_change_tests(services, before='2018', after='2024', folder=DATA_DIR, weights=None, **kwargs):
+    """Welch / Mann-Whitney / permutation tests of the usage change for the given services"""
+    waves = discover_waves(folder)
+    cols = ['USE_' + service for service in services]
+    path_before, path_after = waves[str(before)], waves[str(after)]
+    if weights is not None:
+        # Mann-Whitney has no weighted form here, so weighted runs default to the other two tests
+        kwargs.setdefault('tests', ('welch', 'permutation'))
+    tests = compare_waves(load_wave(path_before, columns=cols), load_wave(path_after, columns=cols), cols,
+                          weights_before=_wave_weights(path_before, weights, before),
+                          weights_after=_wave_weights(path_after, weights, after), **kwargs)
+    tests.index = pd.Index(list(services), name='service')
+    return tests
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Survey weights that align the respondent mix with the faculty census.
+
+Raking (iterative proportional fitting) matches several one-way margins such
+as ADIV, RANK and TEN at once; post-stratification matches the joint cells of
+a few keys exactly. Weights are scaled to mean 1 and stored alongside the
+wave's columnar cache, where the report scripts pick them up by name:
+
+    python weighting.py --wave 2024 --margins census_2024.json --name census
+    MISO_WEIGHTS=census python report_render.py
+
+The margins file maps each key to population counts or shares per level,
+e.g. {"RANK": {"Professor": 410, "Associate Professor": 350, ...}, ...}.
+"""
+
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from survey_metrics import age_band, group_codes
+from survey_store import load_wave, save_weights
+from wave_metrics import DATA_DIR, discover_waves
+
+# Environment variable naming the stored weight set the report should use
+WEIGHTS_ENV = 'MISO_WEIGHTS'
+
+
+def selected_weights():
+    """Name of the weight set requested through MISO_WEIGHTS, or None for unweighted"""
+    return os.environ.get(WEIGHTS_ENV) or None
+
+
+def _margin_key(df, key):
+    # AGE_BAND is derived from AGE; every other key is a column of the wave
+    return age_band(df['AGE']).rename('AGE_BAND') if key == 'AGE_BAND' else df[key]
+
+
+def _targets(levels, population, key):
+    # Population shares in the order of the sample levels
+    missing = [level for level in levels if level not in population]
+    if missing:
+        raise ValueError(f"No population figure for {key} levels {missing}")
+    target = np.array([population[level] for level in levels], dtype=np.float64)
+    return target / target.sum()
+
+
+def rake(df, margins, base=None, max_iter=100, tol=1e-6, trim=None):
+    """Raking weights (mean 1) that reproduce every population margin"""
+    n = len(df)
+    weights = np.ones(n) if base is None else np.array(base, dtype=np.float64)
+
+    # Code every margin once; rows missing a key are left out of that margin only
+    margin_codes = []
+    for key, population in margins.items():
+        codes, levels = group_codes(df, _margin_key(df, key))
+        margin_codes.append((codes, codes >= 0, _targets(list(levels), population, key)))
+
+    for _ in range(max_iter):
+        worst = 0.0
+        for codes, valid, target in margin_codes:
+            totals = np.bincount(codes[valid], weights=weights[valid], minlength=len(target))
+            with np.errstate(invalid='ignore', divide='ignore'):
+                factor = np.where(totals > 0, target * totals.sum() / totals, 1.0)
+            weights[valid] *= factor[codes[valid]]
+            worst = max(worst, np.abs(factor[totals > 0] - 1.0).max(initial=0.0))
+
+        # Optional trimming keeps a few rare cells from dominating the estimates
+        if trim is not None:
+            mean = weights.mean()
+            np.clip(weights, trim[0] * mean, trim[1] * mean, out=weights)
+        if worst < tol:
+            break
+
+    return weights * n / weights.sum()
+
+
+def post_stratify(df, population, by):
+    """Post-stratification weights (mean 1) matching the joint cells of the given keys"""
+    keys = [by] if isinstance(by, str) else list(by)
+    codes, index = group_codes(df, [_margin_key(df, key) for key in keys])
+    cells = list(index)
+
+    observed = np.bincount(codes[codes >= 0], minlength=len(cells))
+    present = observed > 0
+    target = _targets([cell for cell, ok in zip(cells, present) if ok], population, '/'.join(keys))
+
+    # Each respondent carries their cell's population share over its sample share
+    factor = np.zeros(len(cells))
+    factor[present] = target / (observed[present] / observed.sum())
+    weights = np.where(codes >= 0, factor[np.maximum(codes, 0)], 1.0)
+    return weights * len(df) / weights.sum()
+
+
+def design_effect(weights):
+    """Kish design effect of unequal weights and the matching effective sample size"""
+    weights = np.asarray(weights, dtype=np.float64)
+    deff = len(weights) * np.sum(weights ** 2) / np.sum(weights) ** 2
+    return deff, len(weights) / deff
+
+
+def margin_check(df, weights, key):
+    """Unweighted and weighted shares of one key, side by side"""
+    series = _margin_key(df, key)
+    frame = pd.DataFrame({'key': series.to_numpy(), 'w': np.asarray(weights)}).dropna(subset=['key'])
+    shares = frame.groupby('key', observed=True).agg(n=('w', 'size'), weighted=('w', 'sum'))
+    return shares / shares.sum()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fit and store survey weights for one wave')
+    parser.add_argument('--wave', required=True, help='survey year, e.g. 2024')
+    parser.add_argument('--margins', required=True, help='JSON file of population counts or shares per key')
+    parser.add_argument('--name', default='default', help='name the weights are stored under')
+    parser.add_argument('--method', choices=['rake', 'poststratify'], default='rake')
+    parser.add_argument('--trim', type=float, nargs=2, default=None, metavar=('LOW', 'HIGH'),
+                        help='clip raked weights to [LOW, HIGH] times the mean')
+    args = parser.parse_args()
+
+    with open(args.margins) as f:
+        margins = json.load(f)
+    path = discover_waves(DATA_DIR)[args.wave]
+
+    if args.method == 'rake':
+        df = load_wave(path, columns=sorted({'AGE' if key == 'AGE_BAND' else key for key in margins}))
+        weights = rake(df, margins, trim=args.trim)
+    else:
+        # Joint cells are keyed as "level|level" in the JSON file
+        keys = margins['by']
+        df = load_wave(path, columns=sorted({'AGE' if key == 'AGE_BAND' else key for key in keys}))
+        population = {tuple(cell.split('|')) if len(keys) > 1 else cell: value
+                      for cell, value in margins['cells'].items()}
+        weights = post_stratify(df, population, keys)
+
+    save_weights(path, weights, args.name, margins)
+    deff, n_eff = design_effect(weights)
+    print(f"Stored {args.method} weights '{args.name}' for {args.wave}: "
+          f"range {weights.min():.2f}-{weights.max():.2f}, design effect {deff:.2f}, effective n {n_eff:.0f}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())